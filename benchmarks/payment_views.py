@@ -0,0 +1,115 @@
+"""
+Payment view benchmark for Pona Health
+
+This script fills the in-memory fake spreadsheet with synthetic
+payments, seeds the local store from it, and times the rebuild of each
+view over the payments (NumPy columns, revenue rollups, the payment
+index and the dashboard aggregator) and the queries they answer. It
+also reports how many Sheets API calls each step cost.
+
+Run "python benchmarks/payment_views.py [rows ...] [--shuffled]" from
+the repository root; --shuffled writes the rows out of timestamp order.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+# Chosen before the service module builds its client and local store
+os.environ["SHEETS_BACKEND"] = "fake"
+os.environ["SHEETS_PARTITION_PAYMENTS"] = "0"
+os.environ.setdefault("SHEETS_FAKE_LATENCY", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import sheets_client
+from src.fake_sheets import FakeSpreadsheet
+from src.local_store import LocalStore, StoreFollower, LOCAL_SHEETS
+from src.dashboard_metrics import DashboardAggregator, DASHBOARD_COLUMNS
+from src.revenue_rollups import RevenueRollup, REVENUE_COLUMNS
+from src.payment_index import PaymentIndex
+from src.payment_columns import PaymentColumns, PAYMENT_COLUMNS, HAVE_NUMPY
+from src import google_sheets_service
+
+
+def _payments(count, shuffled):
+    """Synthetic payments over two years, in the local store's column order"""
+    generator = random.Random(7)
+    rows = [
+        [
+            f"PY-{number:014d}", f"Customer {number}", f"07{number % 10 ** 8:08d}",
+            generator.choice(["Airtel", "M-Pesa", "Tigo"]), generator.randrange(500, 50000, 500),
+            generator.choice(["consultation", "monthly", "family"]), "general",
+            "FALSE", generator.choice(["Tanzania", "Kenya", "Uganda"]),
+            f"{2025 + number * 2 // count}-{number * 24 // count % 12 + 1:02d}-"
+            f"{number % 28 + 1:02d} {number % 24:02d}:{number % 60:02d}:00",
+            str(generator.randrange(1, 41))
+        ]
+        for number in range(count)
+    ]
+    if shuffled:
+        generator.shuffle(rows)
+    return rows
+
+
+def _timed(label, call, spreadsheet=None):
+    """Run call, print its wall time and API calls, and return its result"""
+    if spreadsheet is not None:
+        spreadsheet.calls.clear()
+    started = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - started
+    calls = f"  api calls {dict(spreadsheet.calls)}" if spreadsheet is not None else ""
+    print(f"  {label:<34} {elapsed * 1000:10.1f} ms{calls}")
+    return result
+
+
+def run(count, shuffled):
+    print(f"{count:,} payments{' (shuffled)' if shuffled else ''}")
+    spreadsheet = FakeSpreadsheet(latency=0, error_rate=0)
+    sheets_client._spreadsheet = spreadsheet
+    spreadsheet.load({"payments": [LOCAL_SHEETS["payments"]] + _payments(count, shuffled)})
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalStore(os.path.join(directory, "local_store.db"))
+        google_sheets_service.LocalStore = lambda: store
+        service = google_sheets_service.GoogleSheetsService()
+        service.replicator.start = lambda: None
+
+        _timed("seed local store", lambda: service.get_columns("payments", ["id"]), spreadsheet)
+
+        views = [
+            ("rebuild DashboardAggregator", DashboardAggregator(), DASHBOARD_COLUMNS),
+            ("rebuild RevenueRollup", RevenueRollup(), REVENUE_COLUMNS),
+            ("rebuild PaymentIndex", PaymentIndex(), None),
+        ]
+        if HAVE_NUMPY:
+            views.append(("rebuild PaymentColumns", PaymentColumns(), PAYMENT_COLUMNS))
+        followers = {}
+        for label, view, columns in views:
+            follower = StoreFollower(store, ["payments"], view, columns)
+            _timed(label, follower.sync)
+            followers[type(view).__name__] = view
+
+        month = (date(2026, 3, 1), date(2026, 3, 31))
+        _timed("revenue, one month (rollup)", lambda: followers["RevenueRollup"].query(*month))
+        _timed("doctor earnings (index)", lambda: followers["PaymentIndex"].doctor_earnings("7"))
+        _timed("top earners (index)", lambda: followers["PaymentIndex"].top_earners(10))
+        if HAVE_NUMPY:
+            _timed("revenue, one month (columns)", lambda: followers["PaymentColumns"].query(*month))
+            _timed("doctor earnings (columns)", lambda: followers["PaymentColumns"].doctor_earnings("7"))
+            _timed("top earners (columns)", lambda: followers["PaymentColumns"].top_earners(10))
+        _timed("dashboard (service)", service.get_dashboard_metrics, spreadsheet)
+        _timed("dashboard again (incremental)", service.get_dashboard_metrics, spreadsheet)
+        _timed("payments in one month (service)",
+               lambda: service.get_payments("2026-03-01", "2026-03-31"), spreadsheet)
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    shuffled = "--shuffled" in arguments
+    counts = [int(argument) for argument in arguments if argument != "--shuffled"]
+    for count in counts or [200000]:
+        run(count, shuffled)
@@ -2,31 +2,238 @@
 Admin API routes for Pona Health admin dashboard
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, make_response, stream_with_context, g
 from .google_sheets_service import get_sheets_service
+from .sheets_quota import is_retryable_error
+from .local_store import StaleCursorError
+from .response_cache import ResponseCache
+from .revenue_rollups import GRANULARITIES, PERIODS
+import os
+import hashlib
 import json
-from datetime import datetime
+from functools import wraps
+from itertools import islice
+from datetime import datetime, date
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 sheets_service = get_sheets_service()
 
+# Largest page a list endpoint returns for one request
+MAX_PAGE_SIZE = 1000
+
+# Expensive aggregates are refreshed in the background once older than
+# the soft TTL, and recomputed before answering once older than max stale
+RESPONSE_SOFT_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_SOFT_TTL", "10"))
+RESPONSE_MAX_STALE_SECONDS = float(os.environ.get("RESPONSE_CACHE_MAX_STALE", "600"))
+# Background refreshes running at once, across every cached endpoint
+RESPONSE_MAX_REFRESHES = int(os.environ.get("RESPONSE_CACHE_MAX_REFRESHES", "4"))
+response_cache = ResponseCache(
+    RESPONSE_SOFT_TTL_SECONDS, RESPONSE_MAX_STALE_SECONDS, max_refreshes=RESPONSE_MAX_REFRESHES
+)
+
+def _error_response(e):
+    """Build the response for an unexpected error
+    
+    Sheets API throttling that outlasted the retries is reported as 503
+    so that clients back off instead of treating it as a server bug.
+    """
+    if is_retryable_error(e):
+        response = jsonify({"error": "Google Sheets is busy, please retry shortly"})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    return jsonify({"error": str(e)}), 500
+
+def _list_response(rows=None, keyed_rows=None):
+    """Build the response of a list endpoint
+    
+    Query parameters:
+        limit: page size; the response becomes {"items", "next_cursor"}
+        after: cursor returned as next_cursor by the previous page
+        fields: comma-separated keys to keep in each row
+        format=ndjson (or Accept: application/x-ndjson): stream one JSON
+            row per line instead of building a single payload
+    
+    Without any of these the plain JSON list is returned, as before.
+    
+    Local-store worksheets pass keyed_rows instead of rows: a function
+    taking the after cursor (None for the first page) and yielding
+    (cursor, row) pairs past it. Their cursor then names the last row
+    served, so a page never rereads the rows before it and stays put
+    when rows are deleted. A cursor issued before the worksheet was
+    reloaded from Google Sheets is answered with 410, and the client
+    starts over. Otherwise the cursor is an offset into rows.
+    """
+    limit = request.args.get('limit', type=int)
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    stream = (request.args.get('format') == 'ndjson'
+              or 'application/x-ndjson' in request.headers.get('Accept', ''))
+    
+    if keyed_rows is not None:
+        try:
+            pairs = keyed_rows(request.args.get('after'))
+        except StaleCursorError as e:
+            return jsonify({"error": str(e)}), 410
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+    else:
+        after = max(0, request.args.get('after', 0, type=int))
+        # Keyed by the offset just past each row
+        pairs = enumerate(islice(rows, after, None), after + 1)
+    if fields:
+        pairs = ((key, {field: row[field] for field in fields if field in row}) for key, row in pairs)
+    
+    next_cursor = None
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        page = list(islice(pairs, limit + 1))
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = str(page[-1][0])
+        pairs = iter(page)
+    rows = (row for _, row in pairs)
+    
+    if stream:
+        def generate():
+            for row in rows:
+                yield json.dumps(row, default=str) + "\n"
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    
+    if limit is not None or 'after' in request.args:
+        return jsonify({"items": list(rows), "next_cursor": next_cursor})
+    return jsonify(list(rows))
+
+def _iso_date(value):
+    """Normalise a YYYY-MM-DD query parameter, raising ValueError when malformed"""
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+
+def _etag(version):
+    """Derive the ETag of this request's response from a data version
+    
+    The full query string and today's date (periods such as "this month"
+    move with it) are part of the tag.
+    """
+    return hashlib.sha1(f"{request.full_path}|{date.today()}|{version}".encode()).hexdigest()
+
+def _conditional(*sheet_names):
+    """Answer conditional GETs of a read endpoint from worksheet versions
+    
+    The ETag is derived from the versions of the worksheets the endpoint
+    reads. A request whose If-None-Match matches is answered with 304
+    before the view runs, so nothing is recomputed or serialized. The
+    version is left in g.sheet_version for the view; a view that serves
+    an older result sets the ETag of that result itself.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                g.sheet_version = sheets_service.get_version(list(sheet_names))
+            except Exception as e:
+                return _error_response(e)
+            etag = _etag(g.sheet_version)
+            if etag in request.if_none_match:
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.get_etag()[0] is None:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+def _cached_response(compute, **params):
+    """Serve an expensive aggregate from the response cache
+    
+    The cache key is the endpoint and params, the normalised values of
+    the query parameters compute reads, so that unrelated or equivalent
+    query strings share one entry. compute runs without the request
+    context, possibly on a background thread.
+    """
+    key = (request.path, tuple(sorted(params.items())))
+    value, version = response_cache.get(key, compute, g.sheet_version)
+    # A stale result must not be tagged as the current version
+    etag = _etag(version)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(value)
+    response.set_etag(etag)
+    return response
+
 @admin_bp.route('/dashboard', methods=['GET'])
+@_conditional('payments', 'subscriptions')
 def get_dashboard_metrics():
     """Get dashboard metrics"""
     try:
-        metrics = sheets_service.get_dashboard_metrics()
-        return jsonify(metrics)
+        return _cached_response(sheets_service.get_dashboard_metrics)
+    except Exception as e:
+        return _error_response(e)
+
+@admin_bp.route('/dashboard/activity', methods=['GET'])
+@_conditional('payments')
+def get_recent_activity():
+    """Get older dashboard activity, paging back from a cursor"""
+    try:
+        before = request.args.get('before', type=int)
+        limit = max(1, min(request.args.get('limit', 20, type=int), MAX_PAGE_SIZE))
+        activity = sheets_service.get_recent_activity(before, limit)
+        return jsonify(activity)
+    except Exception as e:
+        return _error_response(e)
+
+@admin_bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get worksheet cache hit/miss counters"""
+    try:
+        stats = sheets_service.get_cache_stats()
+        stats["responses"] = response_cache.stats()
+        return jsonify(stats)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
+
+@admin_bp.route('/replication-stats', methods=['GET'])
+def get_replication_stats():
+    """Get rows still waiting to be replicated to Google Sheets"""
+    try:
+        stats = sheets_service.get_replication_stats()
+        return jsonify(stats)
+    except Exception as e:
+        return _error_response(e)
+
+@admin_bp.route('/quota-stats', methods=['GET'])
+def get_quota_stats():
+    """Get the remaining Google Sheets API budget"""
+    try:
+        stats = sheets_service.get_quota_stats()
+        return jsonify(stats)
+    except Exception as e:
+        return _error_response(e)
+
+@admin_bp.route('/flight-stats', methods=['GET'])
+def get_flight_stats():
+    """Get how many concurrent Google Sheets reads were shared"""
+    try:
+        stats = sheets_service.get_flight_stats()
+        return jsonify(stats)
+    except Exception as e:
+        return _error_response(e)
 
 @admin_bp.route('/doctors', methods=['GET'])
+@_conditional('doctors')
 def get_doctors():
     """Get all doctors"""
     try:
         doctors = sheets_service.get_doctors()
-        return jsonify(doctors)
+        return _list_response(doctors)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/doctors', methods=['POST'])
 def add_doctor():
@@ -36,7 +243,7 @@ def add_doctor():
         result = sheets_service.add_doctor(doctor_data)
         return jsonify(result), 201
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/doctors/<doctor_id>', methods=['PUT'])
 def update_doctor(doctor_id):
@@ -47,7 +254,7 @@ def update_doctor(doctor_id):
         result = sheets_service.update_doctor(doctor_data)
         return jsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/doctors/<doctor_id>', methods=['DELETE'])
 def delete_doctor(doctor_id):
@@ -58,55 +265,114 @@ def delete_doctor(doctor_id):
             return jsonify({"success": True})
         return jsonify({"error": "Doctor not found"}), 404
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/payments', methods=['GET'])
+@_conditional('payments')
 def get_payments():
     """Get payments with optional date filtering"""
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        payments = sheets_service.get_payments(start_date, end_date)
-        return jsonify(payments)
+        if start_date or end_date:
+            payments = sheets_service.get_payments(start_date, end_date)
+        else:
+            return _list_response(keyed_rows=lambda after: sheets_service.iter_records_after("payments", after))
+        return _list_response(payments)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/payments/doctor/<doctor_id>', methods=['GET'])
+@_conditional('payments')
 def get_doctor_earnings(doctor_id):
     """Get earnings for a specific doctor"""
     try:
         earnings = sheets_service.get_doctor_earnings(doctor_id)
         return jsonify(earnings)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
+
+@admin_bp.route('/payments/top-earners', methods=['GET'])
+@_conditional('payments')
+def get_top_earners():
+    """Get the doctors with the highest earnings"""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), MAX_PAGE_SIZE))
+        earners = sheets_service.get_top_earners(limit)
+        return jsonify(earners)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return _error_response(e)
+
+@admin_bp.route('/payments/customer/<phone>', methods=['GET'])
+def get_customer_payments(phone):
+    """Get all payments made from a phone number"""
+    try:
+        payments = sheets_service.get_customer_payments(phone)
+        return jsonify(payments)
+    except Exception as e:
+        return _error_response(e)
+
+@admin_bp.route('/payments/country/<country>', methods=['GET'])
+def get_country_payments(country):
+    """Get all payments made in a country"""
+    try:
+        payments = sheets_service.get_country_payments(country)
+        return jsonify(payments)
+    except Exception as e:
+        return _error_response(e)
 
 @admin_bp.route('/subscriptions', methods=['GET'])
+@_conditional('subscriptions')
 def get_subscriptions():
     """Get all subscriptions"""
     try:
-        subscriptions = sheets_service.get_subscriptions()
-        return jsonify(subscriptions)
+        return _list_response(
+            keyed_rows=lambda after: sheets_service.iter_records_after("subscriptions", after)
+        )
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/revenue', methods=['GET'])
+@_conditional('payments')
 def get_revenue_data():
-    """Get revenue data with period filtering"""
+    """Get revenue data for a period or a start/end date range"""
     try:
+        start_date = _iso_date(request.args.get('start_date'))
+        end_date = _iso_date(request.args.get('end_date'))
         period = request.args.get('period', 'all')
-        revenue_data = sheets_service.get_revenue_data(period)
-        return jsonify(revenue_data)
+        if start_date or end_date or period not in PERIODS:
+            # Dates take precedence, and unknown periods cover all time
+            period = 'all'
+        granularity = request.args.get('granularity') or None
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity '{granularity}'")
+        return _cached_response(
+            lambda: sheets_service.get_revenue_data(
+                period,
+                start_date=start_date,
+                end_date=end_date,
+                granularity=granularity
+            ),
+            period=period, start_date=start_date, end_date=end_date, granularity=granularity
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/consultation-fees', methods=['GET'])
+@_conditional('consultation_fees')
 def get_consultation_fees():
     """Get consultation fees for all countries"""
     try:
         fees = sheets_service.get_consultation_fees()
         return jsonify(fees)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/consultation-fees', methods=['PUT'])
 def update_consultation_fees():
@@ -118,16 +384,17 @@ def update_consultation_fees():
             return jsonify({"success": True})
         return jsonify({"error": "Failed to update consultation fees"}), 500
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/care-plans', methods=['GET'])
+@_conditional('care_plans', 'care_plan_features', 'care_plan_prices')
 def get_care_plans():
     """Get all care plans"""
     try:
         plans = sheets_service.get_care_plans()
         return jsonify(plans)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/care-plans', methods=['PUT'])
 def update_care_plans():
@@ -139,16 +406,16 @@ def update_care_plans():
             return jsonify({"success": True})
         return jsonify({"error": "Failed to update care plans"}), 500
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/users', methods=['GET'])
 def get_users():
     """Get all users"""
     try:
         users = sheets_service.get_users()
-        return jsonify(users)
+        return _list_response(users)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/users', methods=['POST'])
 def add_user():
@@ -158,7 +425,7 @@ def add_user():
         result = sheets_service.add_user(user_data)
         return jsonify(result), 201
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/users/<user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -169,7 +436,7 @@ def update_user(user_id):
         result = sheets_service.update_user(user_data)
         return jsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/users/<user_id>', methods=['DELETE'])
 def delete_user(user_id):
@@ -180,7 +447,7 @@ def delete_user(user_id):
             return jsonify({"success": True})
         return jsonify({"error": "User not found"}), 404
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @admin_bp.route('/change-password', methods=['POST'])
 def change_password():
@@ -203,4 +470,4 @@ def change_password():
         
         return jsonify({"error": "Failed to change password"}), 500
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
@@ -0,0 +1,136 @@
+"""
+Dashboard metrics aggregator for Pona Health Admin Dashboard
+
+This module keeps the admin dashboard counters up to date as payment and
+subscription rows are written, so that building the dashboard does not
+rescan every row on every request.
+"""
+
+import bisect
+import heapq
+from datetime import datetime
+from typing import Dict, Any, Optional
+from .timestamps import epoch_days, epoch_seconds, EPOCH_ORDINAL
+
+# Number of newest payments kept in the recent activity feed
+RECENT_ACTIVITY_SIZE = 50
+
+# Columns the aggregator reads from each worksheet
+DASHBOARD_COLUMNS = {
+    "payments": ["name", "amount", "doctor_type", "emergency", "country", "timestamp"],
+    "subscriptions": ["expiry_date"],
+}
+
+
+def parse_amount(value: Any) -> float:
+    """Read an amount cell, treating blanks as zero"""
+    if value in ("", None):
+        return 0.0
+    return float(str(value).replace(",", ""))
+
+
+def activity_entry(payment: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe a payment for the recent activity feed"""
+    return {
+        "date": str(payment.get("timestamp", "")),
+        "user": payment.get("name", "Unknown"),
+        "activity": f"Booked {payment.get('doctor_type', 'Unknown')}",
+        "details": f"Amount: {parse_amount(payment.get('amount', 0))}"
+    }
+
+
+def is_true(value: Any) -> bool:
+    """Read a checkbox-style cell, which Sheets hands back as TRUE/FALSE"""
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value)
+
+
+class DashboardAggregator:
+    """Running totals behind /api/admin/dashboard"""
+
+    def __init__(self, recent_activity_size: int = RECENT_ACTIVITY_SIZE):
+        self.recent_activity_size = recent_activity_size
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything, ahead of a rebuild"""
+        self.total_bookings = 0
+        # Payments with a valid timestamp, the ones the activity pages list
+        self.dated_payments = 0
+        self.total_revenue = 0
+        self.emergency_bookings = 0
+        self.revenue_by_country = {}
+        self.bookings_by_doctor = {}
+        # Min-heap of the newest payments, bounded to recent_activity_size
+        self.recent_activity = []
+        # Sorted expiry dates, as days since 1970-01-01
+        self.expiry_dates = []
+
+    def apply(self, sheet_name: str, record: Dict[str, Any]) -> None:
+        """Fold one new row into the totals"""
+        if sheet_name == "payments":
+            self.add_payment(record)
+        elif sheet_name == "subscriptions":
+            self.add_subscription(record)
+
+    def add_payment(self, payment: Dict[str, Any]) -> None:
+        """Count one payment"""
+        self.total_bookings += 1
+        amount = parse_amount(payment.get("amount", 0))
+        self.total_revenue += amount
+
+        # Track revenue by country
+        country = payment.get("country", "Unknown")
+        self.revenue_by_country[country] = self.revenue_by_country.get(country, 0) + amount
+
+        # Track bookings by doctor
+        doctor = payment.get("doctor_type", "Unknown")
+        self.bookings_by_doctor[doctor] = self.bookings_by_doctor.get(doctor, 0) + 1
+
+        # Track emergency bookings
+        if is_true(payment.get("emergency", False)):
+            self.emergency_bookings += 1
+
+        if epoch_seconds(payment.get("timestamp", "")) is not None:
+            self.dated_payments += 1
+
+        # Keep only the newest entries; the oldest sits at the top of the heap
+        entry = (str(payment.get("timestamp", "")), self.total_bookings, activity_entry(payment))
+        if len(self.recent_activity) < self.recent_activity_size:
+            heapq.heappush(self.recent_activity, entry)
+        elif entry > self.recent_activity[0]:
+            heapq.heapreplace(self.recent_activity, entry)
+
+    def add_subscription(self, subscription: Dict[str, Any]) -> None:
+        """Count one subscription"""
+        expiry_date = subscription.get("expiry_date", "")
+        if not expiry_date:
+            return
+        expiry = epoch_days(expiry_date)
+        if expiry is None:
+            return
+        bisect.insort(self.expiry_dates, expiry)
+
+    def active_subscriptions(self, now: Optional[datetime] = None) -> int:
+        """Count subscriptions expiring after today"""
+        today = (now or datetime.now()).date().toordinal() - EPOCH_ORDINAL
+        return len(self.expiry_dates) - bisect.bisect_right(self.expiry_dates, today)
+
+    def activity_cursor(self) -> Optional[str]:
+        """Cursor for paging past the recent activity feed, or None if it holds everything"""
+        older = self.dated_payments - len(self.recent_activity)
+        return str(older) if older > 0 else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the dashboard metrics"""
+        return {
+            "total_bookings": self.total_bookings,
+            "total_revenue": self.total_revenue,
+            "active_subscriptions": self.active_subscriptions(),
+            "emergency_bookings": self.emergency_bookings,
+            "revenue_by_country": dict(self.revenue_by_country),
+            "bookings_by_doctor": dict(self.bookings_by_doctor),
+            # Newest first
+            "recent_activity": [entry for _, _, entry in sorted(self.recent_activity, reverse=True)]
+        }
@@ -0,0 +1,291 @@
+"""
+In-memory Google Sheets backend for Pona Health
+
+This module emulates the parts of the gspread Spreadsheet and Worksheet
+interface that the Google Sheets service uses: tabs with 1-based rows,
+a header row, appends, updates, deletes and batch value calls. Each call
+can be slowed down and made to fail with a quota error, so caching,
+batching and retry behaviour can be tested and measured without a live
+spreadsheet. Select it with SHEETS_BACKEND=fake.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+# Fake backend configuration
+FAKE_LATENCY_SECONDS = float(os.environ.get("SHEETS_FAKE_LATENCY", "0"))
+FAKE_ERROR_RATE = float(os.environ.get("SHEETS_FAKE_ERROR_RATE", "0"))
+
+
+def _cell(value: Any) -> str:
+    """Store a value the way Sheets displays it after a RAW write"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _split_range(range_name: str) -> Tuple[str, Optional[str]]:
+    """Split "'tab'!A1:B2" into the tab title and the A1 range
+
+    A bare tab name stands for the whole tab, with no A1 range.
+    """
+    title, cells = range_name, None
+    if "!" in range_name:
+        title, cells = range_name.rsplit("!", 1)
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, cells
+
+
+class _QuotaResponse:
+    """Stands in for the HTTP response of a rate-limited call"""
+
+    status_code = 429
+    text = "Quota exceeded (fake backend)"
+
+    def json(self) -> Dict[str, Any]:
+        return {"error": {"code": 429, "message": self.text, "status": "RESOURCE_EXHAUSTED"}}
+
+
+class FakeWorksheet:
+    """One tab of a FakeSpreadsheet"""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, rows: int, cols: int):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._rows = []
+
+    def _grid(self, cells: Optional[str]) -> Tuple[int, int, int, int]:
+        """0-based start and exclusive end of an A1 range, clipped to the data"""
+        grid = a1_range_to_grid_range(cells) if cells else {}
+        return (
+            grid.get("startRowIndex", 0),
+            grid.get("startColumnIndex", 0),
+            grid.get("endRowIndex", max(len(self._rows), grid.get("startRowIndex", 0))),
+            grid.get("endColumnIndex", self.col_count)
+        )
+
+    def _read(self, cells: Optional[str]) -> List[List[str]]:
+        first_row, first_col, end_row, end_col = self._grid(cells)
+        values = [row[first_col:end_col] for row in self._rows[first_row:end_row]]
+        # Like the API, trailing blank cells and rows are left out
+        for row in values:
+            while row and row[-1] == "":
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _write(self, cells: Optional[str], values: List[List[Any]]) -> None:
+        first_row, first_col, _, _ = self._grid(cells)
+        for offset, row in enumerate(values):
+            position = first_row + offset
+            while len(self._rows) <= position:
+                self._rows.append([])
+            target = self._rows[position]
+            needed = first_col + len(row)
+            target.extend([""] * (needed - len(target)))
+            target[first_col:needed] = [_cell(value) for value in row]
+        self.row_count = max(self.row_count, len(self._rows))
+        self.col_count = max(self.col_count, max((len(row) for row in self._rows), default=0))
+
+    def _clear(self, cells: Optional[str]) -> None:
+        first_row, first_col, end_row, end_col = self._grid(cells)
+        for row in self._rows[first_row:end_row]:
+            for position in range(first_col, min(end_col, len(row))):
+                row[position] = ""
+
+    def get_all_values(self) -> List[List[str]]:
+        self.spreadsheet._api_call("get_all_values")
+        with self.spreadsheet._lock:
+            width = max((len(row) for row in self._rows), default=0)
+            values = [row + [""] * (width - len(row)) for row in self._rows]
+            while values and not any(values[-1]):
+                values.pop()
+            return values
+
+    def get(self, range_name: Optional[str] = None, **kwargs) -> List[List[str]]:
+        self.spreadsheet._api_call("get")
+        with self.spreadsheet._lock:
+            return self._read(range_name)
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self.spreadsheet._api_call("row_values")
+        with self.spreadsheet._lock:
+            values = self._read(f"{row}:{row}")
+            return values[0] if values else []
+
+    def append_rows(self, values: List[List[Any]], **kwargs) -> Dict[str, Any]:
+        self.spreadsheet._api_call("append_rows")
+        with self.spreadsheet._lock:
+            # Appends go after the last row holding any value
+            last = len(self._rows)
+            while last and not any(self._rows[last - 1]):
+                last -= 1
+            del self._rows[last:]
+            self._write(f"A{last + 1}", values)
+            return {"updates": {"updatedRows": len(values)}}
+
+    def append_row(self, values: List[Any], **kwargs) -> Dict[str, Any]:
+        return self.append_rows([values], **kwargs)
+
+    def update(self, values: List[List[Any]], range_name: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.spreadsheet._api_call("update")
+        with self.spreadsheet._lock:
+            self._write(range_name or "A1", values)
+            return {"updatedRows": len(values)}
+
+    def update_cell(self, row: int, col: int, value: Any) -> Dict[str, Any]:
+        self.spreadsheet._api_call("update_cell")
+        with self.spreadsheet._lock:
+            self._write(gspread.utils.rowcol_to_a1(row, col), [[value]])
+            return {"updatedCells": 1}
+
+    def delete_rows(self, start_index: int, end_index: Optional[int] = None) -> Dict[str, Any]:
+        self.spreadsheet._api_call("delete_rows")
+        with self.spreadsheet._lock:
+            end_index = end_index or start_index
+            del self._rows[start_index - 1:end_index]
+            self.row_count -= end_index - start_index + 1
+            return {}
+
+    def add_rows(self, rows: int) -> Dict[str, Any]:
+        self.spreadsheet._api_call("add_rows")
+        with self.spreadsheet._lock:
+            self.row_count += rows
+            return {}
+
+
+class FakeSpreadsheet:
+    """In-memory stand-in for a gspread Spreadsheet
+
+    latency is added to every API call; error_rate is the share of calls
+    that fail with a 429 quota error before doing anything.
+    """
+
+    def __init__(self, latency: float = FAKE_LATENCY_SECONDS, error_rate: float = FAKE_ERROR_RATE,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.title = "Pona Health (fake)"
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._worksheets = {}
+        self._lock = threading.RLock()
+
+    def _api_call(self, name: str) -> None:
+        """Account for one API call, with the configured latency and failures"""
+        with self._lock:
+            self.calls[name] += 1
+            failed = self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise gspread.exceptions.APIError(_QuotaResponse())
+
+    def _tab(self, title: str) -> FakeWorksheet:
+        sheet = self._worksheets.get(title)
+        if sheet is None:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return sheet
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self._api_call("worksheets")
+        with self._lock:
+            return list(self._worksheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._api_call("worksheet")
+        with self._lock:
+            return self._tab(title)
+
+    def add_worksheet(self, title: str, rows: int, cols: int, **kwargs) -> FakeWorksheet:
+        self._api_call("add_worksheet")
+        with self._lock:
+            sheet = FakeWorksheet(self, title, rows, cols)
+            self._worksheets[title] = sheet
+            return sheet
+
+    def del_worksheet(self, worksheet: FakeWorksheet) -> None:
+        self._api_call("del_worksheet")
+        with self._lock:
+            self._worksheets.pop(worksheet.title, None)
+
+    def fetch_sheet_metadata(self, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._api_call("fetch_sheet_metadata")
+        with self._lock:
+            return {"sheets": [
+                {"properties": {
+                    "title": sheet.title,
+                    "gridProperties": {"rowCount": sheet.row_count, "columnCount": sheet.col_count}
+                }}
+                for sheet in self._worksheets.values()
+            ]}
+
+    def values_batch_get(self, ranges: List[str], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._api_call("values_batch_get")
+        by_columns = (params or {}).get("majorDimension") == "COLUMNS"
+        value_ranges = []
+        with self._lock:
+            for range_name in ranges:
+                title, cells = _split_range(range_name)
+                values = self._tab(title)._read(cells)
+                if by_columns and values:
+                    width = max(len(row) for row in values)
+                    values = [
+                        [row[position] if position < len(row) else "" for row in values]
+                        for position in range(width)
+                    ]
+                    for column in values:
+                        while column and column[-1] == "":
+                            column.pop()
+                value_range = {"range": range_name}
+                if values:
+                    value_range["values"] = values
+                value_ranges.append(value_range)
+        return {"valueRanges": value_ranges}
+
+    def values_batch_clear(self, params: Optional[Dict[str, Any]] = None,
+                           body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._api_call("values_batch_clear")
+        with self._lock:
+            for range_name in (body or {}).get("ranges", []):
+                title, cells = _split_range(range_name)
+                self._tab(title)._clear(cells)
+        return {}
+
+    def values_batch_update(self, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._api_call("values_batch_update")
+        with self._lock:
+            for value_range in (body or {}).get("data", []):
+                title, cells = _split_range(value_range["range"])
+                self._tab(title)._write(cells, value_range.get("values", []))
+        return {}
+
+    def load(self, tables: Dict[str, List[List[Any]]]) -> None:
+        """Fill tabs with rows, header row first, without counting API calls"""
+        with self._lock:
+            for title, rows in tables.items():
+                sheet = self._worksheets.get(title)
+                if sheet is None:
+                    sheet = FakeWorksheet(self, title, 1000, 20)
+                    self._worksheets[title] = sheet
+                sheet._rows = []
+                sheet._write("A1", rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how many times each API call was made"""
+        with self._lock:
+            return dict(self.calls)
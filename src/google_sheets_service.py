@@ -7,134 +7,601 @@ for storing and retrieving data for the admin dashboard.
 
 import os
 import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import gspread
-from google.oauth2.service_account import Credentials
+from gspread.utils import numericise_all
+from .sheets_client import get_spreadsheet
+from .sheets_cache import RecordCache, build_record, cell_text
+from .sheets_registry import WorksheetRegistry, is_missing_worksheet_error
+from .sheets_quota import QuotaScheduler, READ, WRITE
+from .single_flight import SingleFlight
+from .row_index import RowIndex, ID_COLUMN, FIRST_DATA_ROW
+from .local_store import LocalStore, StoreFollower
+from .sheets_replicator import SheetsReplicator
+from .dashboard_metrics import DashboardAggregator, DASHBOARD_COLUMNS
+from .revenue_rollups import RevenueRollup, REVENUE_COLUMNS, period_bounds
+from .payment_index import PaymentIndex
+from .payment_columns import PaymentColumns, PAYMENT_COLUMNS, HAVE_NUMPY
+from .sheet_records import Doctor, User
+from .payment_partitions import PartitionCatalog, PARTITIONED_SHEETS, CATALOG_SHEET
 
-# Constants
-SHEET_ID = "1N38MVn9tIjtyvOhMcsHCoD5bELE5vmHmau7ZgDtSz1g"
-CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), "credentials.json")
+# Record cache configuration
+CACHE_TTL_SECONDS = float(os.environ.get("SHEETS_CACHE_TTL", "30"))
+CACHE_MAX_ROWS = int(os.environ.get("SHEETS_CACHE_MAX_ROWS", "50000"))
 
-# Scopes required for Google Sheets API
-SCOPES = [
-    'https://www.googleapis.com/auth/spreadsheets',
-    'https://www.googleapis.com/auth/drive'
-]
+# Most worksheets read concurrently when they cannot be batched
+MAX_PARALLEL_READS = 4
+
+# Per-minute Sheets API budgets of this process
+READS_PER_MINUTE = int(os.environ.get("SHEETS_READS_PER_MINUTE", "60"))
+WRITES_PER_MINUTE = int(os.environ.get("SHEETS_WRITES_PER_MINUTE", "60"))
+
+# How often rows appended by other writers are imported into the local
+# store, and how often it is checked against the whole sheet
+DELTA_SYNC_INTERVAL_SECONDS = float(os.environ.get("SHEETS_DELTA_SYNC_INTERVAL", "60"))
+CHECKSUM_INTERVAL_SECONDS = float(os.environ.get("SHEETS_CHECKSUM_INTERVAL", "900"))
+
+# Write payments into one worksheet tab per month (see payment_partitions
+# for switching it on)
+PARTITION_PAYMENTS = os.environ.get("SHEETS_PARTITION_PAYMENTS", "0") == "1"
+
+def _row_key(row: List[Any]) -> Tuple[str, ...]:
+    """Compare a row as the Sheets API returns it, without trailing blanks"""
+    cells = [cell_text(value) for value in row]
+    while cells and cells[-1] == "":
+        cells.pop()
+    return tuple(cells)
 
 class GoogleSheetsService:
     """Service class for Google Sheets operations"""
     
     def __init__(self):
-        """Initialize the Google Sheets service with credentials"""
-        try:
-            self.credentials = Credentials.from_service_account_file(
-                CREDENTIALS_PATH, scopes=SCOPES
+        """Initialize the Google Sheets service
+        
+        No network I/O happens here; the shared client connects on first
+        use (see sheets_client).
+        """
+        self.quota = QuotaScheduler(READS_PER_MINUTE, WRITES_PER_MINUTE)
+        self.cache = RecordCache(ttl=CACHE_TTL_SECONDS, max_rows=CACHE_MAX_ROWS)
+        self.worksheets = WorksheetRegistry(get_spreadsheet, self.quota)
+        self.row_index = RowIndex()
+        # Concurrent identical downloads share one API call
+        self.flights = SingleFlight()
+        
+        # Bookings, payments and subscriptions live in the local store first
+        self.local_store = LocalStore()
+        self.partitions = PartitionCatalog(
+            lambda: self.get_all_records(CATALOG_SHEET),
+            lambda row: self.append_row(CATALOG_SHEET, row),
+            self._create_tab,
+            PARTITIONED_SHEETS if PARTITION_PAYMENTS else {}
+        )
+        self.replicator = SheetsReplicator(
+            self.local_store, self._append_rows, self._read_tabs, self.worksheets.get_headers,
+            self._read_rows_after, delta_interval=DELTA_SYNC_INTERVAL_SECONDS,
+            checksum_interval=CHECKSUM_INTERVAL_SECONDS, partitions=self.partitions
+        )
+        
+        # Incrementally maintained views over the local store
+        self.dashboard_feed = StoreFollower(
+            self.local_store, ["payments", "subscriptions"], DashboardAggregator(), DASHBOARD_COLUMNS
+        )
+        self.payments_feed = StoreFollower(self.local_store, ["payments"], PaymentIndex())
+        if HAVE_NUMPY:
+            # Revenue and earnings from typed column arrays
+            self.revenue_feed = StoreFollower(
+                self.local_store, ["payments"], PaymentColumns(), PAYMENT_COLUMNS
             )
-            self.client = gspread.authorize(self.credentials)
-            self.spreadsheet = self.client.open_by_key(SHEET_ID)
-        except Exception as e:
-            print(f"Error initializing Google Sheets service: {e}")
-            raise
+            self.earnings_feed = self.revenue_feed
+        else:
+            self.revenue_feed = StoreFollower(
+                self.local_store, ["payments"], RevenueRollup(), REVENUE_COLUMNS
+            )
+            self.earnings_feed = self.payments_feed
+    
+    @property
+    def spreadsheet(self):
+        """The process-wide spreadsheet handle"""
+        return get_spreadsheet()
     
     def get_sheet(self, sheet_name: str):
         """Get a specific worksheet by name"""
+        return self.worksheets.get(sheet_name)
+    
+    def _with_sheet(self, sheet_name: str, operation, kind: str = READ, idempotent: Optional[bool] = None):
+        """Run an API call on a worksheet, re-resolving a stale handle once
+        
+        The call goes through the quota scheduler as a read or a write;
+        pass idempotent=True for writes that are safe to repeat.
+        """
+        def run():
+            sheet = self.get_sheet(sheet_name)
+            return self.quota.call(kind, lambda: operation(sheet), idempotent)
+        
         try:
-            return self.spreadsheet.worksheet(sheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            # Create the sheet if it doesn't exist
-            return self.spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=20)
+            return run()
+        except Exception as e:
+            if not is_missing_worksheet_error(e):
+                raise
+            # The tab was deleted or recreated behind our back
+            self.worksheets.forget(sheet_name)
+            self.cache.invalidate(sheet_name)
+            self.row_index.invalidate(sheet_name)
+            return run()
+    
+    def _read_values(self, sheet_name: str) -> List[List[Any]]:
+        """Download every cell of a worksheet, header row included"""
+        return self._with_sheet(sheet_name, lambda sheet: sheet.get_all_values())
+    
+    def _read_tabs(self, sheet_names: List[str]) -> Dict[str, List[List[Any]]]:
+        """Download every cell of several worksheets with a single batch read"""
+        if not sheet_names:
+            return {}
+        ranges = [gspread.utils.absolute_range_name(sheet_name) for sheet_name in sheet_names]
+        try:
+            response = self.quota.call(READ, lambda: self.spreadsheet.values_batch_get(ranges))
+        except Exception as e:
+            if not is_missing_worksheet_error(e):
+                raise
+            return self._parallel(self._read_values, sheet_names)
+        return {
+            sheet_name: value_range.get("values", [])
+            for sheet_name, value_range in zip(sheet_names, response.get("valueRanges", []))
+        }
+    
+    def _create_tab(self, sheet_name: str, headers: List[str]) -> None:
+        """Create a worksheet with a header row unless it has one already"""
+        try:
+            existing = self.worksheets.get_headers(sheet_name)
+        except gspread.exceptions.APIError:
+            # Another worker created the tab first
+            self.worksheets.forget(sheet_name)
+            existing = self.worksheets.get_headers(sheet_name)
+        if not existing:
+            self._append_rows(sheet_name, [headers])
+            self.worksheets.set_headers(sheet_name, headers)
+            # Records cached while the tab had no header row are unusable
+            self.cache.invalidate(sheet_name)
+    
+    def _read_rows_after(self, sheet_name: str, known_rows: int) -> List[List[Any]]:
+        """Read the data rows that follow the first known_rows ones"""
+        width = max(len(self.worksheets.get_headers(sheet_name)), 1)
+        last_column = gspread.utils.rowcol_to_a1(1, width)[:-1]
+        first_row = known_rows + 2
+        try:
+            return self._with_sheet(
+                sheet_name, lambda sheet: sheet.get(f"A{first_row}:{last_column}")
+            )
+        except gspread.exceptions.APIError as e:
+            # Nothing was appended past the end of the grid
+            if "exceeds grid limits" in str(e):
+                return []
+            raise
+    
+    def _ensure_seeded(self, sheet_name: str) -> None:
+        """Import a worksheet into the local store if that has not happened yet"""
+        try:
+            self.replicator.ensure_seeded(sheet_name)
+        except Exception as e:
+            # Serve what is stored locally; seeding is retried later
+            print(f"Error importing {sheet_name} from Google Sheets: {e}")
+        # Keeps picking up rows that other writers append
+        self.replicator.start()
+    
+    def _get_local_records(self, sheet_name: str) -> List[Dict[str, Any]]:
+        """Get records of a worksheet kept in the local store"""
+        self._ensure_seeded(sheet_name)
+        return self.local_store.records(sheet_name)
     
     def get_all_records(self, sheet_name: str) -> List[Dict[str, Any]]:
         """Get all records from a specific worksheet"""
-        sheet = self.get_sheet(sheet_name)
-        return sheet.get_all_records()
+        if sheet_name in self.local_store.sheets:
+            return self._get_local_records(sheet_name)
+        
+        records = self.cache.get(sheet_name)
+        if records is not None:
+            return records
+        
+        # Cache miss: download the sheet once and keep a copy, together
+        # with any other thread that misses at the same time
+        records = self.flights.do(f"records:{sheet_name}", lambda: self._download(sheet_name))
+        return [dict(record) for record in records]
+    
+    def _download(self, sheet_name: str) -> List[Dict[str, Any]]:
+        """Download and cache a worksheet unless a finished download just did"""
+        records = self.cache.get(sheet_name)
+        if records is not None:
+            return records
+        return self._store_download(sheet_name, self._read_values(sheet_name))
+    
+    def _store_download(self, sheet_name: str, values: List[List[Any]]) -> List[Dict[str, Any]]:
+        """Cache the records of a freshly downloaded worksheet"""
+        headers = values[0] if values else []
+        if self.worksheets.set_headers(sheet_name, headers):
+            print(f"Header layout of worksheet '{sheet_name}' changed")
+        records = [build_record(headers, row) for row in values[1:]]
+        self.cache.put(sheet_name, headers, records)
+        # A fresh download is also the cheapest moment to renumber rows
+        self.row_index.rebuild(sheet_name, headers, records)
+        return [dict(record) for record in records]
+    
+    def get_many_records(self, sheet_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get all records of several worksheets in one round trip
+        
+        Worksheets that are neither local nor cached are downloaded with
+        a single batch read. If that fails, e.g. because a tab does not
+        exist yet, they are read in parallel instead.
+        """
+        self._ensure_seeded_many([name for name in sheet_names if name in self.local_store.sheets])
+        records = {}
+        missing = []
+        for sheet_name in sheet_names:
+            if sheet_name in self.local_store.sheets:
+                records[sheet_name] = self.local_store.records(sheet_name)
+                continue
+            cached = self.cache.get(sheet_name)
+            if cached is None:
+                missing.append(sheet_name)
+            else:
+                records[sheet_name] = cached
+        if not missing:
+            return records
+        
+        downloaded = self.flights.do(f"batch:{','.join(missing)}", lambda: self._download_many(missing))
+        for sheet_name, sheet_records in downloaded.items():
+            records[sheet_name] = [dict(record) for record in sheet_records]
+        return records
+    
+    def _download_many(self, sheet_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Download and cache several worksheets with a single batch read"""
+        ranges = [gspread.utils.absolute_range_name(sheet_name) for sheet_name in sheet_names]
+        try:
+            response = self.quota.call(READ, lambda: self.spreadsheet.values_batch_get(ranges))
+        except Exception as e:
+            if not is_missing_worksheet_error(e):
+                raise
+            return self._parallel(self.get_all_records, sheet_names)
+        return {
+            sheet_name: self._store_download(sheet_name, value_range.get("values", []))
+            for sheet_name, value_range in zip(sheet_names, response.get("valueRanges", []))
+        }
+    
+    @staticmethod
+    def _parallel(read, sheet_names: List[str]) -> Dict[str, Any]:
+        """Run a per-worksheet read for several worksheets at once"""
+        if len(sheet_names) < 2:
+            return {sheet_name: read(sheet_name) for sheet_name in sheet_names}
+        # A short-lived pool, so forked workers never inherit its threads
+        with ThreadPoolExecutor(max_workers=min(len(sheet_names), MAX_PARALLEL_READS),
+                                thread_name_prefix="sheets-read") as pool:
+            return dict(zip(sheet_names, pool.map(read, sheet_names)))
+    
+    def _ensure_seeded_many(self, sheet_names: List[str]) -> None:
+        """Import several local-store worksheets, downloading them in parallel"""
+        pending = [name for name in sheet_names if not self.local_store.is_seeded(name)]
+        self._parallel(self._ensure_seeded, pending)
+        for sheet_name in sheet_names:
+            self._ensure_seeded(sheet_name)
+    
+    def iter_records_after(self, sheet_name: str, cursor: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Iterate over the records of a local-store worksheet after a page cursor
+        
+        Each record comes with the cursor that resumes past it. A cursor
+        from before the worksheet was reloaded raises StaleCursorError
+        (see LocalStore.iter_records_after).
+        """
+        self._ensure_seeded(sheet_name)
+        return self.local_store.iter_records_after(sheet_name, cursor)
+    
+    def get_columns(self, sheet_name: str, columns: List[str]) -> Dict[str, List[Any]]:
+        """Get only the named columns of a worksheet, one list per column
+        
+        Uses the cached records when there are any; otherwise only the
+        named columns are downloaded, in a single batch read located by
+        the cached header row. Unknown columns come back as blanks.
+        """
+        if sheet_name in self.local_store.sheets:
+            self._ensure_seeded(sheet_name)
+            return self.local_store.columns(sheet_name, columns)
+        
+        projected = self.cache.columns(sheet_name, columns)
+        if projected is not None:
+            return projected
+        
+        headers = self.worksheets.get_headers(sheet_name)
+        known = [name for name in columns if name in headers]
+        values = {}
+        if known:
+            ranges = []
+            for name in known:
+                letter = gspread.utils.rowcol_to_a1(1, headers.index(name) + 1)[:-1]
+                ranges.append(gspread.utils.absolute_range_name(sheet_name, f"{letter}2:{letter}"))
+            response = self.flights.do(
+                f"columns:{sheet_name}:{','.join(known)}",
+                lambda: self.quota.call(READ, lambda: self.spreadsheet.values_batch_get(
+                    ranges, params={"majorDimension": "COLUMNS"}
+                ))
+            )
+            for name, value_range in zip(known, response.get("valueRanges", [])):
+                cells = value_range.get("values", [[]])
+                values[name] = numericise_all(cells[0] if cells else [], default_blank="")
+        
+        # Trailing blank cells are not returned, so even out the lengths
+        length = max((len(column) for column in values.values()), default=0)
+        result = {}
+        for name in columns:
+            column = values.get(name, [])
+            result[name] = column + [""] * (length - len(column))
+        return result
     
     def append_row(self, sheet_name: str, row_data: List[Any]) -> None:
-        """Append a row to a specific worksheet"""
-        sheet = self.get_sheet(sheet_name)
-        sheet.append_row(row_data)
-    
-    def update_row(self, sheet_name: str, row_index: int, row_data: List[Any]) -> None:
-        """Update a specific row in a worksheet"""
-        sheet = self.get_sheet(sheet_name)
-        # Convert to 1-based index for gspread
-        sheet.update_row(row_index + 1, row_data)
-    
-    def delete_row(self, sheet_name: str, row_index: int) -> None:
-        """Delete a specific row from a worksheet"""
-        sheet = self.get_sheet(sheet_name)
-        # Convert to 1-based index for gspread
-        sheet.delete_row(row_index + 1)
+        """Append a row to a specific worksheet
+        
+        Rows for worksheets kept in the local store are committed there
+        and replicated to Google Sheets in the background, payments to
+        the monthly tab of their timestamp. The other worksheets only
+        take occasional admin writes (doctors, users, the partition
+        catalog), which are written before this returns.
+        """
+        if sheet_name in self.local_store.sheets:
+            partition = self.partitions.partition_of(sheet_name, self.local_store.sheets[sheet_name], row_data)
+            self.local_store.insert(sheet_name, row_data, partition)
+            self.replicator.notify()
+            return
+        
+        self._append_rows(sheet_name, [row_data])
+        self.cache.append(sheet_name, row_data)
+        self.row_index.appended(sheet_name, row_data)
+    
+    def _append_rows(self, sheet_name: str, rows: List[List[Any]]) -> None:
+        """Write a batch of rows with a single API call"""
+        self._with_sheet(sheet_name, lambda sheet: sheet.append_rows(rows), WRITE)
+    
+    def _read_record(self, sheet_name: str, row_number: int) -> Dict[str, Any]:
+        """Read a single row of a worksheet as a record"""
+        values = self._with_sheet(sheet_name, lambda sheet: sheet.row_values(row_number))
+        return build_record(self.worksheets.get_headers(sheet_name), values)
+    
+    def _index_rows(self, sheet_name: str) -> List[Dict[str, Any]]:
+        """Make sure a worksheet's row numbers are indexed"""
+        records = self.get_all_records(sheet_name)
+        if not self.row_index.has(sheet_name):
+            self.row_index.rebuild(sheet_name, self.worksheets.get_headers(sheet_name), records)
+        return records
+    
+    def _find_row(self, sheet_name: str, record_id: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Find the row number and current values of a record
+        
+        The row number comes from the row index and is confirmed by
+        reading back that one row, so a built index costs a single
+        row read. If the row holds another record, rows were moved
+        behind our back (e.g. by another worker) and the index is
+        rebuilt from a fresh download.
+        """
+        if not self.row_index.has(sheet_name):
+            self._index_rows(sheet_name)
+        
+        row_number = self.row_index.lookup(sheet_name, record_id)
+        if row_number is not None:
+            record = self._read_record(sheet_name, row_number)
+            if str(record.get(ID_COLUMN, "")) == str(record_id):
+                return row_number, record
+        
+        self.cache.invalidate(sheet_name)
+        self.row_index.invalidate(sheet_name)
+        records = self._index_rows(sheet_name)
+        row_number = self.row_index.lookup(sheet_name, record_id)
+        if row_number is None:
+            return None
+        return row_number, records[row_number - FIRST_DATA_ROW]
+    
+    def update_row(self, sheet_name: str, row_number: int, row_data: List[Any],
+                   record_id: Any = None) -> None:
+        """Update a specific row in a worksheet
+        
+        row_number is the 1-based sheet row, so the first record is on
+        row 2. When the record ID is given the cached copy is patched
+        rather than dropped.
+        """
+        self._with_sheet(sheet_name, lambda sheet: sheet.update(values=[row_data], range_name=f"A{row_number}"), WRITE, idempotent=True)
+        if record_id is None:
+            self.cache.invalidate(sheet_name)
+        else:
+            self.cache.replace(sheet_name, row_number - FIRST_DATA_ROW, row_data, ID_COLUMN, record_id)
+    
+    def delete_row(self, sheet_name: str, row_number: int, record_id: Any = None) -> None:
+        """Delete a specific row (1-based) from a worksheet"""
+        self._with_sheet(sheet_name, lambda sheet: sheet.delete_rows(row_number), WRITE)
+        self.row_index.deleted(sheet_name, row_number)
+        if record_id is None:
+            self.cache.invalidate(sheet_name)
+        else:
+            self.cache.remove(sheet_name, row_number - FIRST_DATA_ROW, ID_COLUMN, record_id)
     
     def update_cell(self, sheet_name: str, row: int, col: int, value: Any) -> None:
-        """Update a specific cell in a worksheet"""
-        sheet = self.get_sheet(sheet_name)
-        # Convert to 1-based indices for gspread
-        sheet.update_cell(row + 1, col + 1, value)
+        """Update a specific cell (1-based row and column) in a worksheet"""
+        self._with_sheet(sheet_name, lambda sheet: sheet.update_cell(row, col, value), WRITE, idempotent=True)
+        self.cache.invalidate(sheet_name)
     
-    def get_dashboard_metrics(self) -> Dict[str, Any]:
-        """Get metrics for the admin dashboard"""
-        metrics = {
-            "total_bookings": 0,
-            "total_revenue": 0,
-            "active_subscriptions": 0,
-            "emergency_bookings": 0,
-            "revenue_by_country": {},
-            "bookings_by_doctor": {},
-            "recent_activity": []
-        }
+    def replace_rows(self, rows_by_sheet: Dict[str, List[List[Any]]]) -> None:
+        """Replace every data row of one or more worksheets
+        
+        Costs one metadata read, one batch clear and one batch values
+        write for all the worksheets together, however many rows they
+        hold. Header rows are left untouched.
+        """
+        sheets = {sheet_name: self.get_sheet(sheet_name) for sheet_name in rows_by_sheet}
+        for sheet_name in rows_by_sheet:
+            self.row_index.invalidate(sheet_name)
+        
+        # Cached handles keep the grid size they were opened with, which
+        # appends by other workers make stale
+        grids = self._grid_sizes()
+        
+        # Make room when the new data is taller than the grid
+        sizes = {}
+        for sheet_name, sheet in sheets.items():
+            row_count, col_count = grids.get(sheet_name, (sheet.row_count, sheet.col_count))
+            needed = len(rows_by_sheet[sheet_name]) + 1
+            if row_count < needed:
+                self.quota.call(WRITE, lambda: sheet.add_rows(needed - row_count))
+                row_count = needed
+            sizes[sheet_name] = (row_count, col_count)
+        
+        clear_ranges = [
+            gspread.utils.absolute_range_name(sheet_name, f"A2:{gspread.utils.rowcol_to_a1(row_count, col_count)}")
+            for sheet_name, (row_count, col_count) in sizes.items()
+            if row_count > 1
+        ]
+        if clear_ranges:
+            self.quota.call(WRITE, lambda: self.spreadsheet.values_batch_clear(body={"ranges": clear_ranges}), idempotent=True)
         
-        # Get payments data
-        payments = self.get_all_records("payments")
-        for payment in payments:
-            metrics["total_bookings"] += 1
-            amount = float(payment.get("amount", 0))
-            metrics["total_revenue"] += amount
-            
-            # Track revenue by country
-            country = payment.get("country", "Unknown")
-            if country not in metrics["revenue_by_country"]:
-                metrics["revenue_by_country"][country] = 0
-            metrics["revenue_by_country"][country] += amount
+        data = [
+            {"range": gspread.utils.absolute_range_name(sheet_name, "A2"), "values": rows}
+            for sheet_name, rows in rows_by_sheet.items()
+            if rows
+        ]
+        if data:
+            self.quota.call(WRITE, lambda: self.spreadsheet.values_batch_update(
+                body={"valueInputOption": "RAW", "data": data}
+            ), idempotent=True)
+    
+    def _grid_sizes(self) -> Dict[str, Tuple[int, int]]:
+        """Read the current row and column counts of every worksheet in one call"""
+        metadata = self.quota.call(READ, lambda: self.spreadsheet.fetch_sheet_metadata(
+            params={"fields": "sheets.properties(title,gridProperties(rowCount,columnCount))"}
+        ))
+        sizes = {}
+        for sheet in metadata.get("sheets", []):
+            properties = sheet.get("properties", {})
+            grid = properties.get("gridProperties", {})
+            sizes[properties.get("title")] = (grid.get("rowCount", 0), grid.get("columnCount", 0))
+        return sizes
+    
+    def migrate_partitions(self) -> Dict[str, int]:
+        """Move rows from each partitioned worksheet's own tab into its monthly tabs
+        
+        Rows without a usable timestamp stay in the original tab, which
+        also gets the columns its header row lacks, such as doctor_id,
+        filled in from the local store. Rows already copied by an
+        interrupted run are not copied twice, so the migration can simply
+        be run again. Returns how many rows moved per worksheet.
+        """
+        moved = {}
+        for sheet_name in self.local_store.sheets:
+            if not self.partitions.is_partitioned(sheet_name):
+                continue
+            # Pending rows land in their tabs before the original is rewritten
+            self._ensure_seeded(sheet_name)
+            self.replicator.replicate_once()
             
-            # Track bookings by doctor
-            doctor = payment.get("doctor_type", "Unknown")
-            if doctor not in metrics["bookings_by_doctor"]:
-                metrics["bookings_by_doctor"][doctor] = 0
-            metrics["bookings_by_doctor"][doctor] += 1
+            values = self._read_values(sheet_name)
+            headers, rows = (values[0], values[1:]) if values else ([], [])
+            # Columns the old tab lacks, such as doctor_id, come from the store
+            store_headers = self.local_store.sheets[sheet_name]
+            local_only = [header for header in store_headers if header not in headers]
+            stored = self.local_store.values_by_id(sheet_name, local_only) if local_only else {}
+            by_tab = {}
+            kept = []
+            for row in rows:
+                record = dict(zip(headers, row))
+                record.update(zip(local_only, stored.get(str(record.get("id", "")), ())))
+                tab = self.partitions.partition_of(sheet_name, headers, row)
+                if tab == sheet_name:
+                    kept.append([record.get(header, "") for header in headers + local_only])
+                    continue
+                by_tab.setdefault(tab, []).append([record.get(header, "") for header in store_headers])
             
-            # Track emergency bookings
-            if payment.get("emergency", False):
-                metrics["emergency_bookings"] += 1
+            # New tabs get the store's header row, doctor_id included
+            for tab in sorted(by_tab):
+                self.partitions.prepare(sheet_name, tab, store_headers)
+            copied = self._read_tabs(sorted(by_tab))
+            for tab in sorted(by_tab):
+                present = {_row_key(row) for row in copied.get(tab, [])[1:]}
+                missing = [
+                    row for row in self.replicator.to_sheet_layout(sheet_name, tab, by_tab[tab])
+                    if _row_key(row) not in present
+                ]
+                if missing:
+                    self._append_rows(tab, missing)
+            self.replace_rows({sheet_name: kept})
+            if local_only:
+                # The original tab gains those columns too, after its rows
+                # hold their values, so a reload no longer drops them
+                self.update_row(sheet_name, 1, headers + local_only)
+                self.worksheets.set_headers(sheet_name, headers + local_only)
+            moved[sheet_name] = len(rows) - len(kept)
             
-            # Add to recent activity
-            metrics["recent_activity"].append({
-                "date": payment.get("timestamp", ""),
-                "user": payment.get("name", "Unknown"),
-                "activity": f"Booked {doctor}",
-                "details": f"Amount: {amount}"
-            })
-        
-        # Get subscriptions data
-        subscriptions = self.get_all_records("subscriptions")
-        active_count = 0
-        for subscription in subscriptions:
-            expiry_date = subscription.get("expiry_date", "")
-            if expiry_date:
-                try:
-                    expiry = datetime.strptime(expiry_date, "%Y-%m-%d")
-                    if expiry > datetime.now():
-                        active_count += 1
-                except ValueError:
-                    pass
-        
-        metrics["active_subscriptions"] = active_count
-        
-        # Sort recent activity by date (newest first)
-        metrics["recent_activity"].sort(key=lambda x: x["date"], reverse=True)
-        
-        return metrics
+            # Reload the local copy tab by tab
+            self.replicator.verify(sheet_name, self.replicator.tabs(sheet_name))
+        return moved
+    
+    def get_version(self, sheet_names: List[str]) -> str:
+        """Get a version tag that changes whenever one of the worksheets changes
+        
+        Worksheets in the local store are versioned by the range of their
+        row sequence numbers, which moves with every committed, imported
+        or reseeded row. Other worksheets are versioned by a fingerprint
+        of their cached records and are downloaded first if the cache has
+        expired. Nothing is aggregated or serialized.
+        """
+        local = [name for name in sheet_names if name in self.local_store.sheets]
+        self._ensure_seeded_many(local)
+        expired = [
+            name for name in sheet_names
+            if name not in self.local_store.sheets and self.cache.version(name) is None
+        ]
+        if expired:
+            self.get_many_records(expired)
+        
+        versions = []
+        for sheet_name in sheet_names:
+            if sheet_name in self.local_store.sheets:
+                low, high = self.local_store.seq_bounds(sheet_name)
+                version = f"{low}:{high}"
+            else:
+                # Worksheets too large to cache are never reported unchanged
+                version = self.cache.version(sheet_name) or uuid.uuid4().hex
+            versions.append(f"{sheet_name}={version}")
+        return ";".join(versions)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get record cache hit/miss counters"""
+        return self.cache.stats()
+    
+    def get_flight_stats(self) -> Dict[str, Any]:
+        """Get how many concurrent reads were shared and the time that saved"""
+        return self.flights.stats()
+    
+    def get_quota_stats(self) -> Dict[str, Any]:
+        """Get the remaining Sheets API budget and throttling counters"""
+        return self.quota.stats()
+    
+    def get_replication_stats(self) -> Dict[str, Any]:
+        """Get the local store's replication backlog"""
+        return self.replicator.stats()
+    
+    def get_dashboard_metrics(self) -> Dict[str, Any]:
+        """Get metrics for the admin dashboard
+        
+        The totals are kept up to date as payments and subscriptions are
+        written, so only rows committed since the last call are read.
+        """
+        self._ensure_seeded_many(self.dashboard_feed.sheet_names)
+        with self.dashboard_feed.synced() as metrics:
+            snapshot = metrics.snapshot()
+            # Cursor for paging past the bounded feed with get_recent_activity
+            snapshot["recent_activity_cursor"] = metrics.activity_cursor()
+        return snapshot
+    
+    def get_recent_activity(self, before: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+        """Get payment activity older than a cursor, newest first"""
+        self._ensure_seeded("payments")
+        with self.payments_feed.synced() as index:
+            return index.activity_before(before, limit)
     
     def get_doctors(self) -> List[Dict[str, Any]]:
         """Get all doctors"""
@@ -142,209 +609,100 @@ class GoogleSheetsService:
     
     def add_doctor(self, doctor_data: Dict[str, Any]) -> Dict[str, Any]:
         """Add a new doctor"""
-        doctors = self.get_doctors()
+        ids = self.get_columns("doctors", ["id"])["id"]
         
         # Generate a new ID
-        new_id = str(len(doctors) + 1)
+        new_id = str(len(ids) + 1)
         doctor_data["id"] = new_id
         
-        # Prepare row data
-        row_data = [
-            new_id,
-            doctor_data.get("name", ""),
-            doctor_data.get("specialty", ""),
-            doctor_data.get("country", ""),
-            doctor_data.get("image_path", ""),
-            doctor_data.get("is_specialist", False),
-            doctor_data.get("rating", 5),
-            doctor_data.get("is_active", True)
-        ]
-        
         # Append to sheet
-        self.append_row("doctors", row_data)
+        self.append_row("doctors", Doctor.from_dict(doctor_data).to_row())
         
         return doctor_data
     
     def update_doctor(self, doctor_data: Dict[str, Any]) -> Dict[str, Any]:
         """Update an existing doctor"""
-        doctors = self.get_doctors()
         doctor_id = doctor_data.get("id")
+        found = self._find_row("doctors", doctor_id)
+        if found is None:
+            raise ValueError(f"Doctor with ID {doctor_id} not found")
+        row_number, _ = found
         
-        for i, doctor in enumerate(doctors):
-            if str(doctor.get("id")) == str(doctor_id):
-                # Prepare row data
-                row_data = [
-                    doctor_id,
-                    doctor_data.get("name", ""),
-                    doctor_data.get("specialty", ""),
-                    doctor_data.get("country", ""),
-                    doctor_data.get("image_path", ""),
-                    doctor_data.get("is_specialist", False),
-                    doctor_data.get("rating", 5),
-                    doctor_data.get("is_active", True)
-                ]
-                
-                # Update row (add 2 to account for header row and 0-indexing)
-                self.update_row("doctors", i + 2, row_data)
-                return doctor_data
-        
-        raise ValueError(f"Doctor with ID {doctor_id} not found")
+        row_data = Doctor.from_dict(doctor_data).to_row()
+        self.update_row("doctors", row_number, row_data, record_id=doctor_id)
+        return doctor_data
     
     def delete_doctor(self, doctor_id: str) -> bool:
         """Delete a doctor"""
-        doctors = self.get_doctors()
-        
-        for i, doctor in enumerate(doctors):
-            if str(doctor.get("id")) == str(doctor_id):
-                # Delete row (add 2 to account for header row and 0-indexing)
-                self.delete_row("doctors", i + 2)
-                return True
-        
-        return False
+        found = self._find_row("doctors", doctor_id)
+        if found is None:
+            return False
+        row_number, _ = found
+        self.delete_row("doctors", row_number, record_id=doctor_id)
+        return True
     
     def get_payments(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get payments with optional date filtering"""
-        payments = self.get_all_records("payments")
+        """Get payments with optional date filtering
         
-        if start_date or end_date:
-            filtered_payments = []
-            for payment in payments:
-                payment_date = payment.get("timestamp", "")
-                if not payment_date:
-                    continue
-                
-                try:
-                    payment_datetime = datetime.strptime(payment_date, "%Y-%m-%d %H:%M:%S")
-                    
-                    if start_date:
-                        start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-                        if payment_datetime < start_datetime:
-                            continue
-                    
-                    if end_date:
-                        end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
-                        if payment_datetime > end_datetime:
-                            continue
-                    
-                    filtered_payments.append(payment)
-                except ValueError:
-                    # Skip payments with invalid dates
-                    continue
-            
-            return filtered_payments
+        Date-ranged queries are answered from a timestamp-ordered index,
+        so they cost a binary search plus the size of the result.
+        """
+        if not (start_date or end_date):
+            return self.get_all_records("payments")
         
-        return payments
+        start_datetime = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end_datetime = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+        
+        self._ensure_seeded("payments")
+        with self.payments_feed.synced() as index:
+            return index.between(start_datetime, end_datetime)
     
     def get_doctor_earnings(self, doctor_id: str) -> Dict[str, Any]:
         """Get earnings for a specific doctor"""
-        payments = self.get_all_records("payments")
-        
-        total_earnings = 0
-        payment_count = 0
-        earnings_by_date = {}
-        
-        for payment in payments:
-            if str(payment.get("doctor_id")) == str(doctor_id):
-                amount = float(payment.get("amount", 0))
-                total_earnings += amount
-                payment_count += 1
-                
-                # Track earnings by date
-                date = payment.get("timestamp", "")[:10]  # Extract YYYY-MM-DD
-                if date not in earnings_by_date:
-                    earnings_by_date[date] = 0
-                earnings_by_date[date] += amount
-        
-        return {
-            "doctor_id": doctor_id,
-            "total_earnings": total_earnings,
-            "payment_count": payment_count,
-            "earnings_by_date": earnings_by_date
-        }
+        self._ensure_seeded("payments")
+        with self.earnings_feed.synced() as index:
+            return index.doctor_earnings(doctor_id)
+    
+    def get_top_earners(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the doctors with the highest earnings"""
+        self._ensure_seeded("payments")
+        with self.earnings_feed.synced() as index:
+            return index.top_earners(limit)
+    
+    def get_customer_payments(self, phone: str) -> List[Dict[str, Any]]:
+        """Get all payments made from a phone number"""
+        self._ensure_seeded("payments")
+        with self.payments_feed.synced() as index:
+            return index.for_phone(phone)
+    
+    def get_country_payments(self, country: str) -> List[Dict[str, Any]]:
+        """Get all payments made in a country"""
+        self._ensure_seeded("payments")
+        with self.payments_feed.synced() as index:
+            return index.for_country(country)
     
     def get_subscriptions(self) -> List[Dict[str, Any]]:
         """Get all subscriptions"""
         return self.get_all_records("subscriptions")
     
-    def get_revenue_data(self, period: str = "all") -> Dict[str, Any]:
-        """Get revenue data with period filtering"""
-        payments = self.get_all_records("payments")
-        subscriptions = self.get_all_records("subscriptions")
-        
-        now = datetime.now()
-        revenue_data = {
-            "total_revenue": 0,
-            "booking_revenue": 0,
-            "subscription_revenue": 0,
-            "revenue_by_country": {},
-            "revenue_by_month": {},
-            "revenue_by_day": {}
-        }
-        
-        # Filter by period
-        filtered_payments = []
-        for payment in payments:
-            payment_date = payment.get("timestamp", "")
-            if not payment_date:
-                continue
-            
-            try:
-                payment_datetime = datetime.strptime(payment_date, "%Y-%m-%d %H:%M:%S")
-                
-                if period == "year":
-                    if payment_datetime.year != now.year:
-                        continue
-                elif period == "month":
-                    if payment_datetime.year != now.year or payment_datetime.month != now.month:
-                        continue
-                elif period == "week":
-                    # Simple approximation for "this week"
-                    days_diff = (now - payment_datetime).days
-                    if days_diff > 7:
-                        continue
-                
-                filtered_payments.append(payment)
-            except ValueError:
-                # Skip payments with invalid dates
-                continue
+    def get_revenue_data(self, period: str = "all", start_date: Optional[str] = None,
+                         end_date: Optional[str] = None, granularity: Optional[str] = None) -> Dict[str, Any]:
+        """Get revenue data for a named period or an inclusive date range
+        
+        Revenue is read from daily rollups that are updated as payments
+        are written, so any range costs the same regardless of history.
+        start_date and end_date (YYYY-MM-DD) take precedence over period.
+        Per-day revenue is only built for granularity "day", under
+        revenue_by_period.
+        """
+        start, end = period_bounds(period)
+        if start_date or end_date:
+            start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+            end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
         
-        # Process payments
-        for payment in filtered_payments:
-            amount = float(payment.get("amount", 0))
-            revenue_data["total_revenue"] += amount
-            
-            # Determine if booking or subscription
-            if payment.get("package_type", "").lower() == "subscription":
-                revenue_data["subscription_revenue"] += amount
-            else:
-                revenue_data["booking_revenue"] += amount
-            
-            # Track revenue by country
-            country = payment.get("country", "Unknown")
-            if country not in revenue_data["revenue_by_country"]:
-                revenue_data["revenue_by_country"][country] = 0
-            revenue_data["revenue_by_country"][country] += amount
-            
-            # Track revenue by month
-            payment_date = payment.get("timestamp", "")
-            if payment_date:
-                try:
-                    payment_datetime = datetime.strptime(payment_date, "%Y-%m-%d %H:%M:%S")
-                    month_key = f"{payment_datetime.year}-{payment_datetime.month:02d}"
-                    
-                    if month_key not in revenue_data["revenue_by_month"]:
-                        revenue_data["revenue_by_month"][month_key] = 0
-                    revenue_data["revenue_by_month"][month_key] += amount
-                    
-                    # Track revenue by day
-                    day_key = f"{payment_datetime.year}-{payment_datetime.month:02d}-{payment_datetime.day:02d}"
-                    if day_key not in revenue_data["revenue_by_day"]:
-                        revenue_data["revenue_by_day"][day_key] = 0
-                    revenue_data["revenue_by_day"][day_key] += amount
-                except ValueError:
-                    pass
-        
-        return revenue_data
+        self._ensure_seeded("payments")
+        with self.revenue_feed.synced() as rollup:
+            return rollup.query(start, end, granularity)
     
     def get_consultation_fees(self) -> List[Dict[str, Any]]:
         """Get consultation fees for all countries"""
@@ -353,36 +711,33 @@ class GoogleSheetsService:
     def update_consultation_fees(self, fees_data: List[Dict[str, Any]]) -> bool:
         """Update consultation fees"""
         try:
-            sheet = self.get_sheet("consultation_fees")
-            
-            # Clear existing data (except header)
-            rows = sheet.row_count
-            if rows > 1:
-                sheet.delete_rows(2, rows)
-            
-            # Add updated data
-            for fee in fees_data:
-                row_data = [
+            # Write all fees in one batch instead of one append per fee
+            fee_rows = [
+                [
                     fee.get("id", ""),
                     fee.get("country", ""),
                     fee.get("general_fee", 0),
                     fee.get("specialist_fee", 0),
                     fee.get("currency", "")
                 ]
-                sheet.append_row(row_data)
+                for fee in fees_data
+            ]
+            self.replace_rows({"consultation_fees": fee_rows})
             
             return True
         except Exception as e:
             print(f"Error updating consultation fees: {e}")
             return False
+        finally:
+            self.cache.invalidate("consultation_fees")
     
     def get_care_plans(self) -> List[Dict[str, Any]]:
         """Get all care plans"""
-        plans = self.get_all_records("care_plans")
-        
-        # Get features and prices from related sheets
-        features = self.get_all_records("care_plan_features")
-        prices = self.get_all_records("care_plan_prices")
+        # Plans, features and prices come back in one batch read
+        sheets = self.get_many_records(["care_plans", "care_plan_features", "care_plan_prices"])
+        plans = sheets["care_plans"]
+        features = sheets["care_plan_features"]
+        prices = sheets["care_plan_prices"]
         
         # Organize features and prices by plan ID
         features_by_plan = {}
@@ -417,52 +772,50 @@ class GoogleSheetsService:
     def update_care_plans(self, plans_data: List[Dict[str, Any]]) -> bool:
         """Update care plans"""
         try:
-            # Update main care plans
-            plans_sheet = self.get_sheet("care_plans")
-            features_sheet = self.get_sheet("care_plan_features")
-            prices_sheet = self.get_sheet("care_plan_prices")
-            
-            # Clear existing data (except headers)
-            for sheet in [plans_sheet, features_sheet, prices_sheet]:
-                rows = sheet.row_count
-                if rows > 1:
-                    sheet.delete_rows(2, rows)
-            
-            # Add updated data
+            plan_rows = []
+            feature_rows = []
+            price_rows = []
             for plan in plans_data:
                 # Add plan
-                plan_row = [
+                plan_rows.append([
                     plan.get("id", ""),
                     plan.get("name", ""),
                     plan.get("description", ""),
                     plan.get("duration_days", 30),
                     plan.get("is_active", True)
-                ]
-                plans_sheet.append_row(plan_row)
+                ])
                 
                 # Add features
                 for feature in plan.get("features", []):
-                    feature_row = [
+                    feature_rows.append([
                         feature.get("id", ""),
                         plan.get("id", ""),
                         feature.get("description", "")
-                    ]
-                    features_sheet.append_row(feature_row)
+                    ])
                 
                 # Add prices
                 for price in plan.get("prices", []):
-                    price_row = [
+                    price_rows.append([
                         plan.get("id", ""),
                         price.get("country", ""),
                         price.get("price", 0),
                         price.get("currency", "")
-                    ]
-                    prices_sheet.append_row(price_row)
+                    ])
+            
+            # All three tabs go out in the same batch request
+            self.replace_rows({
+                "care_plans": plan_rows,
+                "care_plan_features": feature_rows,
+                "care_plan_prices": price_rows
+            })
             
             return True
         except Exception as e:
             print(f"Error updating care plans: {e}")
             return False
+        finally:
+            for sheet_name in ["care_plans", "care_plan_features", "care_plan_prices"]:
+                self.cache.invalidate(sheet_name)
     
     def get_users(self) -> List[Dict[str, Any]]:
         """Get all users"""
@@ -470,10 +823,10 @@ class GoogleSheetsService:
     
     def add_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Add a new user"""
-        users = self.get_users()
+        ids = self.get_columns("users", ["id"])["id"]
         
         # Generate a new ID
-        new_id = str(len(users) + 1)
+        new_id = str(len(ids) + 1)
         user_data["id"] = new_id
         
         # Prepare permissions
@@ -515,85 +868,52 @@ class GoogleSheetsService:
                     "settings": False
                 }
         
-        # Prepare row data
-        row_data = [
-            new_id,
-            user_data.get("name", ""),
-            user_data.get("email", ""),
-            user_data.get("password", ""),  # In a real app, this should be hashed
-            user_data.get("role", "sales"),
-            permissions.get("dashboard", False),
-            permissions.get("doctors", False),
-            permissions.get("payments", False),
-            permissions.get("subscriptions", False),
-            permissions.get("revenue", False),
-            permissions.get("consultation_fees", False),
-            permissions.get("care_plans", False),
-            permissions.get("settings", False)
-        ]
-        
-        # Append to sheet
-        self.append_row("users", row_data)
-        
         # Return user data with permissions
         user_data["permissions"] = permissions
+        
+        # The password is stored as given; in a real app it should be hashed
+        self.append_row("users", User.from_dict(user_data).to_row())
         return user_data
     
     def update_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Update an existing user"""
-        users = self.get_users()
         user_id = user_data.get("id")
-        
-        for i, user in enumerate(users):
-            if str(user.get("id")) == str(user_id):
-                permissions = user_data.get("permissions", {})
-                
-                # Prepare row data
-                row_data = [
-                    user_id,
-                    user_data.get("name", user.get("name", "")),
-                    user_data.get("email", user.get("email", "")),
-                    user.get("password", ""),  # Don't update password here
-                    user_data.get("role", user.get("role", "sales")),
-                    permissions.get("dashboard", False),
-                    permissions.get("doctors", False),
-                    permissions.get("payments", False),
-                    permissions.get("subscriptions", False),
-                    permissions.get("revenue", False),
-                    permissions.get("consultation_fees", False),
-                    permissions.get("care_plans", False),
-                    permissions.get("settings", False)
-                ]
-                
-                # Update row (add 2 to account for header row and 0-indexing)
-                self.update_row("users", i + 2, row_data)
-                return user_data
-        
-        raise ValueError(f"User with ID {user_id} not found")
+        found = self._find_row("users", user_id)
+        if found is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        row_number, user = found
+        
+        updated = User.from_dict(user_data)
+        for name in ("name", "email", "role"):
+            if name not in user_data:
+                setattr(updated, name, user.get(name, User.DEFAULTS.get(name, "")))
+        # Don't update password here
+        updated.password = user.get("password", "")
+        row_data = updated.to_row()
+        
+        self.update_row("users", row_number, row_data, record_id=user_id)
+        return user_data
     
     def delete_user(self, user_id: str) -> bool:
         """Delete a user"""
-        users = self.get_users()
-        
-        for i, user in enumerate(users):
-            if str(user.get("id")) == str(user_id):
-                # Delete row (add 2 to account for header row and 0-indexing)
-                self.delete_row("users", i + 2)
-                return True
-        
-        return False
+        found = self._find_row("users", user_id)
+        if found is None:
+            return False
+        row_number, _ = found
+        self.delete_row("users", row_number, record_id=user_id)
+        return True
     
     def change_password(self, user_id: str, new_password: str) -> bool:
         """Change a user's password"""
-        users = self.get_users()
-        
-        for i, user in enumerate(users):
-            if str(user.get("id")) == str(user_id):
-                # Update password cell (add 2 to account for header row and 0-indexing)
-                self.update_cell("users", i + 2, 4, new_password)  # Assuming password is in column 4
-                return True
+        found = self._find_row("users", user_id)
+        if found is None:
+            return False
+        row_number, _ = found
         
-        return False
+        headers = self.worksheets.get_headers("users")
+        column = headers.index("password") + 1 if "password" in headers else 4
+        self.update_cell("users", row_number, column, new_password)
+        return True
 
 
 # Create a singleton instance
@@ -0,0 +1,607 @@
+"""
+Local SQLite store for Pona Health bookings, payments and subscriptions
+
+This module is the system of record for rows written by the request
+path. Every write is committed to an embedded SQLite database (WAL mode)
+first and shipped to the matching Google Sheets worksheet later by the
+replicator, so a slow or unavailable spreadsheet never loses a booking.
+Cells are stored as written and only converted to numbers when read
+back, so values such as phone numbers with a leading zero reach the
+sheet unchanged. Rows of a worksheet split into several tabs remember
+their tab in the _partition column; NULL stands for the worksheet's own
+tab.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from gspread.utils import numericise
+from .sheets_cache import cell_converter, cell_text, record_builder
+
+# Constants
+LOCAL_STORE_PATH = os.environ.get(
+    "LOCAL_STORE_PATH", os.path.join(os.path.dirname(__file__), "local_store.db")
+)
+
+# Worksheets kept in the local store, with their header rows
+LOCAL_SHEETS = {
+    "bookings": ["id", "name", "phone", "doctor_type", "emergency", "country", "timestamp"],
+    "payments": ["id", "name", "phone", "payment_method", "amount", "package_type", "doctor_type", "emergency", "country", "timestamp", "doctor_id"],
+    "subscriptions": ["id", "name", "phone", "package", "amount", "payment_method", "coupon", "start_date", "expiry_date", "timestamp"],
+}
+
+# A claimed batch that is not confirmed within this time is retried
+CLAIM_TIMEOUT_SECONDS = 300
+
+
+class StaleCursorError(Exception):
+    """A page cursor was issued before the worksheet was reloaded"""
+
+
+def _quote(name: str) -> str:
+    """Quote an identifier for use in SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _stored(value: Any) -> Any:
+    """Keep a cell as written; SQLite has no booleans, so those become text"""
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        return value
+    return cell_text(value)
+
+
+def _comparable(value: Any) -> str:
+    """Render a stored cell the way the sheet displays it, for comparisons"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return cell_text(value)
+
+
+class LocalStore:
+    """SQLite tables mirroring the append-only worksheets"""
+
+    def __init__(self, path: str = LOCAL_STORE_PATH, sheets: Dict[str, List[str]] = LOCAL_SHEETS):
+        self.path = path
+        self.sheets = sheets
+        self._local = threading.local()
+        self._create_tables()
+        # SQLite connections must not cross a fork
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self) -> None:
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_tables(self) -> None:
+        connection = self._connect()
+        connection.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)")
+        for sheet_name, headers in self.sheets.items():
+            columns = ", ".join(_quote(header) for header in headers)
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {_quote(sheet_name)} ("
+                f"_seq INTEGER PRIMARY KEY AUTOINCREMENT, {columns}, "
+                f"_replicated INTEGER NOT NULL DEFAULT 0, _claim TEXT, _claimed_at REAL, "
+                f"_partition TEXT)"
+            )
+            # Columns added to LOCAL_SHEETS after the table was created
+            existing = {row[1] for row in connection.execute(f"PRAGMA table_info({_quote(sheet_name)})")}
+            for header in headers:
+                if header not in existing:
+                    connection.execute(
+                        f"ALTER TABLE {_quote(sheet_name)} ADD COLUMN {_quote(header)} DEFAULT ''"
+                    )
+            if "_partition" not in existing:
+                connection.execute(f"ALTER TABLE {_quote(sheet_name)} ADD COLUMN _partition TEXT")
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(sheet_name + '_partition')} "
+                f"ON {_quote(sheet_name)} (_partition)"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(sheet_name + '_pending')} "
+                f"ON {_quote(sheet_name)} (_replicated, _seq)"
+            )
+            if "id" in headers:
+                # Matches rows read back from the sheet against local ones
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_quote(sheet_name + '_id')} "
+                    f"ON {_quote(sheet_name)} (\"id\")"
+                )
+
+    def _values(self, sheet_name: str, row_data: List[Any]) -> List[Any]:
+        """Fit a row to the stored columns, keeping its cells as written"""
+        headers = self.sheets[sheet_name]
+        values = [_stored(value) for value in row_data[:len(headers)]]
+        return values + [""] * (len(headers) - len(values))
+
+    @staticmethod
+    def _partition(sheet_name: str, partition: Optional[str]) -> Optional[str]:
+        """Stored value of a row's tab: NULL for the worksheet's own tab"""
+        return None if partition in (None, sheet_name) else partition
+
+    def _in_partition(self, sheet_name: str, partition: Optional[str]) -> Tuple[str, tuple]:
+        """SQL condition (with a leading AND) limiting rows to one tab, or to every tab if None"""
+        if partition is None:
+            return "", ()
+        return " AND _partition IS ?", (self._partition(sheet_name, partition),)
+
+    def insert(self, sheet_name: str, row_data: List[Any], partition: Optional[str] = None) -> int:
+        """Commit a new row and return its sequence number
+
+        partition names the tab the row is to be replicated to, when the
+        worksheet is split into several.
+        """
+        headers = self.sheets[sheet_name]
+        columns = ", ".join(_quote(header) for header in headers)
+        placeholders = ", ".join("?" for _ in headers)
+        cursor = self._connect().execute(
+            f"INSERT INTO {_quote(sheet_name)} ({columns}, _partition) VALUES ({placeholders}, ?)",
+            self._values(sheet_name, row_data) + [self._partition(sheet_name, partition)]
+        )
+        return cursor.lastrowid
+
+    def records(self, sheet_name: str) -> List[Dict[str, Any]]:
+        """Get all rows of a worksheet as records, oldest first"""
+        headers = self.sheets[sheet_name]
+        columns = ", ".join(_quote(header) for header in headers)
+        rows = self._connect().execute(
+            f"SELECT {columns} FROM {_quote(sheet_name)} ORDER BY _seq"
+        ).fetchall()
+        build = record_builder(headers)
+        return [build(row) for row in rows]
+
+    def generation(self, sheet_name: str) -> int:
+        """Count the reloads of a worksheet; each one renumbers its rows"""
+        row = self._connect().execute(
+            "SELECT value FROM _meta WHERE key = ?", (f"generation:{sheet_name}",)
+        ).fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def iter_records_after(self, sheet_name: str, cursor: Optional[str] = None,
+                           batch_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Get the rows after a page cursor, each with the cursor that resumes past it
+
+        A cursor is the worksheet's generation and a sequence number, so
+        the rows before it are skipped by the primary key, not read. A
+        reload renumbers the rows; a cursor issued before one raises
+        StaleCursorError here rather than skipping or repeating rows.
+        Raises ValueError for a malformed cursor.
+        """
+        expected, seq = None, None
+        if cursor is not None:
+            expected, seq = (int(part) for part in cursor.split(":"))
+        headers = self.sheets[sheet_name]
+        columns = ", ".join(["_seq"] + [_quote(header) for header in headers])
+        query = f"SELECT {columns} FROM {_quote(sheet_name)}"
+        params = ()
+        if seq is not None:
+            query += " WHERE _seq > ?"
+            params = (seq,)
+        while True:
+            generation = self.generation(sheet_name)
+            if expected is not None and expected != generation:
+                raise StaleCursorError(f"The {sheet_name} list changed; start again without a cursor")
+            rows_cursor = self._connect().execute(query + " ORDER BY _seq", params)
+            rows = rows_cursor.fetchmany(batch_size)
+            # While the query is open this reads the same snapshot as its
+            # rows; a reload in between means starting over
+            if self.generation(sheet_name) == generation:
+                break
+        return self._pages(rows_cursor, rows, record_builder(headers), generation, batch_size)
+
+    @staticmethod
+    def _pages(rows_cursor: sqlite3.Cursor, rows: List[tuple], build, generation: int,
+               batch_size: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        while rows:
+            for row in rows:
+                yield f"{generation}:{row[0]}", build(row[1:])
+            rows = rows_cursor.fetchmany(batch_size)
+
+    def columns(self, sheet_name: str, names: List[str]) -> Dict[str, List[Any]]:
+        """Get only the named columns of a worksheet, one list per column
+
+        Columns the worksheet does not have come back as blanks.
+        """
+        known = [name for name in names if name in self.sheets[sheet_name]]
+        if not known:
+            count = self._connect().execute(f"SELECT COUNT(*) FROM {_quote(sheet_name)}").fetchone()[0]
+            return {name: [""] * count for name in names}
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_quote(name) for name in known)} FROM {_quote(sheet_name)} ORDER BY _seq"
+        ).fetchall()
+        convert = cell_converter()
+        values = {
+            name: [convert(value) for value in column]
+            for name, column in zip(known, zip(*rows))
+        } if rows else {}
+        return {name: values.get(name, [""] * len(rows)) for name in names}
+
+    def records_after(self, sheet_name: str, seq: Optional[int] = None,
+                      names: Optional[List[str]] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """Get rows committed after a sequence number, with their sequence numbers
+
+        Pass names to read only those columns.
+        """
+        headers = self.sheets[sheet_name]
+        if names is not None:
+            headers = [header for header in headers if header in names]
+        columns = ", ".join(["_seq"] + [_quote(header) for header in headers])
+        query = f"SELECT {columns} FROM {_quote(sheet_name)}"
+        params = ()
+        if seq is not None:
+            query += " WHERE _seq > ?"
+            params = (seq,)
+        rows = self._connect().execute(query + " ORDER BY _seq", params).fetchall()
+        build = record_builder(headers)
+        return [(row[0], build(row[1:])) for row in rows]
+
+    def seq_bounds(self, sheet_name: str) -> Tuple[Optional[int], Optional[int]]:
+        """Get the lowest and highest sequence numbers of a worksheet's rows"""
+        return tuple(self._connect().execute(
+            f"SELECT MIN(_seq), MAX(_seq) FROM {_quote(sheet_name)}"
+        ).fetchone())
+
+    def claim_unreplicated(self, sheet_name: str, limit: int) -> List[Tuple[int, List[Any], str]]:
+        """Claim a batch of rows that still have to be sent to Google Sheets
+
+        Each row comes with its sequence number and the tab it goes to.
+        Claims are shared through the database, so several workers using
+        the same file never ship the same row twice.
+        """
+        headers = self.sheets[sheet_name]
+        table = _quote(sheet_name)
+        columns = ", ".join(_quote(header) for header in headers)
+        claim = uuid.uuid4().hex
+        now = time.time()
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                f"UPDATE {table} SET _claim = ?, _claimed_at = ? WHERE _seq IN ("
+                f"SELECT _seq FROM {table} WHERE _replicated = 0 "
+                f"AND (_claim IS NULL OR _claimed_at < ?) ORDER BY _seq LIMIT ?)",
+                (claim, now, now - CLAIM_TIMEOUT_SECONDS, limit)
+            )
+            rows = connection.execute(
+                f"SELECT _seq, _partition, {columns} FROM {table} WHERE _claim = ? ORDER BY _seq", (claim,)
+            ).fetchall()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return [(row[0], list(row[2:]), row[1] or sheet_name) for row in rows]
+
+    def mark_replicated(self, sheet_name: str, seqs: List[int]) -> None:
+        """Record that a claimed batch reached Google Sheets"""
+        self._connect().executemany(
+            f"UPDATE {_quote(sheet_name)} SET _replicated = 1, _claim = NULL WHERE _seq = ?",
+            [(seq,) for seq in seqs]
+        )
+
+    def release(self, sheet_name: str, seqs: List[int]) -> None:
+        """Give up a claim so the batch is retried"""
+        self._connect().executemany(
+            f"UPDATE {_quote(sheet_name)} SET _claim = NULL WHERE _seq = ?",
+            [(seq,) for seq in seqs]
+        )
+
+    def pending_count(self, sheet_name: str) -> int:
+        """Count rows not yet replicated to Google Sheets"""
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM {_quote(sheet_name)} WHERE _replicated = 0"
+        ).fetchone()[0]
+
+    def is_seeded(self, sheet_name: str) -> bool:
+        """Check whether the rows already in Google Sheets were imported"""
+        row = self._connect().execute(
+            "SELECT value FROM _meta WHERE key = ?", (f"seeded:{sheet_name}",)
+        ).fetchone()
+        return row is not None
+
+    def _shared_columns(self, sheet_name: str, headers: List[str]) -> List[str]:
+        """Stored columns that a tab with these headers also has
+
+        Columns added to LOCAL_SHEETS later, such as doctor_id, are
+        missing from older tabs and stay in the local store only, so rows
+        are compared on the shared columns alone.
+        """
+        return [header for header in self.sheets[sheet_name] if header in headers]
+
+    def _store_values(self, sheet_name: str, headers: List[str], row: List[Any]) -> List[Any]:
+        """Map a row read from the sheet onto the stored columns, cells unchanged"""
+        record = dict(zip(headers, (_stored(value) for value in row)))
+        return [record.get(header, "") for header in self.sheets[sheet_name]]
+
+    def known_rows(self, sheet_name: str) -> int:
+        """Count the data rows of a worksheet tab that have been read into the store"""
+        row = self._connect().execute(
+            "SELECT value FROM _meta WHERE key = ?", (f"sheet_rows:{sheet_name}",)
+        ).fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def _set_known_rows(self, sheet_name: str, count: int) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO _meta (key, value) VALUES (?, ?)",
+            (f"sheet_rows:{sheet_name}", str(count))
+        )
+
+    def import_rows(self, sheet_name: str, headers: List[str], rows: List[List[Any]], known: int,
+                    partition: Optional[str] = None) -> int:
+        """Import rows found in a worksheet tab after the first known ones
+
+        Rows this store wrote itself come back through the sheet too; they
+        are recognised and skipped. Returns how many rows were new.
+        """
+        tab = partition or sheet_name
+        store_headers = self.sheets[sheet_name]
+        table = _quote(sheet_name)
+        columns = ", ".join(_quote(header) for header in store_headers)
+        placeholders = ", ".join("?" for _ in store_headers)
+        imported = 0
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have imported these rows already
+            if self.known_rows(tab) != known:
+                connection.execute("ROLLBACK")
+                return 0
+            for row in rows:
+                values = self._store_values(sheet_name, headers, row)
+                if self._has_row(sheet_name, headers, values):
+                    continue
+                connection.execute(
+                    f"INSERT INTO {table} ({columns}, _replicated, _partition) VALUES ({placeholders}, 1, ?)",
+                    values + [self._partition(sheet_name, partition)]
+                )
+                imported += 1
+            self._set_known_rows(tab, known + len(rows))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return imported
+
+    def _has_row(self, sheet_name: str, headers: List[str], values: List[Any]) -> bool:
+        """Check for a stored row with the same cells as one read from a tab
+
+        Candidates are found by id, then compared on the tab's columns
+        the way the sheet displays them, since e.g. 5000.0 comes back as
+        "5000".
+        """
+        store_headers = self.sheets[sheet_name]
+        shared = self._shared_columns(sheet_name, headers)
+        if not shared:
+            return False
+        columns = ", ".join(_quote(header) for header in shared)
+        wanted = [_comparable(values[store_headers.index(header)]) for header in shared]
+        if "id" in store_headers:
+            row_id = values[store_headers.index("id")]
+            candidates = self._connect().execute(
+                f"SELECT {columns} FROM {_quote(sheet_name)} WHERE \"id\" IN (?, ?)",
+                (row_id, numericise(cell_text(row_id)))
+            )
+        else:
+            candidates = self._connect().execute(f"SELECT {columns} FROM {_quote(sheet_name)}")
+        return any([_comparable(value) for value in candidate] == wanted for candidate in candidates)
+
+    def values_by_id(self, sheet_name: str, names: List[str],
+                     partition: Optional[str] = None) -> Dict[str, Tuple[Any, ...]]:
+        """Get the stored cells of some columns of the replicated rows, by id
+
+        Ids are keyed the way the sheet displays them. Used to carry
+        columns a tab does not have, such as doctor_id, across a reload.
+        """
+        if "id" not in self.sheets[sheet_name]:
+            return {}
+        condition, params = self._in_partition(sheet_name, partition)
+        values = {}
+        for row in self._connect().execute(
+            f"SELECT \"id\", {', '.join(_quote(name) for name in names)} "
+            f"FROM {_quote(sheet_name)} WHERE _replicated = 1{condition}", params
+        ):
+            values.setdefault(_comparable(row[0]), row[1:])
+        return values
+
+    def checksum(self, sheet_name: str, partition: Optional[str] = None,
+                 headers: Optional[List[str]] = None) -> Tuple[int, int]:
+        """Get an order-independent checksum of the rows already in the sheet
+
+        Pass partition to cover only the rows of one tab, and the tab's
+        header row to cover only the columns it has.
+        """
+        if headers is None:
+            headers = self.sheets[sheet_name]
+        columns = ", ".join(_quote(header) for header in self._shared_columns(sheet_name, headers))
+        condition, params = self._in_partition(sheet_name, partition)
+        cursor = self._connect().execute(
+            f"SELECT {columns} FROM {_quote(sheet_name)} WHERE _replicated = 1{condition}", params
+        )
+        return _checksum(list(row) for row in cursor)
+
+    def sheet_checksum(self, sheet_name: str, headers: List[str], rows: List[List[Any]]) -> Tuple[int, int]:
+        """Get the checksum of rows read from a tab, comparable to checksum() with its headers"""
+        positions = [headers.index(header) for header in self._shared_columns(sheet_name, headers)]
+        return _checksum(
+            [_stored(row[position]) if position < len(row) else "" for position in positions]
+            for row in rows
+        )
+
+    def reseed(self, sheet_name: str, headers: List[str], rows: List[List[Any]],
+               partition: Optional[str] = None) -> bool:
+        """Replace every replicated row with a fresh copy of the sheet
+
+        Pass partition to replace only the rows of one tab. Columns the
+        tab does not have keep their stored values, matched by id.
+        Skipped, returning False, while a batch is being replicated,
+        since its rows may or may not be in the copy.
+        """
+        condition, params = self._in_partition(sheet_name, partition)
+        store_headers = self.sheets[sheet_name]
+        local_only = [header for header in store_headers if header not in headers]
+        table = _quote(sheet_name)
+        columns = ", ".join(_quote(header) for header in store_headers)
+        placeholders = ", ".join("?" for _ in store_headers)
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            claimed = connection.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE _replicated = 0 AND _claim IS NOT NULL"
+            ).fetchone()[0]
+            if claimed:
+                connection.execute("ROLLBACK")
+                return False
+            first = connection.execute(f"SELECT MIN(_seq) FROM {table}").fetchone()[0] or 0
+            kept = self.values_by_id(sheet_name, local_only, partition) if local_only else {}
+            connection.execute(f"DELETE FROM {table} WHERE _replicated = 1{condition}", params)
+            # New sequence numbers below every existing one, so followers
+            # see the change and the copy sorts before unreplicated rows
+            start = min(first, 0) - len(rows)
+            stored_partition = self._partition(sheet_name, partition)
+            copy = []
+            for position, row in enumerate(rows):
+                values = self._store_values(sheet_name, headers, row)
+                if kept:
+                    record = dict(zip(store_headers, values))
+                    record.update(zip(local_only, kept.get(_comparable(record["id"]), ())))
+                    values = [record[header] for header in store_headers]
+                copy.append([start + position] + values + [stored_partition])
+            connection.executemany(
+                f"INSERT INTO {table} (_seq, {columns}, _replicated, _partition) "
+                f"VALUES (?, {placeholders}, 1, ?)",
+                copy
+            )
+            self._set_known_rows(partition or sheet_name, len(rows))
+            connection.execute(
+                "INSERT OR REPLACE INTO _meta (key, value) VALUES (?, ?)",
+                (f"generation:{sheet_name}", str(self.generation(sheet_name) + 1))
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return True
+
+    def seed(self, sheet_name: str, tabs: Dict[str, List[List[Any]]]) -> bool:
+        """Import the rows already in Google Sheets, once per database
+
+        tabs maps each tab of the worksheet (usually just the worksheet
+        itself) to its values, header row first.
+        """
+        store_headers = self.sheets[sheet_name]
+        columns = ", ".join(_quote(header) for header in store_headers)
+        placeholders = ", ".join("?" for _ in store_headers)
+        # Imported rows take negative sequence numbers so they sort before
+        # anything written locally while the import was pending
+        total = sum(max(len(values) - 1, 0) for values in tabs.values())
+        values = []
+        for tab, tab_values in tabs.items():
+            headers, rows = (tab_values[0], tab_values[1:]) if tab_values else ([], [])
+            for row in rows:
+                values.append(
+                    [len(values) - total] + self._store_values(sheet_name, headers, row)
+                    + [self._partition(sheet_name, tab)]
+                )
+
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have seeded while we were downloading
+            if self.is_seeded(sheet_name):
+                connection.execute("ROLLBACK")
+                return False
+            connection.executemany(
+                f"INSERT INTO {_quote(sheet_name)} (_seq, {columns}, _replicated, _partition) "
+                f"VALUES (?, {placeholders}, 1, ?)",
+                values
+            )
+            connection.execute(
+                "INSERT INTO _meta (key, value) VALUES (?, ?)",
+                (f"seeded:{sheet_name}", str(len(values)))
+            )
+            for tab, tab_values in tabs.items():
+                self._set_known_rows(tab, max(len(tab_values) - 1, 0))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return True
+
+
+def _checksum(rows: Iterator[List[Any]]) -> Tuple[int, int]:
+    """Count rows and sum their digests, so row order does not matter"""
+    count = 0
+    total = 0
+    for row in rows:
+        count += 1
+        # 1000 and 1000.0 are the same cell once written to the sheet
+        cells = [_comparable(value) for value in row]
+        total += int(hashlib.sha1(repr(cells).encode("utf-8")).hexdigest()[:16], 16)
+    return count, total % (1 << 64)
+
+
+class StoreFollower:
+    """Feeds rows committed to the local store into an in-memory view
+
+    The view needs reset() and apply(sheet_name, record) methods, and
+    may offer apply_batch(sheet_name, records) to take many rows at once.
+    Rows are applied incrementally by sequence number; the view is
+    rebuilt from scratch on first use or when the table changes in a way
+    that cannot be followed, such as rows being imported ahead of it.
+    When columns maps a sheet to the columns the view reads, records
+    carry only those.
+    """
+
+    def __init__(self, store: LocalStore, sheet_names: List[str], view,
+                 columns: Optional[Dict[str, List[str]]] = None):
+        self.store = store
+        self.sheet_names = sheet_names
+        self.view = view
+        self.columns = columns or {}
+        self._last_seq = {}
+        self._first_seq = {}
+        self._lock = threading.RLock()
+
+    def sync(self) -> None:
+        """Apply rows committed since the last sync"""
+        with self._lock:
+            bounds = {name: self.store.seq_bounds(name) for name in self.sheet_names}
+            drifted = any(
+                name not in self._last_seq
+                or bounds[name][0] != self._first_seq[name]
+                or (bounds[name][1] or 0) < (self._last_seq[name] or 0)
+                for name in self.sheet_names
+            )
+            if drifted:
+                self.view.reset()
+                self._last_seq = {name: None for name in self.sheet_names}
+            apply_batch = getattr(self.view, "apply_batch", None)
+            for name in self.sheet_names:
+                rows = self.store.records_after(name, self._last_seq[name], self.columns.get(name))
+                if rows and apply_batch is not None:
+                    apply_batch(name, [record for _, record in rows])
+                else:
+                    for _, record in rows:
+                        self.view.apply(name, record)
+                if rows:
+                    self._last_seq[name] = rows[-1][0]
+                self._first_seq[name] = bounds[name][0]
+
+    @contextmanager
+    def synced(self):
+        """Sync, then hold the view steady while the caller reads it"""
+        with self._lock:
+            self.sync()
+            yield self.view
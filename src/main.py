@@ -8,53 +8,31 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
-import gspread
-from google.oauth2.service_account import Credentials
 import json
 import requests
 import os
 from datetime import datetime
 from .azampay_integration import process_payment
 from .admin_routes import admin_bp
+from .google_sheets_service import get_sheets_service
+from .sheet_records import Payment, Subscription
+from . import sheets_client
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
-# Google Sheets setup
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), "credentials.json")
-SHEET_ID = "1N38MVn9tIjtyvOhMcsHCoD5bELE5vmHmau7ZgDtSz1g"
+# Bookings, payments and subscriptions are committed to the local store
+# and replicated to Google Sheets in the background
+sheets_service = get_sheets_service()
 
-try:
-    credentials = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
-    client = gspread.authorize(credentials)
-    spreadsheet = client.open_by_key(SHEET_ID)
-    
-    # Get or create worksheets
-    try:
-        bookings_sheet = spreadsheet.worksheet("bookings")
-    except gspread.exceptions.WorksheetNotFound:
-        bookings_sheet = spreadsheet.add_worksheet(title="bookings", rows=1000, cols=20)
-        bookings_sheet.append_row(["id", "name", "phone", "doctor_type", "emergency", "country", "timestamp"])
-    
-    try:
-        payments_sheet = spreadsheet.worksheet("payments")
-    except gspread.exceptions.WorksheetNotFound:
-        payments_sheet = spreadsheet.add_worksheet(title="payments", rows=1000, cols=20)
-        payments_sheet.append_row(["id", "name", "phone", "payment_method", "amount", "package_type", "doctor_type", "emergency", "country", "timestamp"])
-    
-    try:
-        subscriptions_sheet = spreadsheet.worksheet("subscriptions")
-    except gspread.exceptions.WorksheetNotFound:
-        subscriptions_sheet = spreadsheet.add_worksheet(title="subscriptions", rows=1000, cols=20)
-        subscriptions_sheet.append_row(["id", "name", "phone", "package", "amount", "payment_method", "coupon", "start_date", "expiry_date", "timestamp"])
-    
-    print("Google Sheets connection established successfully")
-except Exception as e:
-    print(f"Error connecting to Google Sheets: {e}")
-    bookings_sheet = None
-    payments_sheet = None
-    subscriptions_sheet = None
+# Connect to Google Sheets in the background once workers are forked;
+# importing the app does no network I/O
+sheets_client.warm_up_after_fork()
+
+@app.before_request
+def warm_up_sheets():
+    """Start connecting to Google Sheets when a worker serves its first request"""
+    sheets_client.warm_up_in_background()
 
 # Register blueprints
 app.register_blueprint(admin_bp)
@@ -87,17 +65,16 @@ def create_booking():
         # Get current timestamp
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Store booking in Google Sheets
-        if bookings_sheet:
-            bookings_sheet.append_row([
-                booking_id,
-                data.get('name', 'Unknown'),
-                data.get('phone', 'Unknown'),
-                data.get('doctor_type', 'Unknown'),
-                data.get('emergency', False),
-                data.get('country', 'Unknown'),
-                now
-            ])
+        # Store booking (replicated to Google Sheets in the background)
+        sheets_service.append_row("bookings", [
+            booking_id,
+            data.get('name', 'Unknown'),
+            data.get('phone', 'Unknown'),
+            data.get('doctor_type', 'Unknown'),
+            data.get('emergency', False),
+            data.get('country', 'Unknown'),
+            now
+        ])
         
         return jsonify({
             "success": True,
@@ -123,20 +100,9 @@ def create_payment():
         # Get current timestamp
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Store payment info in Google Sheets
-        if payments_sheet:
-            payments_sheet.append_row([
-                payment_id,
-                data.get('name', 'Unknown'),
-                data.get('phone', 'Unknown'),
-                data.get('payment_method', 'Unknown'),
-                data.get('amount', 0),
-                data.get('package_type', 'Unknown'),
-                data.get('doctor_type', 'Unknown'),
-                data.get('emergency', False),
-                data.get('country', 'Unknown'),
-                now
-            ])
+        # Store payment info (replicated to Google Sheets in the background)
+        payment = Payment.from_dict(dict(data, id=payment_id, timestamp=now))
+        sheets_service.append_row("payments", payment.to_row())
         
         return jsonify({
             "success": True,
@@ -178,20 +144,9 @@ def azampay_checkout():
             # Get current timestamp
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            # Store payment info in Google Sheets
-            if payments_sheet:
-                payments_sheet.append_row([
-                    payment_id,
-                    data.get('name', 'Unknown'),
-                    data.get('phone', 'Unknown'),
-                    data.get('payment_method', 'Unknown'),
-                    amount,
-                    data.get('package_type', 'Unknown'),
-                    data.get('doctor_type', 'Unknown'),
-                    data.get('emergency', False),
-                    data.get('country', 'Unknown'),
-                    now
-                ])
+            # Store payment info (replicated to Google Sheets in the background)
+            payment = Payment.from_dict(dict(data, id=payment_id, amount=amount, timestamp=now))
+            sheets_service.append_row("payments", payment.to_row())
             
             # If it's a subscription, store in subscriptions sheet
             if data.get('package_type', '').lower() == 'subscription':
@@ -203,19 +158,16 @@ def azampay_checkout():
                     day=min(datetime.now().day + 30, 28)  # Simple approximation
                 ).strftime("%Y-%m-%d")
                 
-                if subscriptions_sheet:
-                    subscriptions_sheet.append_row([
-                        payment_id,
-                        data.get('name', 'Unknown'),
-                        data.get('phone', 'Unknown'),
-                        package.get('name', 'Unknown'),
-                        amount,
-                        data.get('payment_method', 'Unknown'),
-                        data.get('coupon', ''),
-                        start_date,
-                        expiry_date,
-                        now
-                    ])
+                subscription = Subscription.from_dict(dict(
+                    data,
+                    id=payment_id,
+                    package=package.get('name', 'Unknown'),
+                    amount=amount,
+                    start_date=start_date,
+                    expiry_date=expiry_date,
+                    timestamp=now
+                ))
+                sheets_service.append_row("subscriptions", subscription.to_row())
             
             return jsonify({
                 "success": True,
@@ -274,20 +226,15 @@ def create_subscription():
             day=min(datetime.now().day + 30, 28)  # Simple approximation
         ).strftime("%Y-%m-%d")
         
-        # Store subscription in Google Sheets
-        if subscriptions_sheet:
-            subscriptions_sheet.append_row([
-                subscription_id,
-                data.get('name', 'Unknown'),
-                data.get('phone', 'Unknown'),
-                data.get('package', 'Unknown'),
-                data.get('amount', 0),
-                data.get('payment_method', 'Unknown'),
-                data.get('coupon', ''),
-                start_date,
-                expiry_date,
-                now
-            ])
+        # Store subscription (replicated to Google Sheets in the background)
+        subscription = Subscription.from_dict(dict(
+            data,
+            id=subscription_id,
+            start_date=start_date,
+            expiry_date=expiry_date,
+            timestamp=now
+        ))
+        sheets_service.append_row("subscriptions", subscription.to_row())
         
         return jsonify({
             "success": True,
@@ -0,0 +1,308 @@
+"""
+Columnar payments store for Pona Health Admin Dashboard
+
+This module keeps payments as typed NumPy column arrays: int64 epoch
+seconds, float64 amounts and dictionary-encoded country, doctor and
+package codes. Revenue by day, month, country and package, and doctor
+earnings, are computed with vectorized group-by reductions over a
+timestamp-sorted slice instead of Python loops over record dicts.
+
+This is the view that serves revenue and earnings; numpy is pinned in
+requirements.txt. NumPy is still optional: without it HAVE_NUMPY is
+False and the service falls back to the pure-Python RevenueRollup and
+PaymentIndex views, which give the same results.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from .dashboard_metrics import parse_amount
+from .revenue_rollups import GRANULARITIES
+from .timestamps import epoch_seconds
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+# Columns the store reads from the payments worksheet
+PAYMENT_COLUMNS = {
+    "payments": ["amount", "package_type", "country", "timestamp", "doctor_id"],
+}
+
+# Sorts before every real timestamp; marks rows whose date did not parse
+INVALID_TIMESTAMP = -(2 ** 63)
+
+# numpy datetime unit of each revenue_by_period bucket
+_BUCKET_UNITS = {"day": "D", "month": "M", "year": "Y"}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch(value: Any) -> int:
+    """Parse a YYYY-MM-DD HH:MM:SS timestamp into epoch seconds"""
+    seconds = epoch_seconds(value)
+    return INVALID_TIMESTAMP if seconds is None else seconds
+
+
+def _epochs(texts: List[str]) -> "np.ndarray":
+    """Parse many timestamps at once, falling back per row on odd input"""
+    epochs = np.full(len(texts), INVALID_TIMESTAMP, dtype=np.int64)
+    # Only the fixed layout goes to numpy, which accepts other ISO forms too
+    shaped = [position for position, text in enumerate(texts) if len(text) == 19 and text[10] == " "]
+    shaped_set = set(shaped)
+    for position, text in enumerate(texts):
+        if position not in shaped_set:
+            epochs[position] = _epoch(text)
+    if shaped:
+        try:
+            parsed = np.array([texts[position] for position in shaped], dtype="datetime64[s]")
+        except ValueError:
+            for position in shaped:
+                epochs[position] = _epoch(texts[position])
+        else:
+            values = parsed.astype(np.int64)
+            values[np.isnat(parsed)] = INVALID_TIMESTAMP
+            epochs[shaped] = values
+    return epochs
+
+
+def _amounts(values: List[Any]) -> "np.ndarray":
+    """Convert many amount cells at once, blanks and commas included"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([parse_amount(value) for value in values], dtype=np.float64)
+
+
+def _day_start(day: date) -> int:
+    return (day - _EPOCH.date()).days * 86400
+
+
+class _Dictionary:
+    """Maps string values to small integer codes"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values: List[Any]) -> "np.ndarray":
+        return np.array([self.code(str(value)) for value in values], dtype=np.int32)
+
+
+class PaymentColumns:
+    """Payments as typed column arrays, sorted by timestamp on demand"""
+
+    def __init__(self, capacity: int = 1024):
+        self.initial_capacity = capacity
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything, ahead of a rebuild"""
+        self.size = 0
+        self.timestamps = np.empty(self.initial_capacity, dtype=np.int64)
+        self.amounts = np.empty(self.initial_capacity, dtype=np.float64)
+        self.countries = np.empty(self.initial_capacity, dtype=np.int32)
+        self.doctors = np.empty(self.initial_capacity, dtype=np.int32)
+        self.packages = np.empty(self.initial_capacity, dtype=np.int32)
+        self.country_names = _Dictionary()
+        self.doctor_ids = _Dictionary()
+        self.package_types = _Dictionary()
+        # Date part of each unparsable timestamp, in insertion order. Those
+        # rows sort first, so after a stable sort they hold positions
+        # 0..len-1 in this same order.
+        self.invalid_days = []
+        self._sorted = True
+
+    def _columns(self) -> List[str]:
+        return ["timestamps", "amounts", "countries", "doctors", "packages"]
+
+    def _reserve(self, extra: int) -> None:
+        """Grow the arrays geometrically so appends stay amortized O(1)"""
+        needed = self.size + extra
+        capacity = len(self.timestamps)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self._columns():
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def apply(self, sheet_name: str, record: Dict[str, Any]) -> None:
+        """Add one new row"""
+        if sheet_name == "payments":
+            self.apply_batch(sheet_name, [record])
+
+    def apply_batch(self, sheet_name: str, records: List[Dict[str, Any]]) -> None:
+        """Add many new rows with one vectorized conversion per column"""
+        if sheet_name != "payments" or not records:
+            return
+        count = len(records)
+        self._reserve(count)
+        first, last = self.size, self.size + count
+        if count == 1:
+            # The common append path; skip building one-element arrays
+            record = records[0]
+            text = str(record.get("timestamp", ""))
+            self.timestamps[first] = _epoch(text)
+            if self.timestamps[first] == INVALID_TIMESTAMP:
+                self.invalid_days.append(text[:10])
+            self.amounts[first] = parse_amount(record.get("amount", 0))
+            self.countries[first] = self.country_names.code(str(record.get("country", "Unknown")))
+            self.doctors[first] = self.doctor_ids.code(str(record.get("doctor_id", "")))
+            self.packages[first] = self.package_types.code(str(record.get("package_type", "")))
+        else:
+            texts = [str(record.get("timestamp", "")) for record in records]
+            self.timestamps[first:last] = _epochs(texts)
+            for position in np.flatnonzero(self.timestamps[first:last] == INVALID_TIMESTAMP):
+                self.invalid_days.append(texts[position][:10])
+            self.amounts[first:last] = _amounts([record.get("amount", 0) for record in records])
+            self.countries[first:last] = self.country_names.encode(
+                [record.get("country", "Unknown") for record in records]
+            )
+            self.doctors[first:last] = self.doctor_ids.encode([record.get("doctor_id", "") for record in records])
+            self.packages[first:last] = self.package_types.encode(
+                [record.get("package_type", "") for record in records]
+            )
+        # New payments almost always sort last; anything else is sorted lazily
+        previous = self.timestamps[first - 1] if first else INVALID_TIMESTAMP
+        batch = self.timestamps[first:last]
+        if batch[0] < previous or (count > 1 and np.any(batch[1:] < batch[:-1])):
+            self._sorted = False
+        self.size = last
+
+    def _ensure_sorted(self) -> None:
+        if self._sorted:
+            return
+        order = np.argsort(self.timestamps[:self.size], kind="stable")
+        for name in self._columns():
+            column = getattr(self, name)
+            column[:self.size] = column[:self.size][order]
+        self._sorted = True
+
+    def _slice(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        """Positions of the payments dated within an inclusive date range"""
+        self._ensure_sorted()
+        timestamps = self.timestamps[:self.size]
+        low = _day_start(start) if start else INVALID_TIMESTAMP + 1
+        first = int(np.searchsorted(timestamps, low, side="left"))
+        if end is None:
+            return first, self.size
+        last = int(np.searchsorted(timestamps, _day_start(end + timedelta(days=1)), side="left"))
+        return first, max(first, last)
+
+    @staticmethod
+    def _grouped(codes: "np.ndarray", amounts: "np.ndarray", names: List[str]) -> Dict[str, float]:
+        """Sum amounts per code, keeping only codes that occur"""
+        totals = np.bincount(codes, weights=amounts, minlength=len(names))
+        counts = np.bincount(codes, minlength=len(names))
+        return {names[code]: float(totals[code]) for code in np.flatnonzero(counts)}
+
+    @staticmethod
+    def _runs(keys: "np.ndarray", amounts: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """Sum amounts over runs of equal keys in a sorted array"""
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        return keys[starts], np.add.reduceat(amounts, starts)
+
+    def _daily(self, timestamps: "np.ndarray", amounts: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """Per-day totals of a timestamp-sorted slice, in O(n) without sorting"""
+        if not len(timestamps):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        return self._runs(timestamps // 86400, amounts)
+
+    def _buckets(self, days: "np.ndarray", totals: "np.ndarray", granularity: str) -> Dict[str, float]:
+        """Sum per-day totals into day, month or year buckets"""
+        if not len(days):
+            return {}
+        periods = days.astype("datetime64[D]").astype(f"datetime64[{_BUCKET_UNITS[granularity]}]")
+        if granularity != "day":
+            periods, totals = self._runs(periods, totals)
+        return {str(period): float(total) for period, total in zip(periods, totals)}
+
+    def query(self, start: Optional[date] = None, end: Optional[date] = None,
+              granularity: Optional[str] = None) -> Dict[str, Any]:
+        """Get revenue for an inclusive date range"""
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity '{granularity}'")
+        first, last = self._slice(start, end)
+        timestamps = self.timestamps[first:last]
+        amounts = self.amounts[first:last]
+        packages = self.packages[first:last]
+
+        is_subscription = np.array(
+            [package.lower() == "subscription" for package in self.package_types.values], dtype=bool
+        )
+        subscription_mask = is_subscription[packages] if len(is_subscription) else np.zeros(0, dtype=bool)
+        subscription_revenue = float(amounts[subscription_mask].sum())
+        total_revenue = float(amounts.sum())
+
+        days, daily = self._daily(timestamps, amounts)
+        # Day buckets only when asked for, as in RevenueRollup
+        revenue_data = {
+            "total_revenue": total_revenue,
+            "booking_revenue": total_revenue - subscription_revenue,
+            "subscription_revenue": subscription_revenue,
+            "revenue_by_country": self._grouped(self.countries[first:last], amounts, self.country_names.values),
+            "revenue_by_package": self._grouped(packages, amounts, self.package_types.values),
+            "revenue_by_month": self._buckets(days, daily, "month")
+        }
+        if granularity is not None:
+            revenue_data["revenue_by_period"] = self._buckets(days, daily, granularity)
+        return revenue_data
+
+    def doctor_earnings(self, doctor_id: str) -> Dict[str, Any]:
+        """Get earnings for a specific doctor"""
+        code = self.doctor_ids.codes.get(str(doctor_id))
+        if code is None:
+            return {"doctor_id": doctor_id, "total_earnings": 0, "payment_count": 0, "earnings_by_date": {}}
+        self._ensure_sorted()
+        mask = self.doctors[:self.size] == code
+        amounts = self.amounts[:self.size][mask]
+        timestamps = self.timestamps[:self.size][mask]
+
+        # Unparsable timestamps sort first, see invalid_days
+        invalid = len(self.invalid_days)
+        earnings_by_date = {}
+        for position in np.flatnonzero(mask[:invalid]):
+            day = self.invalid_days[position]
+            earnings_by_date[day] = earnings_by_date.get(day, 0) + float(self.amounts[position])
+        valid = timestamps != INVALID_TIMESTAMP
+        for day, total in self._buckets(*self._daily(timestamps[valid], amounts[valid]), "day").items():
+            earnings_by_date[day] = earnings_by_date.get(day, 0) + total
+        return {
+            "doctor_id": doctor_id,
+            "total_earnings": float(amounts.sum()),
+            "payment_count": int(mask.sum()),
+            "earnings_by_date": earnings_by_date
+        }
+
+    def top_earners(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the doctors with the highest earnings"""
+        names = self.doctor_ids.values
+        if not names:
+            return []
+        codes = self.doctors[:self.size]
+        totals = np.bincount(codes, weights=self.amounts[:self.size], minlength=len(names))
+        counts = np.bincount(codes, minlength=len(names))
+        # Payments without a doctor are not an earner
+        blank = self.doctor_ids.codes.get("")
+        candidates = [code for code in np.argsort(-totals, kind="stable") if code != blank]
+        return [
+            {
+                "doctor_id": names[code],
+                "total_earnings": float(totals[code]),
+                "payment_count": int(counts[code])
+            }
+            for code in candidates[:limit]
+        ]
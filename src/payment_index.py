@@ -0,0 +1,143 @@
+"""
+Payment indexes for Pona Health Admin Dashboard
+
+This module keeps payment records ordered by timestamp so that a
+date-range query is a binary search plus a slice rather than a scan
+that parses every row's timestamp, plus hash indexes by doctor, phone
+and country so that per-doctor and per-customer lookups only touch the
+matching rows.
+"""
+
+import bisect
+import heapq
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from .dashboard_metrics import parse_amount, activity_entry
+from .timestamps import epoch_seconds, datetime_epoch
+from .sheet_records import Payment
+
+
+class PaymentIndex:
+    """Payments ordered by timestamp and hashed by doctor, phone and country"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything, ahead of a rebuild"""
+        # Epoch seconds, parsed once when a payment is indexed
+        self.timestamps = []
+        self.payments = []
+        self.by_doctor = {}
+        self.by_phone = {}
+        self.by_country = {}
+        # Running earnings per doctor, for top-N queries
+        self.doctor_totals = {}
+
+    def apply(self, sheet_name: str, record: Dict[str, Any]) -> None:
+        """Index one new row"""
+        if sheet_name == "payments":
+            self.add_payment(record)
+
+    def apply_batch(self, sheet_name: str, records: List[Dict[str, Any]]) -> None:
+        """Index many new rows, sorting by timestamp once rather than per row
+
+        Rows imported from several tabs or reloaded by a reseed arrive
+        out of order, where inserting them one by one is quadratic.
+        """
+        if sheet_name != "payments":
+            return
+        start = len(self.timestamps)
+        for record in records:
+            payment, timestamp = self._add_keys(record)
+            if timestamp is not None:
+                self.timestamps.append(timestamp)
+                self.payments.append(payment)
+        timestamps = self.timestamps
+        if any(timestamps[i] > timestamps[i + 1] for i in range(max(start - 1, 0), len(timestamps) - 1)):
+            # A stable sort keeps equal timestamps in arrival order, as bisect_right does
+            order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            self.timestamps = [timestamps[i] for i in order]
+            self.payments = [self.payments[i] for i in order]
+
+    def add_payment(self, payment: Dict[str, Any]) -> None:
+        """Index one payment by its keys and timestamp"""
+        payment, timestamp = self._add_keys(payment)
+        if timestamp is None:
+            # Payments with invalid dates never match a date range
+            return
+        # New payments almost always sort last, making this an append
+        position = bisect.bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(position, timestamp)
+        self.payments.insert(position, payment)
+
+    def _add_keys(self, payment: Dict[str, Any]) -> Tuple[Payment, Optional[int]]:
+        """Index a payment by doctor, phone and country, returning it and its timestamp"""
+        # Held as a slotted record, a fraction of the size of the dict
+        payment = Payment.from_dict(payment)
+        doctor_id = str(payment.get("doctor_id", ""))
+        self.by_doctor.setdefault(doctor_id, []).append(payment)
+        self.by_phone.setdefault(str(payment.get("phone", "")), []).append(payment)
+        self.by_country.setdefault(payment.get("country", "Unknown"), []).append(payment)
+        self.doctor_totals[doctor_id] = self.doctor_totals.get(doctor_id, 0) + parse_amount(payment.get("amount", 0))
+        return payment, epoch_seconds(payment.get("timestamp", ""))
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Get copies of the payments with start <= timestamp <= end"""
+        first = bisect.bisect_left(self.timestamps, datetime_epoch(start)) if start else 0
+        last = bisect.bisect_right(self.timestamps, datetime_epoch(end)) if end else len(self.timestamps)
+        return [payment.to_dict() for payment in self.payments[first:last]]
+
+    def activity_before(self, position: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+        """Get activity entries older than a cursor, newest first
+
+        The cursor is a position in timestamp order. New payments land
+        after it, so it stays valid while the dashboard pages back.
+        """
+        last = len(self.payments) if position is None else max(0, min(position, len(self.payments)))
+        first = max(0, last - limit)
+        return {
+            "items": [activity_entry(payment) for payment in reversed(self.payments[first:last])],
+            "next_cursor": str(first) if first > 0 else None
+        }
+
+    def for_phone(self, phone: str) -> List[Dict[str, Any]]:
+        """Get copies of a customer's payments"""
+        return [payment.to_dict() for payment in self.by_phone.get(str(phone), [])]
+
+    def for_country(self, country: str) -> List[Dict[str, Any]]:
+        """Get copies of the payments made in a country"""
+        return [payment.to_dict() for payment in self.by_country.get(country, [])]
+
+    def doctor_earnings(self, doctor_id: str) -> Dict[str, Any]:
+        """Get earnings for a specific doctor"""
+        total_earnings = 0
+        earnings_by_date = {}
+        payments = self.by_doctor.get(str(doctor_id), [])
+        for payment in payments:
+            amount = parse_amount(payment.get("amount", 0))
+            total_earnings += amount
+
+            # Track earnings by date
+            date = str(payment.get("timestamp", ""))[:10]  # Extract YYYY-MM-DD
+            earnings_by_date[date] = earnings_by_date.get(date, 0) + amount
+
+        return {
+            "doctor_id": doctor_id,
+            "total_earnings": total_earnings,
+            "payment_count": len(payments),
+            "earnings_by_date": earnings_by_date
+        }
+
+    def top_earners(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the doctors with the highest earnings"""
+        # Payments without a doctor are not an earner
+        totals = ((doctor_id, total) for doctor_id, total in self.doctor_totals.items() if doctor_id)
+        return [
+            {
+                "doctor_id": doctor_id,
+                "total_earnings": total,
+                "payment_count": len(self.by_doctor[doctor_id])
+            }
+            for doctor_id, total in heapq.nlargest(limit, totals, key=lambda item: item[1])
+        ]
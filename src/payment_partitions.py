@@ -0,0 +1,151 @@
+"""
+Monthly worksheet partitions for Pona Health payments
+
+This module splits the payments worksheet into one tab per month, such
+as payments_2026_10, so that no single tab keeps growing. Rows go to the
+month of their timestamp; rows without a usable timestamp stay in the
+original tab. A small catalog worksheet lists the partitions, and the
+regular syncs for rows appended by other writers only read the recent
+partitions.
+
+Partitioning is off until SHEETS_PARTITION_PAYMENTS=1. To switch it on,
+set that variable for every worker and restart them, then run
+"python -m src.payment_partitions migrate" once, with the variable set,
+to move the rows already in the original tab into their monthly
+partitions.
+"""
+
+import re
+import threading
+from datetime import date, datetime
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+# Partitioned worksheets, with the timestamp column that picks the month
+PARTITIONED_SHEETS = {"payments": "timestamp"}
+
+# Worksheet listing every partition
+CATALOG_SHEET = "sheet_partitions"
+CATALOG_HEADERS = ["partition", "sheet", "month", "created_at"]
+
+# Partitions checked for rows appended by other writers: this month and
+# the ones before it
+RECENT_MONTHS = 2
+
+_MONTH = re.compile(r"(\d{4})-(0[1-9]|1[0-2])")
+_PARTITION_SUFFIX = re.compile(r"_(\d{4})_(0[1-9]|1[0-2])$")
+
+
+def partition_name(sheet_name: str, timestamp: Any) -> str:
+    """Get the tab a row with this timestamp belongs in"""
+    match = _MONTH.match(str(timestamp))
+    if match is None:
+        return sheet_name
+    return f"{sheet_name}_{match.group(1)}_{match.group(2)}"
+
+
+def partition_month(partition: str) -> Optional[Tuple[int, int]]:
+    """Get the (year, month) of a partition, or None for the original tab"""
+    match = _PARTITION_SUFFIX.search(partition)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+class PartitionCatalog:
+    """Keeps track of the monthly tabs of each partitioned worksheet
+
+    read_entries returns the catalog worksheet's records, add_entry
+    appends a row to it, and create_tab makes sure a tab exists with the
+    given header row.
+    """
+
+    def __init__(self, read_entries: Callable[[], List[Dict[str, Any]]],
+                 add_entry: Callable[[List[Any]], None],
+                 create_tab: Callable[[str, List[str]], None],
+                 sheets: Dict[str, str] = PARTITIONED_SHEETS):
+        self.read_entries = read_entries
+        self.add_entry = add_entry
+        self.create_tab = create_tab
+        self.sheets = sheets
+        # Partitions this process created or saw in the catalog
+        self._prepared = set()
+        self._lock = threading.Lock()
+
+    def is_partitioned(self, sheet_name: str) -> bool:
+        """Check whether a worksheet is split into monthly tabs"""
+        return sheet_name in self.sheets
+
+    def partition_of(self, sheet_name: str, headers: List[str], row: List[Any]) -> str:
+        """Get the tab a row of a worksheet belongs in"""
+        column = self.sheets.get(sheet_name)
+        if column is None or column not in headers:
+            return sheet_name
+        position = headers.index(column)
+        return partition_name(sheet_name, row[position] if position < len(row) else "")
+
+    def partitions(self, sheet_name: str) -> List[str]:
+        """List the monthly tabs of a worksheet, oldest first"""
+        if not self.is_partitioned(sheet_name):
+            return []
+        names = {
+            str(entry.get("partition", "")) for entry in self.read_entries()
+            if str(entry.get("sheet", "")) == sheet_name
+        }
+        with self._lock:
+            names.update(name for name in self._prepared if name.startswith(sheet_name + "_"))
+        return sorted(name for name in names if partition_month(name) is not None)
+
+    def tabs(self, sheet_name: str) -> List[str]:
+        """List the tabs holding a worksheet's rows
+
+        The original tab comes first, since it holds the rows without a
+        usable timestamp.
+        """
+        return [sheet_name] + self.partitions(sheet_name)
+
+    def recent_tabs(self, sheet_name: str, today: Optional[date] = None) -> List[str]:
+        """List the tabs other writers are likely to still append to
+
+        These are the original tab and the partitions of the last
+        RECENT_MONTHS months.
+        """
+        if not self.is_partitioned(sheet_name):
+            return [sheet_name]
+        today = today or datetime.now().date()
+        month = today.year * 12 + today.month - 1 - (RECENT_MONTHS - 1)
+        first = (month // 12, month % 12 + 1)
+        return [sheet_name] + [
+            partition for partition in self.partitions(sheet_name)
+            if partition_month(partition) >= first
+        ]
+
+    def prepare(self, sheet_name: str, partition: str, headers: List[str]) -> None:
+        """Create a partition's tab and catalog entry unless that was done already"""
+        if partition == sheet_name:
+            return
+        with self._lock:
+            if partition in self._prepared:
+                return
+        if partition not in self.partitions(sheet_name):
+            self.create_tab(partition, headers)
+            self.create_tab(CATALOG_SHEET, CATALOG_HEADERS)
+            year, month = partition_month(partition)
+            self.add_entry([
+                partition, sheet_name, f"{year:04d}-{month:02d}",
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            ])
+        with self._lock:
+            self._prepared.add(partition)
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] != ["migrate"]:
+        sys.exit("usage: python -m src.payment_partitions migrate")
+    from .google_sheets_service import get_sheets_service, PARTITION_PAYMENTS
+    if not PARTITION_PAYMENTS:
+        # Workers that do not partition would reload the original tab
+        # alone and lose sight of the rows moved out of it
+        sys.exit("Set SHEETS_PARTITION_PAYMENTS=1 for every worker, restart them, then migrate")
+    for sheet_name, moved in get_sheets_service().migrate_partitions().items():
+        print(f"{sheet_name}: moved {moved} rows into monthly partitions")
@@ -0,0 +1,142 @@
+"""
+Stale-while-revalidate response cache for Pona Health Admin Dashboard
+
+This module keeps the last computed result of expensive admin endpoints,
+keyed by endpoint and query parameters. A result is served at once even
+when it is older than the soft TTL or was computed for an older version
+of the data; it is then recomputed on a background thread, so no admin
+waits for the aggregation pipeline. Computations of the same key go
+through a single flight, so concurrent refreshes collapse into one, and
+only a few keys are refreshed at a time.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+from .sheets_quota import background
+from .single_flight import SingleFlight
+
+
+class _Entry:
+    """Last computed result of one key"""
+
+    def __init__(self, value: Any, version: Optional[str]):
+        self.value = value
+        self.version = version
+        self.computed_at = time.monotonic()
+
+
+class ResponseCache:
+    """Serves computed results right away and refreshes stale ones in the background
+
+    soft_ttl is the age after which a result is refreshed; results older
+    than max_stale are not served and are recomputed on the request
+    thread instead. At most max_refreshes background refreshes run at
+    once; a stale result that finds them all busy is served as is and
+    refreshed by a later request.
+    """
+
+    def __init__(self, soft_ttl: float = 10.0, max_stale: float = 600.0, max_entries: int = 256,
+                 max_refreshes: int = 4):
+        self.soft_ttl = soft_ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.max_refreshes = max_refreshes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refreshes_deferred = 0
+        self.refresh_errors = 0
+        self._entries = OrderedDict()
+        self._scheduled = set()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        # Refresh threads do not survive a fork
+        os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self) -> None:
+        self._entries = OrderedDict()
+        self._scheduled = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any],
+            version: Optional[str] = None) -> Tuple[Any, Optional[str]]:
+        """Get the result for a key and the data version it was computed for
+
+        compute must not depend on the request context, since it may run
+        on a background thread. Callers that miss together share one
+        computation, and its exception if it fails.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry.computed_at <= self.max_stale:
+                self._entries.move_to_end(key)
+                if now - entry.computed_at <= self.soft_ttl and entry.version == version:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    self._start_refresh(key, compute, version)
+                return entry.value, entry.version
+            self.misses += 1
+
+        return self._flights.do(key, lambda: self._refresh(key, compute, version))
+
+    def _start_refresh(self, key: Hashable, compute: Callable[[], Any], version: Optional[str]) -> None:
+        """Recompute a key in the background unless that is already happening"""
+        if key in self._scheduled or self._flights.in_flight(key):
+            return
+        if len(self._scheduled) >= self.max_refreshes:
+            self.refreshes_deferred += 1
+            return
+        self._scheduled.add(key)
+        self.refreshes += 1
+        threading.Thread(
+            target=self._refresh_in_background, args=(key, compute, version),
+            name="response-refresh", daemon=True
+        ).start()
+
+    def _refresh_in_background(self, key: Hashable, compute: Callable[[], Any],
+                               version: Optional[str]) -> None:
+        with background():
+            try:
+                self._flights.do(key, lambda: self._refresh(key, compute, version))
+            except Exception as e:
+                with self._lock:
+                    self.refresh_errors += 1
+                # The stale result keeps being served until a refresh works
+                print(f"Error refreshing cached response {key}: {e}")
+            finally:
+                with self._lock:
+                    self._scheduled.discard(key)
+
+    def _refresh(self, key: Hashable, compute: Callable[[], Any],
+                 version: Optional[str]) -> Tuple[Any, Optional[str]]:
+        value = compute()
+        with self._lock:
+            self._entries[key] = _Entry(value, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, version
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit counters and the number of cached results"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refreshes_deferred": self.refreshes_deferred,
+                "refresh_errors": self.refresh_errors,
+                "refreshing": len(self._scheduled),
+                "entries": len(self._entries),
+                "max_refreshes": self.max_refreshes,
+                "soft_ttl_seconds": self.soft_ttl,
+                "max_stale_seconds": self.max_stale,
+                "flights": self._flights.stats()
+            }
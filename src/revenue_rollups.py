@@ -0,0 +1,221 @@
+"""
+Revenue rollups for Pona Health Admin Dashboard
+
+This module keeps daily revenue buckets per country and per package
+type, together with prefix sums over the days, so that revenue for any
+date range is answered with two lookups instead of a scan of every
+payment. It serves revenue when NumPy is not installed; otherwise the
+PaymentColumns view does (see payment_columns), with the same results.
+"""
+
+import bisect
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from .dashboard_metrics import parse_amount
+from .timestamps import epoch_seconds, SECONDS_PER_DAY, EPOCH_ORDINAL
+
+# Supported bucket sizes for revenue_by_period
+GRANULARITIES = ("day", "month", "year")
+
+# Named periods understood by period_bounds; any other covers all time
+PERIODS = ("all", "year", "month", "week")
+
+# Columns the rollup reads from each worksheet
+REVENUE_COLUMNS = {
+    "payments": ["amount", "package_type", "country", "timestamp"],
+}
+
+
+def period_bounds(period: str, now: Optional[datetime] = None) -> Tuple[Optional[date], Optional[date]]:
+    """Translate a named period into an inclusive date range"""
+    today = (now or datetime.now()).date()
+    if period == "year":
+        return date(today.year, 1, 1), date(today.year, 12, 31)
+    if period == "month":
+        next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+        return date(today.year, today.month, 1), next_month - timedelta(days=1)
+    if period == "week":
+        # Simple approximation for "this week"
+        return today - timedelta(days=7), None
+    return None, None
+
+
+class _Series:
+    """Per-day amounts and payment counts of one key, with prefix sums"""
+
+    def __init__(self, size: int = 0):
+        self.daily = [0.0] * size
+        self.counts = [0] * size
+        self.prefix = [0.0] * (size + 1)
+        self.count_prefix = [0] * (size + 1)
+
+    def grow(self) -> None:
+        self.daily.append(0.0)
+        self.counts.append(0)
+        self.prefix.append(self.prefix[-1])
+        self.count_prefix.append(self.count_prefix[-1])
+
+    def insert(self, position: int) -> None:
+        # Prefix sums are rebuilt before the next query
+        self.daily.insert(position, 0.0)
+        self.counts.insert(position, 0)
+
+    def add(self, position: int, amount: float, update_prefix: bool) -> None:
+        self.daily[position] += amount
+        self.counts[position] += 1
+        if update_prefix:
+            self.prefix[-1] += amount
+            self.count_prefix[-1] += 1
+
+    def rebuild(self) -> None:
+        self.prefix = [0.0]
+        self.count_prefix = [0]
+        for amount, count in zip(self.daily, self.counts):
+            self.prefix.append(self.prefix[-1] + amount)
+            self.count_prefix.append(self.count_prefix[-1] + count)
+
+    def range_sum(self, first: int, last: int) -> float:
+        return self.prefix[last] - self.prefix[first]
+
+    def range_count(self, first: int, last: int) -> int:
+        return self.count_prefix[last] - self.count_prefix[first]
+
+
+class RevenueRollup:
+    """Daily revenue buckets with prefix sums for constant-time range totals"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything, ahead of a rebuild"""
+        # Sorted day ordinals that have at least one payment
+        self.days = []
+        self.total = _Series()
+        self.booking = _Series()
+        self.subscription = _Series()
+        self.by_country = {}
+        self.by_package = {}
+        self._stale = False
+
+    def _all_series(self) -> List[_Series]:
+        return [self.total, self.booking, self.subscription] + \
+            list(self.by_country.values()) + list(self.by_package.values())
+
+    def apply(self, sheet_name: str, record: Dict[str, Any]) -> None:
+        """Fold one new row into the buckets"""
+        if sheet_name == "payments":
+            self.add_payment(record)
+
+    def add_payment(self, payment: Dict[str, Any]) -> None:
+        """Add one payment to its day's buckets"""
+        timestamp = epoch_seconds(payment.get("timestamp", ""))
+        if timestamp is None:
+            # Skip payments with invalid dates
+            return
+        amount = parse_amount(payment.get("amount", 0))
+        country = payment.get("country", "Unknown")
+        package_type = str(payment.get("package_type", ""))
+        day = timestamp // SECONDS_PER_DAY + EPOCH_ORDINAL
+
+        position = self._day_position(day)
+        for series, key in ((self.by_country, country), (self.by_package, package_type)):
+            if key not in series:
+                series[key] = _Series(len(self.days))
+                series[key].rebuild()
+
+        if package_type.lower() == "subscription":
+            kind = self.subscription
+        else:
+            kind = self.booking
+        targets = (self.total, kind, self.by_country[country], self.by_package[package_type])
+
+        # Payments almost always land on the newest day, where the prefix
+        # sums can be kept current in O(1); anything else marks them stale
+        on_last_day = position == len(self.days) - 1 and not self._stale
+        for series in targets:
+            series.add(position, amount, on_last_day)
+        if not on_last_day:
+            self._stale = True
+
+    def _day_position(self, day: int) -> int:
+        """Find or create the bucket of a day"""
+        position = bisect.bisect_left(self.days, day)
+        if position < len(self.days) and self.days[position] == day:
+            return position
+        self.days.insert(position, day)
+        if position == len(self.days) - 1:
+            for series in self._all_series():
+                series.grow()
+        else:
+            for series in self._all_series():
+                series.insert(position)
+            self._stale = True
+        return position
+
+    def _refresh(self) -> None:
+        if self._stale:
+            for series in self._all_series():
+                series.rebuild()
+            self._stale = False
+
+    def query(self, start: Optional[date] = None, end: Optional[date] = None,
+              granularity: Optional[str] = None) -> Dict[str, Any]:
+        """Get revenue for an inclusive date range
+
+        Day buckets are only built when asked for with granularity "day";
+        the other figures cost a few binary searches each, however many
+        days the range spans.
+        """
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity '{granularity}'")
+        self._refresh()
+        first = bisect.bisect_left(self.days, start.toordinal()) if start else 0
+        last = bisect.bisect_right(self.days, end.toordinal()) if end else len(self.days)
+        last = max(first, last)
+
+        revenue_data = {
+            "total_revenue": self.total.range_sum(first, last),
+            "booking_revenue": self.booking.range_sum(first, last),
+            "subscription_revenue": self.subscription.range_sum(first, last),
+            "revenue_by_country": self._by_key(self.by_country, first, last),
+            "revenue_by_package": self._by_key(self.by_package, first, last),
+            "revenue_by_month": self._buckets(first, last, "month")
+        }
+        if granularity is not None:
+            revenue_data["revenue_by_period"] = self._buckets(first, last, granularity)
+        return revenue_data
+
+    @staticmethod
+    def _by_key(series_by_key: Dict[str, _Series], first: int, last: int) -> Dict[str, float]:
+        return {
+            key: series.range_sum(first, last)
+            for key, series in series_by_key.items()
+            if series.range_count(first, last)
+        }
+
+    def _buckets(self, first: int, last: int, granularity: str) -> Dict[str, float]:
+        """Sum the days in range into day, month or year buckets
+
+        A month or year bucket is one prefix sum difference, ending where
+        a binary search finds the first day of the next period.
+        """
+        if granularity == "day":
+            return {
+                date.fromordinal(self.days[position]).isoformat(): self.total.daily[position]
+                for position in range(first, last)
+            }
+        buckets = {}
+        position = first
+        while position < last:
+            day = date.fromordinal(self.days[position])
+            if granularity == "month":
+                key = day.isoformat()[:7]
+                following = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+            else:
+                key = day.isoformat()[:4]
+                following = date(day.year + 1, 1, 1)
+            end = bisect.bisect_left(self.days, following.toordinal(), position, last)
+            buckets[key] = self.total.range_sum(position, end)
+            position = end
+        return buckets
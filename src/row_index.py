@@ -0,0 +1,94 @@
+"""
+Record row index for Pona Health Admin Dashboard
+
+This module maps each record ID to the physical row it occupies in its
+worksheet, so that an admin edit or delete writes to that row directly
+instead of downloading the whole sheet to find it.
+"""
+
+import threading
+from typing import List, Dict, Any, Optional
+
+# Column holding the record ID in every indexed worksheet
+ID_COLUMN = "id"
+
+# Row 1 holds the headers, so the first record sits on row 2
+FIRST_DATA_ROW = 2
+
+
+class _SheetRows:
+    """Row numbers of one worksheet's records
+
+    rows maps each ID to every row holding it, in sheet order, so that
+    deleting one of several rows with the same ID leaves the others
+    indexed.
+    """
+
+    def __init__(self, id_position: Optional[int]):
+        self.id_position = id_position
+        self.rows = {}
+        self.next_row = FIRST_DATA_ROW
+
+
+class RowIndex:
+    """Record ID to 1-based worksheet row number, per worksheet"""
+
+    def __init__(self):
+        self._sheets = {}
+        self._lock = threading.Lock()
+
+    def has(self, sheet_name: str) -> bool:
+        """Check whether a worksheet has been indexed"""
+        return sheet_name in self._sheets
+
+    def rebuild(self, sheet_name: str, headers: List[str], records: List[Dict[str, Any]]) -> None:
+        """Index a worksheet from its records, in sheet order"""
+        sheet = _SheetRows(headers.index(ID_COLUMN) if ID_COLUMN in headers else None)
+        for record in records:
+            record_id = str(record.get(ID_COLUMN, ""))
+            sheet.rows.setdefault(record_id, []).append(sheet.next_row)
+            sheet.next_row += 1
+        with self._lock:
+            self._sheets[sheet_name] = sheet
+
+    def lookup(self, sheet_name: str, record_id: Any) -> Optional[int]:
+        """Get the row number of a record, or None when it is not indexed
+
+        Duplicate IDs resolve to the first row, like the old linear scan.
+        """
+        with self._lock:
+            sheet = self._sheets.get(sheet_name)
+            rows = sheet.rows.get(str(record_id)) if sheet is not None else None
+            return rows[0] if rows else None
+
+    def appended(self, sheet_name: str, row_data: List[Any]) -> None:
+        """Record a row appended after the last indexed one"""
+        with self._lock:
+            sheet = self._sheets.get(sheet_name)
+            if sheet is None:
+                return
+            if sheet.id_position is not None and sheet.id_position < len(row_data):
+                sheet.rows.setdefault(str(row_data[sheet.id_position]), []).append(sheet.next_row)
+            sheet.next_row += 1
+
+    def deleted(self, sheet_name: str, row_number: int) -> None:
+        """Drop a deleted row and shift every row below it up by one"""
+        with self._lock:
+            sheet = self._sheets.get(sheet_name)
+            if sheet is None:
+                return
+            rows = {}
+            for record_id, numbers in sheet.rows.items():
+                kept = [row if row < row_number else row - 1 for row in numbers if row != row_number]
+                if kept:
+                    rows[record_id] = kept
+            sheet.rows = rows
+            sheet.next_row -= 1
+
+    def invalidate(self, sheet_name: Optional[str] = None) -> None:
+        """Forget one worksheet, or every worksheet when no name is given"""
+        with self._lock:
+            if sheet_name is None:
+                self._sheets.clear()
+            else:
+                self._sheets.pop(sheet_name, None)
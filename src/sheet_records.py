@@ -0,0 +1,181 @@
+"""
+Typed worksheet records for Pona Health
+
+This module defines compact record classes for the main worksheets:
+payments, subscriptions, doctors and users. Each class stores its
+columns in __slots__ instead of a per-row dict, which keeps long-lived
+rows (such as the payment index) several times smaller, and converts
+cheaply to and from sheet rows and JSON dicts. Records also answer
+get() like a dict, so code written against record dicts keeps working.
+
+Run "python -m src.sheet_records [rows ...]" to compare the memory held
+by payment rows as dicts and as Payment records.
+"""
+
+from typing import List, Dict, Any, Mapping, Sequence, Tuple
+from .local_store import LOCAL_SHEETS
+
+
+class SheetRecord:
+    """Base of the slotted worksheet records; FIELDS is the column order"""
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    DEFAULTS: Dict[str, Any] = {}
+
+    def __init__(self, **values: Any):
+        for name in self.FIELDS:
+            setattr(self, name, values.get(name, self.DEFAULTS.get(name, "")))
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "SheetRecord":
+        """Build a record from a sheet row in column order"""
+        record = cls.__new__(cls)
+        for name, value in zip(cls.FIELDS, row):
+            setattr(record, name, value)
+        for name in cls.FIELDS[len(row):]:
+            setattr(record, name, "")
+        return record
+
+    @classmethod
+    def from_dict(cls, values: Mapping[str, Any]) -> "SheetRecord":
+        """Build a record from a record dict or a JSON body"""
+        record = cls.__new__(cls)
+        for name in cls.FIELDS:
+            setattr(record, name, values.get(name, cls.DEFAULTS.get(name, "")))
+        return record
+
+    def to_row(self) -> List[Any]:
+        """Get the values in column order, ready to write to the sheet"""
+        return [getattr(self, name) for name in self.FIELDS]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the record as a dict keyed by column, ready for JSON"""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Read a column like dict.get"""
+        if name in self.FIELDS:
+            return getattr(self, name)
+        return default
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and other.to_row() == self.to_row()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Payment(SheetRecord):
+    """A row of the payments worksheet"""
+
+    FIELDS = tuple(LOCAL_SHEETS["payments"])
+    __slots__ = FIELDS
+    DEFAULTS = {
+        "name": "Unknown",
+        "phone": "Unknown",
+        "payment_method": "Unknown",
+        "amount": 0,
+        "package_type": "Unknown",
+        "doctor_type": "Unknown",
+        "emergency": False,
+        "country": "Unknown"
+    }
+
+
+class Subscription(SheetRecord):
+    """A row of the subscriptions worksheet"""
+
+    FIELDS = tuple(LOCAL_SHEETS["subscriptions"])
+    __slots__ = FIELDS
+    DEFAULTS = {
+        "name": "Unknown",
+        "phone": "Unknown",
+        "package": "Unknown",
+        "amount": 0,
+        "payment_method": "Unknown"
+    }
+
+
+class Doctor(SheetRecord):
+    """A row of the doctors worksheet"""
+
+    FIELDS = ("id", "name", "specialty", "country", "image_path", "is_specialist", "rating", "is_active")
+    __slots__ = FIELDS
+    DEFAULTS = {"is_specialist": False, "rating": 5, "is_active": True}
+
+
+class User(SheetRecord):
+    """A row of the users worksheet, with one column per permission
+
+    In JSON the permission columns are nested under "permissions" and the
+    password is left out.
+    """
+
+    PERMISSIONS = (
+        "dashboard", "doctors", "payments", "subscriptions",
+        "revenue", "consultation_fees", "care_plans", "settings"
+    )
+    FIELDS = ("id", "name", "email", "password", "role") + PERMISSIONS
+    __slots__ = FIELDS
+    DEFAULTS = dict({"role": "sales"}, **{permission: False for permission in PERMISSIONS})
+
+    @classmethod
+    def from_dict(cls, values: Mapping[str, Any]) -> "User":
+        """Build a user from a JSON body with nested permissions
+
+        Only permission names are taken from the nested object, so it
+        cannot override the id, role or other top-level fields.
+        """
+        flat = dict(values)
+        permissions = values.get("permissions") or {}
+        flat.update((name, permissions[name]) for name in cls.PERMISSIONS if name in permissions)
+        return super().from_dict(flat)
+
+    def to_dict(self) -> Dict[str, Any]:
+        user = {name: getattr(self, name) for name in ("id", "name", "email", "role")}
+        user["permissions"] = {permission: getattr(self, permission) for permission in self.PERMISSIONS}
+        return user
+
+
+def _benchmark(counts: List[int]) -> None:
+    """Print the memory held by payment rows as dicts and as Payment records"""
+    import gc
+    import tracemalloc
+
+    def rows(count: int):
+        for number in range(count):
+            yield [
+                f"PY-{number:014d}", f"Customer {number}", f"2557{number:08d}", "Airtel",
+                float(number % 500) * 100, "consultation", "general", False, "Tanzania",
+                f"2026-{number % 12 + 1:02d}-{number % 28 + 1:02d} 10:{number % 60:02d}:00", str(number % 40)
+            ]
+
+    headers = Payment.FIELDS
+    builders = (
+        ("dict", lambda row: dict(zip(headers, row))),
+        ("Payment", Payment.from_row),
+    )
+    for count in counts:
+        results = {}
+        for label, build in builders:
+            gc.collect()
+            tracemalloc.start()
+            held = [build(row) for row in rows(count)]
+            results[label] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del held
+        print(f"{count:>9,} payments: dicts {results['dict'] / 2 ** 20:8.1f} MiB, "
+              f"Payment records {results['Payment'] / 2 ** 20:8.1f} MiB "
+              f"({results['Payment'] / results['dict']:.0%}), "
+              f"{(results['dict'] - results['Payment']) / count:.0f} bytes saved per row")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark([int(count) for count in sys.argv[1:]] or [100000, 1000000])
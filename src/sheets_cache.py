@@ -0,0 +1,245 @@
+"""
+Worksheet record cache for Pona Health Admin Dashboard
+
+This module keeps a read-through, in-memory copy of worksheet records so
+that repeated admin reads do not download the whole sheet from the
+Google Sheets API on every request.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Optional
+from gspread.utils import numericise
+
+# ASCII cells holding any other character never parse as numbers, except
+# for the float spellings of infinity and NaN
+_NON_NUMERIC = re.compile(r"[^0-9+\-.,eE\s]")
+_SPECIAL_FLOATS = {"nan", "inf", "infinity"}
+
+# Most distinct text cells a record builder remembers conversions of
+MAX_REMEMBERED_CELLS = 100000
+
+
+def cell_text(value: Any) -> Any:
+    """Render a Python value the way Google Sheets hands it back"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if value is None:
+        return ""
+    return str(value)
+
+
+def numericise_cell(value: Any) -> Any:
+    """Convert a cell the way get_all_records does, skipping plain text quickly
+
+    Same result as gspread's numericise(cell_text(value)); text that
+    cannot be a number is returned without trying int() and float().
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    text = cell_text(value)
+    if text.isascii() and _NON_NUMERIC.search(text) is not None \
+            and text.replace(",", "").strip().lstrip("+-").lower() not in _SPECIAL_FLOATS:
+        return text
+    return numericise(text, default_blank="")
+
+
+def build_record(headers: List[str], row: List[Any]) -> Dict[str, Any]:
+    """Build a record dict from a raw row, matching gspread's get_all_records"""
+    values = [numericise_cell(value) for value in row]
+    values += [""] * (len(headers) - len(values))
+    return dict(zip(headers, values))
+
+
+def cell_converter() -> Callable[[Any], Any]:
+    """Get a numericise_cell for the many cells of one read
+
+    Text cells repeat a lot (countries, methods, amounts), so each
+    distinct one is converted once.
+    """
+    converted = {}
+
+    def convert(value: Any) -> Any:
+        if type(value) is not str:
+            return numericise_cell(value)
+        result = converted.get(value)
+        if result is None:
+            if len(converted) >= MAX_REMEMBERED_CELLS:
+                converted.clear()
+            result = converted[value] = numericise_cell(value)
+        return result
+
+    return convert
+
+
+def record_builder(headers: List[str]) -> Callable[[List[Any]], Dict[str, Any]]:
+    """Get a build_record for the many rows of one read"""
+    convert = cell_converter()
+
+    def build(row: List[Any]) -> Dict[str, Any]:
+        values = [convert(value) for value in row]
+        values += [""] * (len(headers) - len(values))
+        return dict(zip(headers, values))
+
+    return build
+
+
+class _CacheEntry:
+    """Cached records of one worksheet"""
+
+    def __init__(self, headers: List[str], records: List[Dict[str, Any]]):
+        self.headers = headers
+        self.records = records
+        self.loaded_at = time.monotonic()
+        # Content version, computed on demand and reset by every patch
+        self.fingerprint = None
+
+    def version(self) -> str:
+        if self.fingerprint is None:
+            digest = hashlib.sha1(repr(self.headers).encode())
+            for record in self.records:
+                digest.update(repr(list(record.values())).encode())
+            self.fingerprint = digest.hexdigest()[:16]
+        return self.fingerprint
+
+
+class RecordCache:
+    """Per-worksheet read-through cache with a TTL and a total row bound"""
+
+    def __init__(self, ttl: float = 30.0, max_rows: int = 50000):
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def get(self, sheet_name: str) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the cached records, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is not None and time.monotonic() - entry.loaded_at > self.ttl:
+                self._drop(sheet_name)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(sheet_name)
+            # Callers are free to mutate what they get back
+            return [dict(record) for record in entry.records]
+
+    def columns(self, sheet_name: str, names: List[str]) -> Optional[Dict[str, List[Any]]]:
+        """Project the cached records onto a few columns, or None when not cached"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None or time.monotonic() - entry.loaded_at > self.ttl:
+                return None
+            self.hits += 1
+            self._entries.move_to_end(sheet_name)
+            return {name: [record.get(name, "") for record in entry.records] for name in names}
+
+    def version(self, sheet_name: str) -> Optional[str]:
+        """Get a fingerprint of the cached records, or None when missing or expired
+
+        Equal records give the same version in every process, so it can
+        be handed out to clients as part of an ETag.
+        """
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None or time.monotonic() - entry.loaded_at > self.ttl:
+                return None
+            return entry.version()
+
+    def put(self, sheet_name: str, headers: List[str], records: List[Dict[str, Any]]) -> None:
+        """Store freshly downloaded records for a worksheet"""
+        with self._lock:
+            self._drop(sheet_name)
+            if len(records) > self.max_rows:
+                return
+            self._entries[sheet_name] = _CacheEntry(list(headers), records)
+            self._rows += len(records)
+            # Evict least recently used worksheets until we fit the bound
+            while self._rows > self.max_rows:
+                self._drop(next(iter(self._entries)))
+
+    def append(self, sheet_name: str, row_data: List[Any]) -> None:
+        """Patch a cached worksheet with a row that was just appended"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None:
+                return
+            entry.records.append(build_record(entry.headers, row_data))
+            entry.fingerprint = None
+            self._rows += 1
+            while self._rows > self.max_rows:
+                self._drop(next(iter(self._entries)))
+
+    def replace(self, sheet_name: str, position: int, row_data: List[Any],
+                id_column: str, record_id: Any) -> None:
+        """Patch a cached worksheet with a row that was just rewritten
+
+        The worksheet is dropped instead when the cached record at that
+        position is not the one that was written.
+        """
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None:
+                return
+            if not self._holds(entry, position, id_column, record_id):
+                self._drop(sheet_name)
+                return
+            entry.records[position] = build_record(entry.headers, row_data)
+            entry.fingerprint = None
+
+    def remove(self, sheet_name: str, position: int, id_column: str, record_id: Any) -> None:
+        """Patch a cached worksheet with a row that was just deleted"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None:
+                return
+            if not self._holds(entry, position, id_column, record_id):
+                self._drop(sheet_name)
+                return
+            del entry.records[position]
+            entry.fingerprint = None
+            self._rows -= 1
+
+    @staticmethod
+    def _holds(entry: _CacheEntry, position: int, id_column: str, record_id: Any) -> bool:
+        return 0 <= position < len(entry.records) and \
+            str(entry.records[position].get(id_column, "")) == str(record_id)
+
+    def invalidate(self, sheet_name: Optional[str] = None) -> None:
+        """Forget one worksheet, or every worksheet when no name is given"""
+        with self._lock:
+            if sheet_name is None:
+                self._entries.clear()
+                self._rows = 0
+            else:
+                self._drop(sheet_name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current cache size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "cached_rows": self._rows,
+                "max_rows": self.max_rows,
+                "ttl_seconds": self.ttl,
+                "sheets": {
+                    name: len(entry.records) for name, entry in self._entries.items()
+                }
+            }
+
+    def _drop(self, sheet_name: str) -> None:
+        entry = self._entries.pop(sheet_name, None)
+        if entry is not None:
+            self._rows -= len(entry.records)
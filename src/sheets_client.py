@@ -0,0 +1,110 @@
+"""
+Shared Google Sheets client for Pona Health
+
+This module owns the one gspread client of the process. Nothing here
+touches the network at import time: the client is authorized and the
+spreadsheet opened on first use, or by a background warm-up thread
+started in each worker after it is forked.
+
+The backend is chosen by SHEETS_BACKEND: "gspread" (the default) talks
+to Google Sheets, "fake" keeps an in-memory spreadsheet for offline
+tests and benchmarks (see fake_sheets).
+"""
+
+import os
+import threading
+import gspread
+from google.oauth2.service_account import Credentials
+
+# Constants
+SHEET_ID = "1N38MVn9tIjtyvOhMcsHCoD5bELE5vmHmau7ZgDtSz1g"
+CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), "credentials.json")
+
+# Scopes required for Google Sheets API
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Which spreadsheet backend to open
+SHEETS_BACKEND = os.environ.get("SHEETS_BACKEND", "gspread")
+
+_spreadsheet = None
+_lock = threading.Lock()
+_warm_up_started = False
+_warm_up_after_fork = False
+
+
+def _open_gspread():
+    """Open the production spreadsheet with the service account"""
+    credentials = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
+    client = gspread.authorize(credentials)
+    spreadsheet = client.open_by_key(SHEET_ID)
+    print("Google Sheets connection established successfully")
+    return spreadsheet
+
+
+def _open_fake():
+    """Create an empty in-memory spreadsheet"""
+    from .fake_sheets import FakeSpreadsheet
+    print("Using the in-memory fake Google Sheets backend")
+    return FakeSpreadsheet()
+
+
+# Backend name -> function opening a gspread-compatible spreadsheet
+BACKENDS = {
+    "gspread": _open_gspread,
+    "fake": _open_fake,
+}
+
+
+def get_spreadsheet():
+    """Get the process-wide spreadsheet handle, connecting on first use"""
+    global _spreadsheet
+    if _spreadsheet is None:
+        with _lock:
+            if _spreadsheet is None:
+                if SHEETS_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown SHEETS_BACKEND '{SHEETS_BACKEND}'")
+                _spreadsheet = BACKENDS[SHEETS_BACKEND]()
+    return _spreadsheet
+
+
+def _warm_up() -> None:
+    try:
+        get_spreadsheet()
+    except Exception as e:
+        # The next caller retries; a Sheets outage must not stop the app
+        print(f"Error connecting to Google Sheets: {e}")
+
+
+def warm_up_in_background() -> None:
+    """Connect on a background thread, once per process"""
+    global _warm_up_started
+    with _lock:
+        if _warm_up_started or _spreadsheet is not None:
+            return
+        _warm_up_started = True
+    threading.Thread(target=_warm_up, name="sheets-warm-up", daemon=True).start()
+
+
+def warm_up_after_fork() -> None:
+    """Ask every forked worker to start connecting as soon as it exists
+
+    Only sets a flag, so it is safe to call while the app is imported.
+    """
+    global _warm_up_after_fork
+    _warm_up_after_fork = True
+
+
+def _after_fork_in_child() -> None:
+    # HTTP sessions must not be shared between processes
+    global _spreadsheet, _lock, _warm_up_started
+    _spreadsheet = None
+    _lock = threading.Lock()
+    _warm_up_started = False
+    if _warm_up_after_fork:
+        warm_up_in_background()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
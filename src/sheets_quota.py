@@ -0,0 +1,171 @@
+"""
+Google Sheets API quota scheduler for Pona Health
+
+This module routes every Sheets API call through per-minute read and
+write budgets (token buckets), lets interactive requests go ahead of
+background flushes, and retries rate-limit and server errors with
+jittered exponential backoff instead of failing the request. Server
+errors are only retried for calls that are safe to repeat, since an
+append that failed with a 5xx may still have written its rows.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional, TypeVar
+import gspread
+
+# Call kinds, each with its own budget
+READ = "read"
+WRITE = "write"
+
+# Share of each budget that background work leaves for interactive calls
+INTERACTIVE_RESERVE = 0.2
+
+# Backoff bounds in seconds between retries of a throttled call
+MIN_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 32.0
+
+T = TypeVar("T")
+
+_priority = threading.local()
+
+
+@contextmanager
+def background():
+    """Mark the Sheets calls made by this thread as background work"""
+    previous = getattr(_priority, "background", False)
+    _priority.background = True
+    try:
+        yield
+    finally:
+        _priority.background = previous
+
+
+def is_background() -> bool:
+    """Check whether this thread is doing background work"""
+    return getattr(_priority, "background", False)
+
+
+def is_retryable_error(error: Exception, idempotent: bool = True) -> bool:
+    """Check whether an API error is a rate limit or a server-side failure
+
+    A rate-limited call was refused before it ran, so it can always be
+    retried. Pass idempotent=False for calls such as appends, which a
+    server-side failure may have applied anyway: only rate limits count.
+    """
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    status = getattr(error.response, "status_code", None) or error.code
+    return status == 429 or (idempotent and isinstance(status, int) and status >= 500)
+
+
+class TokenBucket:
+    """Refills `capacity` tokens evenly over `period` seconds"""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, floor: float = 0.0) -> float:
+        """Seconds until a token can be taken without dropping below floor"""
+        self.refill()
+        missing = floor + 1 - self.tokens
+        return max(0.0, missing / self.rate)
+
+
+class QuotaScheduler:
+    """Budgets, prioritizes and retries Google Sheets API calls"""
+
+    def __init__(self, reads_per_minute: int = 60, writes_per_minute: int = 60,
+                 max_retries: int = 5):
+        self.max_retries = max_retries
+        self._buckets = {READ: TokenBucket(reads_per_minute), WRITE: TokenBucket(writes_per_minute)}
+        self._interactive_waiting = {READ: 0, WRITE: 0}
+        self._counters = {
+            kind: {"calls": 0, "throttled": 0, "retries": 0, "failures": 0, "wait_seconds": 0.0}
+            for kind in self._buckets
+        }
+        self._condition = threading.Condition()
+
+    def call(self, kind: str, operation: Callable[[], T], idempotent: Optional[bool] = None) -> T:
+        """Run one API call within the budget of its kind, retrying throttled calls
+
+        Server errors are retried only for idempotent calls; by default
+        reads are and writes are not.
+        """
+        if idempotent is None:
+            idempotent = kind == READ
+        backoff = MIN_BACKOFF_SECONDS
+        attempt = 0
+        while True:
+            self._acquire(kind)
+            try:
+                return operation()
+            except Exception as e:
+                retryable = is_retryable_error(e, idempotent)
+                if not retryable or attempt >= self.max_retries:
+                    if retryable:
+                        with self._condition:
+                            self._counters[kind]["failures"] += 1
+                    raise
+                attempt += 1
+                with self._condition:
+                    self._counters[kind]["retries"] += 1
+                # Jitter keeps workers from retrying in lockstep
+                time.sleep(backoff * random.uniform(0.5, 1.5))
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+    def _acquire(self, kind: str) -> None:
+        """Take one token, waiting for the bucket to refill if needed"""
+        bucket = self._buckets[kind]
+        interactive = not is_background()
+        started = time.monotonic()
+        with self._condition:
+            if interactive:
+                self._interactive_waiting[kind] += 1
+            try:
+                while True:
+                    if interactive:
+                        delay = bucket.wait_time()
+                    elif self._interactive_waiting[kind]:
+                        # Interactive callers go first
+                        delay = 1 / bucket.rate
+                    else:
+                        delay = bucket.wait_time(bucket.capacity * INTERACTIVE_RESERVE)
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                bucket.tokens -= 1
+                counters = self._counters[kind]
+                counters["calls"] += 1
+                waited = time.monotonic() - started
+                if waited > 0.001:
+                    counters["throttled"] += 1
+                    counters["wait_seconds"] += waited
+            finally:
+                if interactive:
+                    self._interactive_waiting[kind] -= 1
+                    self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the remaining budget and call counters of each kind"""
+        with self._condition:
+            report = {}
+            for kind, bucket in self._buckets.items():
+                bucket.refill()
+                report[kind] = dict(
+                    self._counters[kind],
+                    remaining=int(bucket.tokens),
+                    per_minute=int(bucket.capacity),
+                    waiting=self._interactive_waiting[kind]
+                )
+            return report
@@ -0,0 +1,115 @@
+"""
+Worksheet handle registry for Pona Health Admin Dashboard
+
+This module remembers worksheet handles and header rows so that the
+Google Sheets service does not need a metadata round trip before every
+read or write.
+"""
+
+import threading
+from typing import List, Any, Callable, Optional
+import gspread
+from .sheets_quota import QuotaScheduler, READ, WRITE
+
+
+def is_missing_worksheet_error(error: Exception) -> bool:
+    """Check whether an API error means the worksheet no longer exists"""
+    if isinstance(error, gspread.exceptions.WorksheetNotFound):
+        return True
+    if isinstance(error, gspread.exceptions.APIError):
+        return "Unable to parse range" in str(error)
+    return False
+
+
+class WorksheetRegistry:
+    """Resolves each worksheet and its header row once"""
+
+    def __init__(self, get_spreadsheet: Callable[[], Any], quota: Optional[QuotaScheduler] = None):
+        self.get_spreadsheet = get_spreadsheet
+        self.quota = quota
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._headers = {}
+        self._lock = threading.Lock()
+        # Serializes tab creation only; lookups never wait for it
+        self._create_lock = threading.Lock()
+
+    def get(self, sheet_name: str):
+        """Get a worksheet handle, resolving or creating it on first use
+
+        API calls happen outside the lock, so a thread waiting on the
+        quota never holds up lookups of handles that are already known.
+        """
+        spreadsheet = self.get_spreadsheet()
+        with self._lock:
+            if spreadsheet is not self._spreadsheet:
+                # Reconnected, e.g. after a fork: old handles are unusable
+                self._worksheets.clear()
+                self._spreadsheet = spreadsheet
+
+            sheet = self._worksheets.get(sheet_name)
+            if sheet is not None:
+                return sheet
+
+        with self._create_lock:
+            with self._lock:
+                sheet = self._worksheets.get(sheet_name)
+            if sheet is None:
+                sheet = self._create(spreadsheet, sheet_name)
+        return sheet
+
+    def _create(self, spreadsheet, sheet_name: str):
+        """Resolve a worksheet that is not registered yet, creating it if it does not exist"""
+        sheet = self._register(spreadsheet, sheet_name)
+        if sheet is None:
+            try:
+                # Create the sheet if it doesn't exist
+                created = self._call(
+                    WRITE, lambda: spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=20)
+                )
+            except gspread.exceptions.APIError:
+                # Another thread or worker created it in the meantime
+                sheet = self._register(spreadsheet, sheet_name)
+                if sheet is None:
+                    raise
+            else:
+                with self._lock:
+                    sheet = self._worksheets.setdefault(sheet_name, created)
+        return sheet
+
+    def _register(self, spreadsheet, sheet_name: str):
+        """Register every tab with one metadata call and return the named one, if any"""
+        worksheets = self._call(READ, spreadsheet.worksheets)
+        with self._lock:
+            if spreadsheet is self._spreadsheet:
+                for worksheet in worksheets:
+                    self._worksheets.setdefault(worksheet.title, worksheet)
+                if sheet_name in self._worksheets:
+                    return self._worksheets[sheet_name]
+        return next((worksheet for worksheet in worksheets if worksheet.title == sheet_name), None)
+
+    def _call(self, kind: str, operation: Callable[[], Any]) -> Any:
+        if self.quota is None:
+            return operation()
+        return self.quota.call(kind, operation)
+
+    def get_headers(self, sheet_name: str) -> List[str]:
+        """Get the header row of a worksheet, reading it only when unknown"""
+        headers = self._headers.get(sheet_name)
+        if headers is None:
+            sheet = self.get(sheet_name)
+            headers = self._call(READ, lambda: sheet.row_values(1))
+            self._headers[sheet_name] = headers
+        return headers
+
+    def set_headers(self, sheet_name: str, headers: List[str]) -> bool:
+        """Record a freshly read header row, returning True if the layout changed"""
+        previous = self._headers.get(sheet_name)
+        self._headers[sheet_name] = list(headers)
+        return previous is not None and previous != list(headers)
+
+    def forget(self, sheet_name: str) -> None:
+        """Drop a stale handle so the next lookup resolves it again"""
+        with self._lock:
+            self._worksheets.pop(sheet_name, None)
+            self._headers.pop(sheet_name, None)
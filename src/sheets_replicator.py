@@ -0,0 +1,288 @@
+"""
+Google Sheets replicator for the Pona Health local store
+
+This module ships rows committed to the local SQLite store to their
+Google Sheets worksheets in batches, retrying with backoff while the
+spreadsheet is unavailable. In the other direction it imports rows that
+other writers append to the worksheets, reading only the rows past the
+ones already known, and periodically compares checksums to catch rows
+edited in place. Worksheets split into monthly tabs (see
+payment_partitions) are shipped tab by tab, and the regular syncs only
+read the recent tabs, plus one older tab per checksum pass.
+"""
+
+import atexit
+import random
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional
+from .local_store import LocalStore
+from .payment_partitions import PartitionCatalog
+from .sheets_quota import background
+
+# Backoff bounds in seconds between failed replication attempts
+MIN_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class ReplicationError(Exception):
+    """A replication step failed for one worksheet"""
+
+    def __init__(self, sheet_name: str, error: Exception):
+        super().__init__(f"{sheet_name}: {error}")
+        self.sheet_name = sheet_name
+        self.error = error
+
+
+class SheetsReplicator:
+    """Background thread copying committed rows to Google Sheets"""
+
+    def __init__(self, store: LocalStore,
+                 append_rows: Callable[[str, List[List[Any]]], None],
+                 read_values: Callable[[List[str]], Dict[str, List[List[Any]]]],
+                 read_headers: Callable[[str], List[str]],
+                 read_rows: Callable[[str, int], List[List[Any]]],
+                 batch_size: int = 200, interval: float = 5.0,
+                 delta_interval: float = 60.0, checksum_interval: float = 900.0,
+                 partitions: Optional[PartitionCatalog] = None):
+        self.store = store
+        self.append_rows = append_rows
+        self.read_values = read_values
+        self.read_headers = read_headers
+        self.read_rows = read_rows
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.interval = interval
+        self.delta_interval = delta_interval
+        self.checksum_interval = checksum_interval
+        self.last_error = None
+        self.rows_imported = 0
+        self.reseeds = 0
+        self._next_delta_sync = time.monotonic() + delta_interval
+        self._next_checksum = time.monotonic() + checksum_interval
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._lock = threading.Lock()
+        # Per sheet, so that several sheets can be imported in parallel
+        self._seed_locks = {sheet_name: threading.Lock() for sheet_name in store.sheets}
+        # Older partition each checksum pass covers next
+        self._cold_cursor = {}
+
+    def start(self) -> None:
+        """Start the background thread if it is not running yet"""
+        with self._lock:
+            if self._thread is None:
+                # Started lazily so that forked workers each get their own thread
+                self._thread = threading.Thread(target=self._run, name="sheets-replicator", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def notify(self) -> None:
+        """Wake the replicator after a local commit"""
+        self.start()
+        self._wakeup.set()
+
+    def ensure_seeded(self, sheet_name: str) -> None:
+        """Import the rows already in Google Sheets before shipping new ones"""
+        if self.store.is_seeded(sheet_name):
+            return
+        with self._seed_locks[sheet_name]:
+            if self.store.is_seeded(sheet_name):
+                return
+            tabs = self.read_values(self.tabs(sheet_name))
+            if not tabs.get(sheet_name):
+                # A brand-new worksheet gets its header row first
+                self.append_rows(sheet_name, [self.store.sheets[sheet_name]])
+            self.store.seed(sheet_name, tabs)
+
+    def tabs(self, sheet_name: str, recent: bool = False) -> List[str]:
+        """List the tabs holding a worksheet's rows, or only those still written to"""
+        if self.partitions is None or not self.partitions.is_partitioned(sheet_name):
+            return [sheet_name]
+        if recent:
+            return self.partitions.recent_tabs(sheet_name)
+        return self.partitions.tabs(sheet_name)
+
+    def _partition(self, sheet_name: str, tab: str) -> Optional[str]:
+        """Tab to pass to the store, or None when the worksheet has only one"""
+        if self.partitions is None or not self.partitions.is_partitioned(sheet_name):
+            return None
+        return tab
+
+    def replicate_once(self) -> int:
+        """Ship every pending row, returning how many rows were sent"""
+        shipped = 0
+        for sheet_name in self.store.sheets:
+            try:
+                shipped += self._replicate_sheet(sheet_name)
+            except Exception as e:
+                raise ReplicationError(sheet_name, e) from e
+        return shipped
+
+    def _replicate_sheet(self, sheet_name: str) -> int:
+        """Ship the pending rows of one worksheet"""
+        self.ensure_seeded(sheet_name)
+        shipped = 0
+        while True:
+            batch = self.store.claim_unreplicated(sheet_name, self.batch_size)
+            if not batch:
+                return shipped
+            by_tab = {}
+            for seq, row, tab in batch:
+                by_tab.setdefault(tab, []).append((seq, row))
+            for position, (tab, tab_rows) in enumerate(by_tab.items()):
+                seqs = [seq for seq, _ in tab_rows]
+                try:
+                    if tab != sheet_name and self.partitions is not None:
+                        self.partitions.prepare(sheet_name, tab, self.store.sheets[sheet_name])
+                    self.append_rows(tab, self.to_sheet_layout(sheet_name, tab, [row for _, row in tab_rows]))
+                except Exception:
+                    # This tab's rows and those of the tabs not tried yet
+                    self.store.release(sheet_name, [
+                        seq for rows in list(by_tab.values())[position:] for seq, _ in rows
+                    ])
+                    raise
+                self.store.mark_replicated(sheet_name, seqs)
+            shipped += len(batch)
+
+    def sync_new_rows(self, sheet_name: str) -> int:
+        """Import rows appended to the worksheet since the last sync
+
+        Only rows past the ones already known are read, so the cost
+        follows the number of new rows rather than the size of the sheet.
+        Of a partitioned worksheet only the recent tabs are read.
+        """
+        if not self.store.is_seeded(sheet_name):
+            return 0
+        imported = 0
+        for tab in self.tabs(sheet_name, recent=True):
+            known = self.store.known_rows(tab)
+            rows = self.read_rows(tab, known)
+            if not rows:
+                continue
+            imported += self.store.import_rows(
+                sheet_name, self.read_headers(tab), rows, known, self._partition(sheet_name, tab)
+            )
+        self.rows_imported += imported
+        return imported
+
+    def verify(self, sheet_name: str, tabs: Optional[List[str]] = None) -> bool:
+        """Compare the worksheet with the local copy, reseeding on a mismatch
+
+        A partitioned worksheet is compared tab by tab: by default the
+        recent tabs and one older tab, taking turns across passes.
+        Returns True when both hold the same rows.
+        """
+        if not self.store.is_seeded(sheet_name):
+            return True
+        if tabs is None:
+            tabs = self.tabs(sheet_name, recent=True) + self._next_cold_tab(sheet_name)
+        matched = True
+        for tab, values in self.read_values(tabs).items():
+            if not values:
+                continue
+            headers, rows = values[0], values[1:]
+            partition = self._partition(sheet_name, tab)
+            local = self.store.checksum(sheet_name, partition, headers)
+            if self.store.sheet_checksum(sheet_name, headers, rows) == local:
+                continue
+            matched = False
+            if self.store.reseed(sheet_name, headers, rows, partition):
+                self.reseeds += 1
+                print(f"Worksheet '{tab}' differed from the local {sheet_name} table, "
+                      f"reloaded {len(rows)} rows (reload {self.reseeds})")
+            else:
+                print(f"Worksheet '{tab}' differs from the local {sheet_name} table, "
+                      f"reload postponed while its rows are being replicated")
+        return matched
+
+    def _next_cold_tab(self, sheet_name: str) -> List[str]:
+        """Pick the next older partition for a checksum pass, if there is one"""
+        recent = set(self.tabs(sheet_name, recent=True))
+        cold = [tab for tab in self.tabs(sheet_name) if tab not in recent]
+        if not cold:
+            return []
+        cursor = self._cold_cursor.get(sheet_name, 0)
+        self._cold_cursor[sheet_name] = cursor + 1
+        return [cold[cursor % len(cold)]]
+
+    def _sync_due(self) -> None:
+        """Run the delta sync and checksum pass when they are due"""
+        now = time.monotonic()
+        if now >= self._next_checksum:
+            self._for_each_sheet(self.verify)
+            self._next_checksum = now + self.checksum_interval
+            self._next_delta_sync = now + self.delta_interval
+        elif now >= self._next_delta_sync:
+            self._for_each_sheet(self.sync_new_rows)
+            self._next_delta_sync = now + self.delta_interval
+
+    def _for_each_sheet(self, step: Callable[[str], Any]) -> None:
+        """Run a sync step on every worksheet, naming the one that fails"""
+        for sheet_name in self.store.sheets:
+            try:
+                step(sheet_name)
+            except Exception as e:
+                raise ReplicationError(sheet_name, e) from e
+
+    def to_sheet_layout(self, sheet_name: str, tab: str, rows: List[List[Any]]) -> List[List[Any]]:
+        """Reorder stored rows to match the header row of the tab they go to
+
+        Columns the tab does not have stay in the local store only.
+        """
+        store_headers = self.store.sheets[sheet_name]
+        sheet_headers = self.read_headers(tab) or store_headers
+        if sheet_headers == store_headers:
+            return rows
+        positions = {header: i for i, header in enumerate(store_headers)}
+        return [
+            [row[positions[header]] if header in positions else "" for header in sheet_headers]
+            for row in rows
+        ]
+
+    def stop(self) -> None:
+        """Stop the thread, making one last attempt to ship pending rows"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.replicate_once()
+        except Exception as e:
+            print(f"Error replicating to Google Sheets at shutdown, rows left pending in the local store: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how many rows are still waiting to be replicated"""
+        return {
+            "pending_rows": {
+                sheet_name: self.store.pending_count(sheet_name) for sheet_name in self.store.sheets
+            },
+            "rows_imported": self.rows_imported,
+            "reseeds": self.reseeds,
+            "last_error": self.last_error
+        }
+
+    def _run(self) -> None:
+        # Replication yields the API quota to interactive requests
+        with background():
+            self._replicate_forever()
+
+    def _replicate_forever(self) -> None:
+        backoff = MIN_BACKOFF_SECONDS
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            try:
+                self.replicate_once()
+                self._sync_due()
+                self.last_error = None
+                backoff = MIN_BACKOFF_SECONDS
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error replicating to Google Sheets, retrying in {backoff:.0f}s: {e}")
+                # Jitter keeps several workers from retrying in lockstep
+                self._wakeup.wait(backoff * random.uniform(0.5, 1.5))
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
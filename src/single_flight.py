@@ -0,0 +1,142 @@
+"""
+Single-flight call coalescing for Pona Health
+
+This module makes concurrent calls for the same key share one execution:
+the first caller runs the call and every caller that arrives while it is
+in flight waits for it and receives the same result or exception. Per-key
+counters show how many calls were shared and how much time that saved;
+they are kept for the most recently used keys only, next to totals over
+every key.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One call in progress"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.result = None
+        self.error = None
+
+
+class _KeyStats:
+    """Counters of one key, or of every key"""
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self.run_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.calls - self.shared,
+            "shared": self.shared,
+            "run_seconds": round(self.run_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "saved_seconds": round(self.saved_seconds, 3)
+        }
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one
+
+    Counters are kept for at most max_keys keys, dropping the least
+    recently used; the totals cover every key.
+    """
+
+    def __init__(self, max_keys: int = 100):
+        self.max_keys = max_keys
+        self._flights = {}
+        self._stats = OrderedDict()
+        self._totals = _KeyStats()
+        self._lock = threading.Lock()
+        # Calls in flight belong to threads that do not survive a fork
+        os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self) -> None:
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        """Run call for a key, or wait for the identical call already running
+
+        Callers that share a flight get the very same result object, so
+        a mutable result must be copied before it is changed.
+        """
+        with self._lock:
+            stats = self._key_stats(key)
+            stats.calls += 1
+            self._totals.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                stats.shared += 1
+                self._totals.shared += 1
+
+        if leader:
+            try:
+                flight.result = call()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                flight.duration = time.monotonic() - flight.started
+                with self._lock:
+                    self._flights.pop(key, None)
+                    stats.run_seconds += flight.duration
+                    self._totals.run_seconds += flight.duration
+                flight.done.set()
+            return flight.result
+
+        arrived = time.monotonic()
+        flight.done.wait()
+        waited = time.monotonic() - arrived
+        with self._lock:
+            stats.wait_seconds += waited
+            self._totals.wait_seconds += waited
+            # Call time that was not spent running the same call again
+            stats.saved_seconds += flight.duration
+            self._totals.saved_seconds += flight.duration
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _key_stats(self, key: Hashable) -> _KeyStats:
+        """Get the counters of a key, making room for them if they are new"""
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _KeyStats()
+            while len(self._stats) > self.max_keys:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a call for the key is running"""
+        with self._lock:
+            return key in self._flights
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the call, sharing and wait-time counters, in total and of recent keys"""
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "totals": self._totals.to_dict(),
+                "keys": {str(key): stats.to_dict() for key, stats in self._stats.items()}
+            }
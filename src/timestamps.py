@@ -0,0 +1,71 @@
+"""
+Timestamp parsing for Pona Health Admin Dashboard
+
+This module parses the fixed-layout timestamp ("YYYY-MM-DD HH:MM:SS")
+and date ("YYYY-MM-DD") cells written by the booking and payment flows
+into integer epoch seconds and days. Cells in exactly that layout go
+through the C-implemented fromisoformat, an order of magnitude faster
+than datetime.strptime; anything else still goes through strptime, so
+the same cells are accepted as before.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+
+SECONDS_PER_DAY = 86400
+
+# Proleptic Gregorian ordinal of 1970-01-01, for date.fromordinal
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def _is_fixed_date(text: str) -> bool:
+    """Check for the YYYY-MM-DD layout at the start of text"""
+    return text[4] == "-" and text[7] == "-"
+
+
+def epoch_seconds(value: Any) -> Optional[int]:
+    """Parse a YYYY-MM-DD HH:MM:SS timestamp into epoch seconds, or None if invalid"""
+    text = str(value)
+    moment = None
+    if len(text) == 19 and text[10] == " " and text[13] == ":" and text[16] == ":" \
+            and _is_fixed_date(text):
+        # fromisoformat is implemented in C and takes exactly this layout
+        try:
+            moment = datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    if moment is None or moment.tzinfo is not None:
+        # Odd cells strptime still accepts, e.g. space-padded fields
+        try:
+            moment = datetime.strptime(text, TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+    return (moment - _EPOCH) // _SECOND
+
+
+def epoch_days(value: Any) -> Optional[int]:
+    """Parse a YYYY-MM-DD date into days since 1970-01-01, or None if invalid"""
+    text = str(value)
+    day = None
+    if len(text) == 10 and _is_fixed_date(text):
+        try:
+            day = date.fromisoformat(text)
+        except ValueError:
+            pass
+    if day is None:
+        try:
+            day = datetime.strptime(text, DATE_FORMAT).date()
+        except ValueError:
+            return None
+    return day.toordinal() - EPOCH_ORDINAL
+
+
+def datetime_epoch(moment: datetime) -> int:
+    """Epoch seconds of a naive datetime, on the same clock as epoch_seconds"""
+    return (moment - _EPOCH) // _SECOND
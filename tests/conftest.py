@@ -0,0 +1,53 @@
+"""
+Shared fixtures for the Pona Health backend tests
+
+Every test runs against the in-memory fake spreadsheet (see
+src/fake_sheets.py) and a local store of its own, so no credentials or
+network are needed.
+"""
+
+import os
+import sys
+import tempfile
+
+# The service module builds its spreadsheet client and local store at
+# import, so the backend is chosen before anything under src is imported
+os.environ["SHEETS_BACKEND"] = "fake"
+os.environ.setdefault("LOCAL_STORE_PATH", os.path.join(tempfile.mkdtemp(), "local_store.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src import sheets_client, google_sheets_service
+from src.fake_sheets import FakeSpreadsheet
+from src.local_store import LocalStore, LOCAL_SHEETS
+
+DOCTOR_HEADERS = ["id", "name", "specialty", "country", "image_path", "is_specialist", "rating", "is_active"]
+PAYMENT_HEADERS = LOCAL_SHEETS["payments"]
+
+
+def payment_row(payment_id, timestamp, amount=1000, phone="0712345678", doctor_id=""):
+    """Build a payments row in the local store's column order"""
+    return [payment_id, "Customer", phone, "Airtel", amount, "consultation",
+            "general", False, "Tanzania", timestamp, doctor_id]
+
+
+@pytest.fixture
+def spreadsheet(monkeypatch):
+    """A fresh fake spreadsheet, used as the process-wide handle"""
+    fake = FakeSpreadsheet(latency=0, error_rate=0)
+    monkeypatch.setattr(sheets_client, "_spreadsheet", fake)
+    return fake
+
+
+@pytest.fixture
+def service(spreadsheet, tmp_path, monkeypatch):
+    """A Google Sheets service over the fake spreadsheet and an empty local store
+
+    The replicator thread is not started; tests drive replication and
+    syncing by hand.
+    """
+    path = str(tmp_path / "local_store.db")
+    monkeypatch.setattr(google_sheets_service, "LocalStore", lambda: LocalStore(path))
+    sheets_service = google_sheets_service.GoogleSheetsService()
+    monkeypatch.setattr(sheets_service.replicator, "start", lambda: None)
+    return sheets_service
@@ -0,0 +1,78 @@
+"""
+Tests for the admin endpoints
+"""
+
+import pytest
+from flask import Flask
+from conftest import PAYMENT_HEADERS, payment_row
+from src import admin_routes
+from src.response_cache import ResponseCache
+
+
+@pytest.fixture
+def client(service, monkeypatch):
+    monkeypatch.setattr(admin_routes, "sheets_service", service)
+    app = Flask(__name__)
+    app.register_blueprint(admin_routes.admin_bp)
+    return app.test_client()
+
+
+def _page(client, after=None):
+    query = "/api/admin/payments?limit=2" + (f"&after={after}" if after else "")
+    response = client.get(query)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json["items"]], response.json["next_cursor"]
+
+
+def test_pages_continue_where_the_last_one_stopped(client, service, spreadsheet):
+    service.partitions.sheets = {}
+    spreadsheet.load({"payments": [PAYMENT_HEADERS] + [
+        payment_row(f"PY-{number}", "2026-10-01 08:00:00") for number in range(1, 4)
+    ]})
+
+    ids, cursor = _page(client)
+    assert ids == ["PY-1", "PY-2"]
+    # Rows written meanwhile come after the cursor, once
+    service.append_row("payments", payment_row("PY-4", "2026-10-02 08:00:00"))
+    assert _page(client, cursor) == (["PY-3", "PY-4"], None)
+
+
+def test_cursors_from_before_a_reload_are_refused(client, service, spreadsheet):
+    service.partitions.sheets = {}
+    spreadsheet.load({"payments": [PAYMENT_HEADERS] + [
+        payment_row(f"PY-{number}", "2026-10-01 08:00:00") for number in range(1, 6)
+    ]})
+    _, cursor = _page(client)
+
+    # Edited in the sheet: the checksum pass reloads and renumbers the rows
+    spreadsheet.worksheet("payments").update_cell(3, 2, "Renamed")
+    assert not service.replicator.verify("payments")
+
+    response = client.get(f"/api/admin/payments?limit=2&after={cursor}")
+    assert response.status_code == 410
+    ids, _ = _page(client)
+    assert ids == ["PY-1", "PY-2"]
+
+
+def test_malformed_cursors_are_rejected(client, service):
+    service.partitions.sheets = {}
+    assert client.get("/api/admin/payments?limit=2&after=abc").status_code == 400
+    assert client.get("/api/admin/subscriptions?after=1").status_code == 400
+
+
+def test_revenue_responses_are_cached_by_the_parameters_read(client, service, spreadsheet, monkeypatch):
+    service.partitions.sheets = {}
+    spreadsheet.load({"payments": [PAYMENT_HEADERS, payment_row("PY-1", "2026-10-01 08:00:00")]})
+    cache = ResponseCache()
+    monkeypatch.setattr(admin_routes, "response_cache", cache)
+
+    for query in ("period=decade", "period=all&utm_source=mail", "", "period=month&start_date=2026-1-1"):
+        assert client.get(f"/api/admin/revenue?{query}").status_code == 200
+    assert client.get("/api/admin/revenue?start_date=2026-01-01&period=week").status_code == 200
+    assert (cache.stats()["misses"], cache.stats()["entries"]) == (2, 2)
+
+
+def test_malformed_revenue_parameters_are_refused(client, service, spreadsheet):
+    spreadsheet.load({"payments": [PAYMENT_HEADERS]})
+    assert client.get("/api/admin/revenue?start_date=yesterday").status_code == 400
+    assert client.get("/api/admin/revenue?granularity=hour").status_code == 400
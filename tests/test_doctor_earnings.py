@@ -0,0 +1,48 @@
+"""
+Tests for doctor earnings and the doctor_id column they are keyed by
+
+Tabs created before doctor_id was added have no such column, so until
+the migration has run it lives in the local store only.
+"""
+
+from conftest import PAYMENT_HEADERS, payment_row
+from src.payment_partitions import PARTITIONED_SHEETS
+
+OLD_HEADERS = [header for header in PAYMENT_HEADERS if header != "doctor_id"]
+
+
+def test_tab_without_newer_columns_keeps_local_values(service, spreadsheet):
+    spreadsheet.load({"payments": [OLD_HEADERS]})
+    service.partitions.sheets = {}
+    service.append_row("payments", payment_row("PY-1", "2026-10-01 08:00:00", doctor_id="7"))
+    service.replicator.replicate_once()
+
+    # The store's own row is recognised although the tab has no doctor_id
+    assert service.replicator.sync_new_rows("payments") == 0
+    assert service.replicator.verify("payments")
+    assert service.get_doctor_earnings("7")["total_earnings"] == 1000
+
+    # A genuine edit reloads the tab but keeps doctor_id
+    spreadsheet.worksheet("payments").update_cell(2, 2, "Renamed")
+    assert not service.replicator.verify("payments")
+    assert service.get_all_records("payments")[0]["name"] == "Renamed"
+    assert service.get_doctor_earnings("7")["total_earnings"] == 1000
+
+
+def test_migration_adds_doctor_id_to_the_original_tab(service, spreadsheet):
+    spreadsheet.load({"payments": [OLD_HEADERS]})
+    service.partitions.sheets = dict(PARTITIONED_SHEETS)
+    service.append_row("payments", payment_row("PY-1", "not a date", doctor_id="7"))
+    service.append_row("payments", payment_row("PY-2", "2026-10-01 08:00:00", doctor_id="8"))
+    service.replicator.replicate_once()
+
+    service.migrate_partitions()
+    rows = spreadsheet.worksheet("payments").get_all_values()
+    assert rows[0] == OLD_HEADERS + ["doctor_id"]
+    assert [(row[0], row[-1]) for row in rows[1:] if any(row)] == [("PY-1", "7")]
+
+    # The sheet itself now holds doctor_id, so a reload keeps it
+    spreadsheet.worksheet("payments").update_cell(2, 2, "Renamed")
+    assert not service.replicator.verify("payments")
+    assert service.get_doctor_earnings("7")["total_earnings"] == 1000
+    assert service.get_doctor_earnings("8")["total_earnings"] == 1000
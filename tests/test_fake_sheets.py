@@ -0,0 +1,68 @@
+"""
+Tests for the in-memory Google Sheets backend
+"""
+
+import gspread
+import pytest
+from src.fake_sheets import FakeSpreadsheet
+
+
+@pytest.fixture
+def fake():
+    spreadsheet = FakeSpreadsheet(latency=0, error_rate=0)
+    spreadsheet.load({"doctors": [["id", "name"], ["1", "Doctor 1"], ["2", "Doctor 2"]]})
+    return spreadsheet
+
+
+def test_values_read_back_as_sheets_displays_them(fake):
+    sheet = fake.worksheet("doctors")
+    sheet.append_rows([[3, True], [4.0, None]])
+    assert sheet.get_all_values()[3:] == [["3", "TRUE"], ["4", ""]]
+    assert sheet.row_values(2) == ["1", "Doctor 1"]
+    assert sheet.get("A2:A3") == [["1"], ["2"]]
+
+
+def test_appends_go_after_the_last_row_with_a_value(fake):
+    sheet = fake.worksheet("doctors")
+    sheet.update(values=[["", ""]], range_name="A3")
+    sheet.append_rows([["3", "Doctor 3"]])
+    assert [row[0] for row in sheet.get_all_values()] == ["id", "1", "3"]
+
+
+def test_deletes_shift_rows_up_and_shrink_the_grid(fake):
+    sheet = fake.worksheet("doctors")
+    sheet.delete_rows(2)
+    assert sheet.get_all_values() == [["id", "name"], ["2", "Doctor 2"]]
+    assert sheet.row_count == 999
+
+
+def test_batch_calls_address_tabs_by_quoted_name(fake):
+    fake.load({"it's": [["id"], ["a"]]})
+    fake.values_batch_update(body={"data": [{"range": "'it''s'!A3", "values": [["b"]]}]})
+    response = fake.values_batch_get(["'it''s'!A1:A3", "doctors!B2:B3"], params={"majorDimension": "COLUMNS"})
+    assert [value_range["values"] for value_range in response["valueRanges"]] == [
+        [["id", "a", "b"]], [["Doctor 1", "Doctor 2"]]
+    ]
+
+    fake.values_batch_clear(body={"ranges": ["doctors!A2:B3"]})
+    assert fake.worksheet("doctors").get_all_values() == [["id", "name"]]
+
+
+def test_calls_are_counted_but_loading_is_not(fake):
+    assert fake.stats() == {}
+    fake.worksheet("doctors").get_all_values()
+    fake.fetch_sheet_metadata()
+    assert fake.stats() == {"worksheet": 1, "get_all_values": 1, "fetch_sheet_metadata": 1}
+
+
+def test_missing_tabs_raise_like_gspread(fake):
+    with pytest.raises(gspread.exceptions.WorksheetNotFound):
+        fake.worksheet("nowhere")
+
+
+def test_failures_are_rate_limit_errors():
+    fake = FakeSpreadsheet(latency=0, error_rate=1)
+    with pytest.raises(gspread.exceptions.APIError) as error:
+        fake.worksheets()
+    assert error.value.response.status_code == 429
+    assert fake.stats() == {"worksheets": 1}
@@ -0,0 +1,49 @@
+"""
+Tests for the local store that bookings, payments and subscriptions are written to first
+"""
+
+from conftest import PAYMENT_HEADERS, payment_row
+from src.local_store import LocalStore
+
+
+def test_seed_imports_existing_rows_and_replicates_new_ones(service, spreadsheet):
+    service.partitions.sheets = {}
+    spreadsheet.load({"payments": [PAYMENT_HEADERS, payment_row("PY-1", "2026-09-01 10:00:00")]})
+
+    assert [record["id"] for record in service.get_all_records("payments")] == ["PY-1"]
+
+    service.append_row("payments", payment_row("PY-2", "2026-10-02 09:30:00", phone="0687511886"))
+    assert service.local_store.pending_count("payments") == 1
+    assert service.replicator.replicate_once() == 1
+    assert service.local_store.pending_count("payments") == 0
+
+    rows = spreadsheet.worksheet("payments").get_all_values()
+    assert [row[0] for row in rows] == ["id", "PY-1", "PY-2"]
+    assert "sheet_partitions" not in [sheet.title for sheet in spreadsheet.worksheets()]
+
+
+def test_cells_reach_the_sheet_as_written(service, spreadsheet):
+    service.partitions.sheets = {}
+    service.append_row("payments", payment_row("PY-1", "2026-10-02 09:30:00", amount="5,000"))
+    service.replicator.replicate_once()
+
+    rows = spreadsheet.worksheet("payments").get_all_values()
+    assert rows[0] == PAYMENT_HEADERS
+    # A leading zero survives, and reads still see numbers
+    assert rows[1][2] == "0712345678"
+    assert rows[1][4] == "5,000"
+    assert service.get_all_records("payments")[0]["amount"] == 5000
+
+
+def test_workers_sharing_the_database_never_claim_the_same_rows(tmp_path):
+    path = str(tmp_path / "local_store.db")
+    first, second = LocalStore(path), LocalStore(path)
+    for number in range(3):
+        first.insert("payments", payment_row(f"PY-{number}", "2026-10-02 09:30:00"))
+
+    claimed = first.claim_unreplicated("payments", 2)
+    assert [seq for seq, _, _ in second.claim_unreplicated("payments", 10)] == [3]
+
+    # A released batch is claimed again
+    first.release("payments", [seq for seq, _, _ in claimed])
+    assert [seq for seq, _, _ in second.claim_unreplicated("payments", 10)] == [1, 2]
@@ -0,0 +1,83 @@
+"""
+Tests for splitting payments into monthly worksheet tabs
+"""
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+import pytest
+from conftest import PAYMENT_HEADERS, payment_row
+from src.payment_partitions import PARTITIONED_SHEETS, CATALOG_SHEET, partition_name
+
+
+@pytest.fixture
+def partitioned(service):
+    service.partitions.sheets = dict(PARTITIONED_SHEETS)
+    return service
+
+
+def _ids(spreadsheet, tab):
+    return [row[0] for row in spreadsheet.worksheet(tab).get_all_values()[1:] if any(row)]
+
+
+def test_rows_are_written_to_the_tab_of_their_month(partitioned, spreadsheet):
+    spreadsheet.load({"payments": [PAYMENT_HEADERS]})
+    partitioned.append_row("payments", payment_row("PY-1", "2026-09-30 23:00:00"))
+    partitioned.append_row("payments", payment_row("PY-2", "2026-10-01 08:00:00"))
+    partitioned.append_row("payments", payment_row("PY-3", ""))
+    partitioned.replicator.replicate_once()
+
+    assert _ids(spreadsheet, "payments_2026_09") == ["PY-1"]
+    assert _ids(spreadsheet, "payments_2026_10") == ["PY-2"]
+    assert _ids(spreadsheet, "payments") == ["PY-3"]
+    assert [row[0] for row in spreadsheet.worksheet(CATALOG_SHEET).get_all_values()[1:]] == [
+        "payments_2026_09", "payments_2026_10"
+    ]
+    assert partitioned.replicator.tabs("payments") == ["payments", "payments_2026_09", "payments_2026_10"]
+
+
+def test_syncs_only_read_the_recent_tabs(partitioned, spreadsheet, monkeypatch):
+    this_month = partition_name("payments", datetime.now())
+    spreadsheet.load({"payments": [PAYMENT_HEADERS]})
+    for tab in ("payments_2020_01", this_month):
+        partitioned.partitions.prepare("payments", tab, PAYMENT_HEADERS)
+    partitioned.get_all_records("payments")
+
+    read = []
+    read_rows = partitioned.replicator.read_rows
+    monkeypatch.setattr(partitioned.replicator, "read_rows", lambda tab, known: read.append(tab) or read_rows(tab, known))
+    spreadsheet.worksheet(this_month).append_rows([payment_row("PY-1", str(datetime.now()))])
+    assert partitioned.replicator.sync_new_rows("payments") == 1
+    assert read == ["payments", this_month]
+
+
+def test_migration_splits_the_original_tab_by_month(partitioned, spreadsheet):
+    old_headers = [header for header in PAYMENT_HEADERS if header != "doctor_id"]
+    spreadsheet.load({"payments": [
+        old_headers,
+        payment_row("PY-1", "2026-09-01 10:00:00")[:-1],
+        payment_row("PY-2", "2026-10-01 10:00:00")[:-1],
+        payment_row("PY-3", "not a date")[:-1],
+    ]})
+
+    assert partitioned.migrate_partitions() == {"payments": 2}
+    assert partitioned.migrate_partitions() == {"payments": 0}
+
+    assert _ids(spreadsheet, "payments") == ["PY-3"]
+    october = spreadsheet.worksheet("payments_2026_10").get_all_values()
+    assert october[0] == PAYMENT_HEADERS
+    assert [row[0] for row in october[1:]] == ["PY-2"]
+    assert sorted(record["id"] for record in partitioned.get_all_records("payments")) == ["PY-1", "PY-2", "PY-3"]
+    assert partitioned.replicator.verify("payments", partitioned.replicator.tabs("payments"))
+
+
+def test_migration_refuses_to_run_while_partitioning_is_off():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, SHEETS_PARTITION_PAYMENTS="0")
+    result = subprocess.run(
+        [sys.executable, "-m", "src.payment_partitions", "migrate"],
+        cwd=root, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 1
+    assert "SHEETS_PARTITION_PAYMENTS=1" in result.stderr
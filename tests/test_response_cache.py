@@ -0,0 +1,56 @@
+"""
+Tests for serving and refreshing cached admin responses
+"""
+
+import threading
+import time
+from src.response_cache import ResponseCache
+
+
+def _wait_for_refreshes(cache):
+    deadline = time.monotonic() + 5
+    while cache.stats()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()["refreshing"] == 0
+
+
+def test_stale_results_are_served_while_they_refresh():
+    cache = ResponseCache(soft_ttl=0)
+    assert cache.get("revenue", lambda: 1, "v1") == (1, "v1")
+
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 2
+
+    assert cache.get("revenue", slow, "v2") == (1, "v1")
+    release.set()
+    _wait_for_refreshes(cache)
+    assert cache.get("revenue", lambda: 3, "v2") == (2, "v2")
+    assert cache.stats()["misses"] == 1
+
+
+def test_background_refreshes_are_capped():
+    cache = ResponseCache(soft_ttl=0, max_refreshes=1)
+    for key in ("a", "b"):
+        cache.get(key, lambda: key)
+
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "fresh"
+
+    assert cache.get("a", slow) == ("a", None)
+    assert cache.get("b", slow) == ("b", None)
+    stats = cache.stats()
+    assert (stats["refreshing"], stats["refreshes"], stats["refreshes_deferred"]) == (1, 1, 1)
+
+    release.set()
+    _wait_for_refreshes(cache)
+    # The deferred key is refreshed by the next request that finds it stale
+    cache.get("b", slow)
+    _wait_for_refreshes(cache)
+    assert cache.stats()["refreshes"] == 2
+    assert cache.get("b", slow)[0] == "fresh"
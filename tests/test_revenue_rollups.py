@@ -0,0 +1,92 @@
+"""
+Tests for the revenue views: daily rollups with prefix sums, and the NumPy columns
+
+Both views answer the same queries; the service uses PaymentColumns
+when NumPy is installed and RevenueRollup otherwise.
+"""
+
+import random
+from datetime import date
+
+import pytest
+from src.payment_columns import PaymentColumns, HAVE_NUMPY
+from src.revenue_rollups import RevenueRollup
+
+VIEWS = [RevenueRollup] + ([PaymentColumns] if HAVE_NUMPY else [])
+
+
+def _payments(count):
+    generator = random.Random(3)
+    return [
+        {
+            "amount": generator.randrange(500, 5000, 500),
+            "package_type": generator.choice(["consultation", "subscription"]),
+            "country": generator.choice(["Tanzania", "Kenya"]),
+            "timestamp": f"{generator.choice([2025, 2026])}-{generator.randrange(1, 13):02d}-"
+                         f"{generator.randrange(1, 29):02d} 10:00:00",
+        }
+        for _ in range(count)
+    ]
+
+
+def _expected(payments, start, end, key_length):
+    totals = {}
+    for payment in payments:
+        day = payment["timestamp"][:10]
+        if start.isoformat() <= day <= end.isoformat():
+            key = day[:key_length]
+            totals[key] = totals.get(key, 0) + payment["amount"]
+    return totals
+
+
+@pytest.fixture(params=VIEWS, ids=lambda view: view.__name__)
+def view(request):
+    return request.param()
+
+
+def test_range_totals_match_a_full_scan(view):
+    payments = _payments(500)
+    # Out of order, so prefix sums are rebuilt rather than extended
+    for payment in payments:
+        view.apply("payments", payment)
+    start, end = date(2025, 3, 15), date(2026, 2, 10)
+
+    result = view.query(start, end)
+    in_range = [payment for payment in payments if start.isoformat() <= payment["timestamp"][:10] <= end.isoformat()]
+    assert result["total_revenue"] == sum(payment["amount"] for payment in in_range)
+    assert result["subscription_revenue"] == sum(
+        payment["amount"] for payment in in_range if payment["package_type"] == "subscription"
+    )
+    assert result["revenue_by_month"] == _expected(payments, start, end, 7)
+    assert result["revenue_by_country"] == {
+        country: sum(payment["amount"] for payment in in_range if payment["country"] == country)
+        for country in ("Tanzania", "Kenya")
+    }
+
+
+def test_day_buckets_are_only_built_when_asked_for(view):
+    payments = _payments(200)
+    for payment in payments:
+        view.apply("payments", payment)
+    start, end = date(2025, 1, 1), date(2026, 12, 31)
+
+    assert "revenue_by_day" not in view.query(start, end)
+    assert view.query(start, end, "day")["revenue_by_period"] == _expected(payments, start, end, 10)
+    assert view.query(start, end, "year")["revenue_by_period"] == _expected(payments, start, end, 4)
+
+
+def test_unknown_granularities_are_rejected(view):
+    with pytest.raises(ValueError):
+        view.query(granularity="week")
+
+
+def test_both_views_agree():
+    if not HAVE_NUMPY:
+        pytest.skip("NumPy is not installed")
+    payments = _payments(300)
+    rollup, columns = RevenueRollup(), PaymentColumns()
+    for payment in payments:
+        rollup.apply("payments", payment)
+    columns.apply_batch("payments", payments)
+    for granularity in (None, "day", "month", "year"):
+        assert rollup.query(date(2025, 6, 1), None, granularity) == columns.query(date(2025, 6, 1), None, granularity)
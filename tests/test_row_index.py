@@ -0,0 +1,80 @@
+"""
+Tests for locating records through the id-to-row index
+"""
+
+from conftest import DOCTOR_HEADERS
+from src.row_index import RowIndex
+
+
+def _load_doctors(spreadsheet, count):
+    spreadsheet.load({"doctors": [DOCTOR_HEADERS] + [
+        [str(number), f"Doctor {number}", "General", "Tanzania", "", "FALSE", "5", "TRUE"]
+        for number in range(1, count + 1)
+    ]})
+
+
+def _names(spreadsheet):
+    return [row[1] for row in spreadsheet.worksheet("doctors").get_all_values()[1:]]
+
+
+def test_edits_with_a_built_index_read_one_row(service, spreadsheet):
+    _load_doctors(spreadsheet, 3)
+    service.cache.ttl = 0
+    service.update_doctor({"id": "2", "name": "Second"})
+
+    spreadsheet.calls.clear()
+    service.update_doctor({"id": "3", "name": "Third"})
+    assert spreadsheet.stats() == {"row_values": 1, "update": 1}
+    assert _names(spreadsheet) == ["Doctor 1", "Second", "Third"]
+
+
+def test_rows_are_renumbered_after_a_delete(service, spreadsheet):
+    _load_doctors(spreadsheet, 4)
+    assert service.delete_doctor("1")
+    assert service.row_index.lookup("doctors", "4") == 4
+
+    spreadsheet.calls.clear()
+    service.update_doctor({"id": "4", "name": "Fourth"})
+    assert "get_all_values" not in spreadsheet.stats()
+    assert _names(spreadsheet) == ["Doctor 2", "Doctor 3", "Fourth"]
+
+
+def test_rows_moved_behind_our_back_are_found_again(service, spreadsheet):
+    _load_doctors(spreadsheet, 4)
+    service.update_doctor({"id": "4", "name": "Fourth"})
+
+    # Another worker deletes a row; our index still has the old numbers
+    spreadsheet.worksheet("doctors").delete_rows(2)
+    service.update_doctor({"id": "4", "name": "Fourth again"})
+    assert _names(spreadsheet) == ["Doctor 2", "Doctor 3", "Fourth again"]
+    assert service.row_index.lookup("doctors", "4") == 4
+
+
+def test_deleting_an_unknown_record_changes_nothing(service, spreadsheet):
+    _load_doctors(spreadsheet, 2)
+    assert not service.delete_doctor("9")
+    assert _names(spreadsheet) == ["Doctor 1", "Doctor 2"]
+
+
+def test_a_duplicated_id_stays_indexed_after_its_first_row_is_deleted(service, spreadsheet):
+    _load_doctors(spreadsheet, 3)
+    spreadsheet.worksheet("doctors").append_rows(
+        [["2", "Doctor 2 copy", "General", "Tanzania", "", "FALSE", "5", "TRUE"]])
+    assert service.delete_doctor("2")
+    assert service.row_index.lookup("doctors", "2") == 4
+
+    spreadsheet.calls.clear()
+    service.update_doctor({"id": "2", "name": "Copy"})
+    assert "get_all_values" not in spreadsheet.stats()
+    assert _names(spreadsheet) == ["Doctor 1", "Doctor 3", "Copy"]
+
+
+def test_row_index_delete_shifts_every_row_below():
+    index = RowIndex()
+    index.rebuild("doctors", ["id"], [{"id": "a"}, {"id": "b"}, {"id": "a"}, {"id": "c"}])
+    index.deleted("doctors", 2)
+    assert [index.lookup("doctors", record_id) for record_id in "abc"] == [3, 2, 4]
+    index.deleted("doctors", 3)
+    assert index.lookup("doctors", "a") is None
+    index.appended("doctors", ["d"])
+    assert index.lookup("doctors", "d") == 4
@@ -0,0 +1,30 @@
+"""
+Tests for converting worksheet records to and from rows and JSON
+"""
+
+from src.sheet_records import Payment, User
+
+
+def test_nested_permissions_cannot_override_other_fields():
+    user = User.from_dict({
+        "id": "7", "name": "Sales", "email": "sales@example.com", "role": "sales",
+        "permissions": {"payments": True, "role": "admin", "id": "1", "password": "secret"}
+    })
+    assert (user.id, user.role, user.password) == ("7", "sales", "")
+    assert user.payments is True
+    assert user.to_dict()["permissions"]["dashboard"] is False
+
+
+def test_users_round_trip_through_json_and_rows():
+    user = User.from_dict({"id": "3", "name": "Admin", "role": "admin",
+                           "permissions": {permission: True for permission in User.PERMISSIONS}})
+    restored = User.from_row(user.to_row())
+    assert restored.to_dict() == user.to_dict()
+    assert "password" not in restored.to_dict()
+
+
+def test_short_rows_fill_missing_columns():
+    payment = Payment.from_row(["PY-1", "Customer"])
+    assert payment["id"] == "PY-1"
+    assert payment.get("doctor_id") == ""
+    assert payment.get("unknown", 0) == 0
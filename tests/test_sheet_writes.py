@@ -0,0 +1,39 @@
+"""
+Tests for admin writes to worksheets outside the local store
+"""
+
+import gspread
+import pytest
+from conftest import DOCTOR_HEADERS
+
+
+def test_added_doctors_are_written_before_returning(service, spreadsheet):
+    spreadsheet.load({"doctors": [DOCTOR_HEADERS]})
+    service.get_doctors()
+
+    service.add_doctor({"name": "Doctor 1"})
+    assert spreadsheet.stats()["append_rows"] == 1
+    assert spreadsheet.worksheet("doctors").get_all_values()[1][:2] == ["1", "Doctor 1"]
+    assert service.row_index.lookup("doctors", "1") == 2
+
+
+def test_a_failed_append_leaves_the_cached_records_alone(service, spreadsheet, monkeypatch):
+    spreadsheet.load({"doctors": [DOCTOR_HEADERS]})
+    service.get_doctors()
+    sheet = spreadsheet.worksheet("doctors")
+
+    def refuse(values, **kwargs):
+        raise gspread.exceptions.APIError(_BadRequest())
+
+    monkeypatch.setattr(sheet, "append_rows", refuse)
+    with pytest.raises(gspread.exceptions.APIError):
+        service.add_doctor({"name": "Doctor 1"})
+    assert service.get_doctors() == []
+
+
+class _BadRequest:
+    status_code = 400
+    text = "Invalid values"
+
+    def json(self):
+        return {"error": {"code": 400, "message": self.text, "status": "INVALID_ARGUMENT"}}
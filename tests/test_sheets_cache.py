@@ -0,0 +1,75 @@
+"""
+Tests for the worksheet record cache and its invalidation
+"""
+
+from conftest import DOCTOR_HEADERS
+from src.sheets_cache import RecordCache
+
+
+def _load_doctors(spreadsheet):
+    spreadsheet.load({"doctors": [
+        DOCTOR_HEADERS,
+        ["1", "Doctor 1", "General", "Tanzania", "", "FALSE", "5", "TRUE"],
+    ]})
+
+
+def test_repeated_reads_are_served_from_the_cache(service, spreadsheet):
+    _load_doctors(spreadsheet)
+    assert service.get_doctors() == service.get_doctors()
+    assert spreadsheet.stats() == {"worksheets": 1, "get_all_values": 1}
+
+
+def test_writes_patch_the_cached_records(service, spreadsheet):
+    _load_doctors(spreadsheet)
+    service.get_doctors()
+    service.add_doctor({"name": "Doctor 2"})
+    service.update_doctor({"id": "1", "name": "Renamed"})
+
+    spreadsheet.calls.clear()
+    assert [doctor["name"] for doctor in service.get_doctors()] == ["Renamed", "Doctor 2"]
+    assert "get_all_values" not in spreadsheet.stats()
+
+
+def test_cell_updates_invalidate_the_cache(service, spreadsheet):
+    _load_doctors(spreadsheet)
+    service.get_doctors()
+    service.update_cell("doctors", 2, 2, "Changed")
+
+    spreadsheet.calls.clear()
+    assert service.get_doctors()[0]["name"] == "Changed"
+    assert spreadsheet.stats()["get_all_values"] == 1
+
+
+def test_expired_records_are_downloaded_again(service, spreadsheet):
+    _load_doctors(spreadsheet)
+    service.get_doctors()
+    service.cache.ttl = 0
+    spreadsheet.worksheet("doctors").update_cell(2, 2, "Edited elsewhere")
+
+    assert service.get_doctors()[0]["name"] == "Edited elsewhere"
+    assert spreadsheet.stats()["get_all_values"] == 2
+
+
+def test_cached_records_are_copies(service, spreadsheet):
+    _load_doctors(spreadsheet)
+    service.get_doctors()[0]["name"] = "Mutated"
+    assert service.get_doctors()[0]["name"] == "Doctor 1"
+
+
+def test_least_recently_used_sheets_are_evicted_past_the_row_bound():
+    cache = RecordCache(ttl=60, max_rows=3)
+    cache.put("doctors", ["id"], [{"id": 1}, {"id": 2}])
+    cache.put("users", ["id"], [{"id": 1}])
+    cache.get("doctors")
+    cache.put("care_plans", ["id"], [{"id": 1}])
+
+    assert cache.get("users") is None
+    assert [record["id"] for record in cache.get("doctors")] == [1, 2]
+    assert cache.stats()["cached_rows"] == 3
+
+
+def test_sheets_larger_than_the_bound_are_not_cached():
+    cache = RecordCache(ttl=60, max_rows=1)
+    cache.put("doctors", ["id"], [{"id": 1}, {"id": 2}])
+    assert cache.get("doctors") is None
+    assert cache.stats()["cached_rows"] == 0
@@ -0,0 +1,91 @@
+"""
+Tests for retrying throttled and failed Google Sheets API calls
+"""
+
+import gspread
+import pytest
+from conftest import DOCTOR_HEADERS
+from src import sheets_quota
+from src.local_store import LOCAL_SHEETS
+from src.sheets_replicator import ReplicationError
+
+BOOKING = ["BK-1", "Customer", "0712345678", "general", "FALSE", "Tanzania", "2026-10-01 08:00:00"]
+
+
+class _Response:
+    """HTTP response of a failed call"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = f"Status {status_code}"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text}}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(sheets_quota, "MIN_BACKOFF_SECONDS", 0)
+
+
+def _fail(spreadsheet, monkeypatch, call, status, times=1):
+    """Make the next calls of one kind fail with an HTTP status before running"""
+    api_call = spreadsheet._api_call
+    remaining = [times]
+
+    def failing(name):
+        api_call(name)
+        if name == call and remaining[0]:
+            remaining[0] -= 1
+            raise gspread.exceptions.APIError(_Response(status))
+
+    monkeypatch.setattr(spreadsheet, "_api_call", failing)
+
+
+def _seeded_bookings(service, spreadsheet):
+    spreadsheet.load({"bookings": [LOCAL_SHEETS["bookings"]]})
+    service.get_all_records("bookings")
+    service.append_row("bookings", BOOKING)
+
+
+def test_appends_are_not_retried_after_a_server_error(service, spreadsheet, monkeypatch):
+    _seeded_bookings(service, spreadsheet)
+    _fail(spreadsheet, monkeypatch, "append_rows", 503)
+
+    with pytest.raises(ReplicationError):
+        service.replicator.replicate_once()
+    assert service.quota.stats()["write"]["retries"] == 0
+    assert service.local_store.pending_count("bookings") == 1
+
+    # The released row goes out with the next pass
+    assert service.replicator.replicate_once() == 1
+    assert [row[0] for row in spreadsheet.worksheet("bookings").get_all_values()] == ["id", "BK-1"]
+
+
+def test_appends_are_retried_after_a_rate_limit(service, spreadsheet, monkeypatch):
+    _seeded_bookings(service, spreadsheet)
+    _fail(spreadsheet, monkeypatch, "append_rows", 429)
+
+    assert service.replicator.replicate_once() == 1
+    assert service.quota.stats()["write"]["retries"] == 1
+    assert [row[0] for row in spreadsheet.worksheet("bookings").get_all_values()] == ["id", "BK-1"]
+
+
+def test_reads_and_updates_are_retried_after_a_server_error(service, spreadsheet, monkeypatch):
+    spreadsheet.load({"doctors": [DOCTOR_HEADERS, ["1", "Doctor 1", "General", "Tanzania", "", "FALSE", "5", "TRUE"]]})
+    _fail(spreadsheet, monkeypatch, "get_all_values", 500)
+    assert [record["name"] for record in service.get_all_records("doctors")] == ["Doctor 1"]
+
+    _fail(spreadsheet, monkeypatch, "update", 503)
+    service.update_doctor({"id": "1", "name": "First"})
+    assert spreadsheet.worksheet("doctors").get_all_values()[1][1] == "First"
+    assert service.quota.stats()["write"]["retries"] == 1
+
+
+def test_is_retryable_error_leaves_server_errors_of_appends_alone():
+    rate_limited = gspread.exceptions.APIError(_Response(429))
+    unavailable = gspread.exceptions.APIError(_Response(503))
+    assert sheets_quota.is_retryable_error(rate_limited, idempotent=False)
+    assert not sheets_quota.is_retryable_error(unavailable, idempotent=False)
+    assert sheets_quota.is_retryable_error(unavailable)
+    assert not sheets_quota.is_retryable_error(ValueError("not an API error"))
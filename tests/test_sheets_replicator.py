@@ -0,0 +1,75 @@
+"""
+Tests for replicating the local store to Google Sheets and back
+"""
+
+import pytest
+from conftest import PAYMENT_HEADERS, payment_row
+from src.local_store import LOCAL_SHEETS
+from src.payment_partitions import PARTITIONED_SHEETS
+from src.sheets_replicator import ReplicationError
+
+BOOKING_HEADERS = LOCAL_SHEETS["bookings"]
+
+
+def _booking(booking_id):
+    return [booking_id, "Customer", "0712345678", "general", "FALSE", "Tanzania", "2026-10-01 08:00:00"]
+
+
+def _booking_ids(service):
+    return [record["id"] for record in service.get_all_records("bookings")]
+
+
+def test_delta_sync_imports_foreign_rows_once(service, spreadsheet):
+    service.partitions.sheets = dict(PARTITIONED_SHEETS)
+    spreadsheet.load({"payments_2026_10": [PAYMENT_HEADERS]})
+    service.partitions.prepare("payments", "payments_2026_10", PAYMENT_HEADERS)
+    service.get_all_records("payments")
+    service.append_row("payments", payment_row("PY-1", "2026-10-01 08:00:00", amount=2500.0))
+    service.replicator.replicate_once()
+
+    # Another writer appends straight to the sheet
+    spreadsheet.worksheet("payments_2026_10").append_rows([payment_row("PY-2", "2026-10-03 08:00:00")])
+
+    assert service.replicator.sync_new_rows("payments") == 1
+    assert service.replicator.sync_new_rows("payments") == 0
+    assert sorted(record["id"] for record in service.get_all_records("payments")) == ["PY-1", "PY-2"]
+    assert service.replicator.verify("payments")
+    assert service.replicator.reseeds == 0
+
+
+def test_reload_waits_for_claimed_rows_to_be_shipped(service, spreadsheet):
+    spreadsheet.load({"bookings": [BOOKING_HEADERS, _booking("BK-1")]})
+    assert _booking_ids(service) == ["BK-1"]
+    service.append_row("bookings", _booking("BK-2"))
+    claimed = service.local_store.claim_unreplicated("bookings", 10)
+    assert [row[0] for _, row, _ in claimed] == ["BK-2"]
+
+    # An admin edits the sheet while the claimed batch is in flight
+    spreadsheet.worksheet("bookings").update_cell(2, 2, "Edited")
+    assert not service.replicator.verify("bookings")
+    assert service.replicator.reseeds == 0
+    assert _booking_ids(service) == ["BK-1", "BK-2"]
+
+    # Once the batch is shipped the next pass reloads the sheet
+    service.local_store.release("bookings", [seq for seq, _, _ in claimed])
+    service.replicator.replicate_once()
+    assert not service.replicator.verify("bookings")
+    assert service.replicator.reseeds == 1
+    assert service.replicator.verify("bookings")
+    assert _booking_ids(service) == ["BK-1", "BK-2"]
+    assert service.get_all_records("bookings")[0]["name"] == "Edited"
+
+
+def test_failures_name_the_worksheet(service, spreadsheet, monkeypatch):
+    spreadsheet.load({"bookings": [BOOKING_HEADERS]})
+    service.append_row("bookings", _booking("BK-1"))
+
+    def unavailable(sheet_name, rows):
+        raise ConnectionError("spreadsheet unavailable")
+
+    monkeypatch.setattr(service.replicator, "append_rows", unavailable)
+    with pytest.raises(ReplicationError) as error:
+        service.replicator.replicate_once()
+    assert error.value.sheet_name == "bookings"
+    assert str(error.value) == "bookings: spreadsheet unavailable"
+    assert service.local_store.pending_count("bookings") == 1
@@ -0,0 +1,56 @@
+"""
+Tests for coalescing concurrent calls with the same key
+"""
+
+import threading
+import time
+import pytest
+from src.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    executions = []
+
+    def call():
+        executions.append(1)
+        started.set()
+        release.wait(5)
+        return {"total": 1}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("revenue", call)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("revenue", call)))
+    follower.start()
+    while flights.stats()["totals"]["shared"] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(executions) == 1
+    assert results[0] is results[1]
+    assert flights.stats()["keys"]["revenue"]["executions"] == 1
+
+
+def test_errors_reach_the_caller_and_the_key_is_freed():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.do("key", lambda: int("not a number"))
+    assert not flights.in_flight("key")
+    assert flights.do("key", lambda: 2) == 2
+
+
+def test_counters_are_kept_for_recent_keys_only():
+    flights = SingleFlight(max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        flights.do(key, lambda: None)
+
+    stats = flights.stats()
+    assert list(stats["keys"]) == ["a", "c"]
+    assert stats["keys"]["a"]["calls"] == 2
+    assert stats["totals"]["calls"] == 4